@@ -0,0 +1,6 @@
+"""Benchmark di dBPrecision, da eseguire come script dalla radice del progetto.
+
+corpus.py genera la libreria di MP3 sintetici condivisa dagli script;
+pipeline.py misura analisi e normalizzazione end-to-end e salva i risultati
+in JSON, che compare.py confronta tra due commit.
+"""
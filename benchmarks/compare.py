@@ -0,0 +1,110 @@
+"""Confronto tra due risultati di benchmarks/pipeline.py (per esempio tra commit).
+
+Per ogni caso presente in entrambi i file riporta velocità, memoria e spazio
+temporaneo prima e dopo e la variazione percentuale; anche i tempi per fase
+vengono confrontati. Una misura peggiorata oltre la soglia (e oltre il
+margine assoluto di MIN_DIFFERENCE, sotto cui conta il rumore) è una
+regressione e il processo termina con codice 1.
+
+Uso:
+    python benchmarks/compare.py PRIMA.json DOPO.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+
+# Misure confrontate: nome -> (True se più alto è meglio, unità)
+MEASURES = {
+    'realtime': (True, 'x'),
+    'max_rss_mb': (False, 'MB'),
+    'ffmpeg_max_rss_mb': (False, 'MB'),
+    'temp_peak_mb': (False, 'MB'),
+}
+
+# Differenze assolute sotto cui una variazione non è una regressione; per
+# la velocità e le fasi conta la differenza in secondi
+MIN_DIFFERENCE = {'realtime': 0.1, 'max_rss_mb': 2.0,
+                  'ffmpeg_max_rss_mb': 2.0, 'temp_peak_mb': 1.0, 'stage': 0.1}
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or 'results' not in data:
+        raise SystemExit(f"{path}: non è un risultato di benchmarks/pipeline.py")
+    return data
+
+
+def change(before, after):
+    """Variazione percentuale da before ad after."""
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def describe(environment):
+    commit = environment.get('commit', '')[:10] or '?'
+    if environment.get('dirty'):
+        commit += '+modifiche'
+    return (f"{commit} ({environment.get('date', '')}, ffmpeg "
+            f"{environment.get('ffmpeg') or '?'}, python "
+            f"{environment.get('python', '?')})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before', help='risultati di riferimento')
+    parser.add_argument('after', help='risultati da confrontare')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='peggioramento percentuale tollerato (default 10)')
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    env_before = before.get('environment', {})
+    env_after = after.get('environment', {})
+    print(f"prima: {describe(env_before)}")
+    print(f"dopo:  {describe(env_after)}")
+    for key, label in (('corpus', 'corpus'), ('ffmpeg', 'versione di ffmpeg'),
+                       ('platform', 'piattaforma'), ('cpus', 'numero di CPU')):
+        if env_before.get(key) != env_after.get(key):
+            print(f"Attenzione: {label} diverso, il confronto è indicativo")
+
+    regressions = 0
+    print(f"{'caso':>30} {'misura':>26} {'prima':>9} {'dopo':>9} {'var.':>8}")
+    for case in before['results']:
+        if case not in after['results']:
+            continue
+        old, new = before['results'][case], after['results'][case]
+        # (misura, prima, dopo, più alto è meglio, unità, differenza assoluta)
+        rows = [(name, old.get(name), new.get(name), higher, unit,
+                 abs(new.get('seconds', 0) - old.get('seconds', 0))
+                 if name == 'realtime'
+                 else abs((new.get(name) or 0) - (old.get(name) or 0)),
+                 MIN_DIFFERENCE[name])
+                for name, (higher, unit) in MEASURES.items()]
+        for stage, seconds in old.get('stages', {}).items():
+            new_seconds = new.get('stages', {}).get(stage, 0.0)
+            rows.append((f'fase {stage}', seconds, new_seconds, False, 's',
+                         abs(new_seconds - seconds), MIN_DIFFERENCE['stage']))
+        for (name, old_value, new_value, higher, unit, difference,
+             min_difference) in rows:
+            if old_value is None or new_value is None:
+                continue
+            delta = change(old_value, new_value)
+            flag = ''
+            if (-delta if higher else delta) > args.threshold \
+                    and difference > min_difference:
+                flag = '  regressione'
+                regressions += 1
+            print(f"{case:>30} {f'{name} ({unit})':>26} {old_value:>9.2f} "
+                  f"{new_value:>9.2f} {delta:>+7.1f}%{flag}")
+
+    missing = sorted(set(before['results']) ^ set(after['results']))
+    if missing:
+        print(f"Casi presenti in un solo file: {', '.join(missing)}")
+    print(f"{regressions} regressioni oltre il {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Libreria di MP3 sintetici e deterministici per i benchmark.
+
+I file vengono generati localmente con ffmpeg da sorgenti lavfi con seme
+fisso e senza metadati variabili (-bitexact): con la stessa versione di
+ffmpeg il corpus è identico byte per byte, quindi i risultati di commit
+diversi sono confrontabili. Ogni preset mescola clip brevi, brani di
+durata tipica e file lunghi, mono e stereo, CBR e VBR.
+
+Con una cartella persistente (--corpus-dir negli script) i file già
+generati vengono riusati finché la loro specifica non cambia.
+"""
+import hashlib
+import json
+import os
+import subprocess
+
+MANIFEST_FILENAME = 'corpus.json'
+
+
+class CorpusFile:
+    """Specifica di un MP3 del corpus."""
+
+    __slots__ = ('name', 'category', 'seconds', 'sample_rate', 'channels',
+                 'encoding', 'signal', 'level', 'seed')
+
+    def __init__(self, name, category, seconds, sample_rate=44100, channels=2,
+                 encoding='cbr', signal='music', level=0.2, seed=1):
+        self.name = name
+        self.category = category  # 'clip', 'song' o 'long'
+        self.seconds = seconds
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.encoding = encoding  # 'cbr' (192k) o 'vbr' (-q:a 2)
+        # 'music': rumore rosa con volume variabile, 'noise', 'tone'
+        self.signal = signal
+        self.level = level  # Ampiezza della sorgente
+        self.seed = seed
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def source(self):
+        """Sorgente lavfi del segnale."""
+        if self.signal == 'tone':
+            return (f'sine=f={220 + 55 * (self.seed % 16)}:d={self.seconds}:'
+                    f'r={self.sample_rate},volume={self.level}')
+        source = (f'anoisesrc=d={self.seconds}:c=pink:a={self.level}:'
+                  f'r={self.sample_rate}:seed={self.seed}')
+        if self.signal == 'music':
+            # Dinamica lenta, così che LRA e gating della loudness lavorino
+            source += ",volume='0.6+0.4*sin(2*PI*t/7)':eval=frame"
+        return source
+
+
+def _clips(count, seconds_cycle=(0.5, 1, 2, 5)):
+    formats = ((44100, 2, 'cbr'), (48000, 2, 'vbr'), (44100, 1, 'cbr'),
+               (32000, 1, 'vbr'))
+    clips = []
+    for index in range(count):
+        sample_rate, channels, encoding = formats[index % len(formats)]
+        clips.append(CorpusFile(
+            f'clip_{index:03d}', 'clip',
+            seconds_cycle[index % len(seconds_cycle)], sample_rate, channels,
+            encoding, ('tone', 'noise')[index % 2],
+            0.05 + 0.04 * (index % 7), index + 1))
+    return clips
+
+
+def _songs(count):
+    formats = ((44100, 2, 'cbr'), (44100, 2, 'vbr'), (48000, 2, 'cbr'),
+               (44100, 1, 'vbr'))
+    return [CorpusFile(f'song_{index:02d}', 'song', 180 + 30 * (index % 4),
+                       *formats[index % len(formats)], 'music',
+                       0.15 + 0.05 * (index % 3), 100 + index)
+            for index in range(count)]
+
+
+# Preset: dal controllo rapido (pochi minuti di audio) al caso peggiore
+PRESETS = {
+    'quick': _clips(8) + _songs(2),
+    'standard': _clips(32) + _songs(6) + [
+        CorpusFile('long_1h', 'long', 3600, 44100, 2, 'cbr', 'music',
+                   0.2, 200)],
+    'full': _clips(128) + _songs(24) + [
+        CorpusFile('long_1h', 'long', 3600, 44100, 2, 'cbr', 'music',
+                   0.2, 200),
+        CorpusFile('long_3h', 'long', 10800, 44100, 2, 'vbr', 'music',
+                   0.2, 201),
+        CorpusFile('long_3h_mono', 'long', 10800, 48000, 1, 'cbr', 'music',
+                   0.2, 202)],
+}
+
+
+def corpus_digest(files):
+    """Impronta delle specifiche: cambia se cambia anche un solo file."""
+    data = json.dumps([f.to_dict() for f in files], sort_keys=True)
+    return hashlib.sha1(data.encode()).hexdigest()[:12]
+
+
+def generate_file(ffmpeg_cmd, spec, path):
+    """Genera l'MP3 della specifica in path."""
+    if spec.encoding == 'vbr':
+        encoder = ['-c:a', 'libmp3lame', '-q:a', '2']
+    else:
+        encoder = ['-b:a', '192k']
+    subprocess.run([ffmpeg_cmd, '-y', '-nostdin', '-v', 'error', '-f', 'lavfi',
+                    '-i', spec.source(), '-ac', str(spec.channels), *encoder,
+                    '-map_metadata', '-1', '-fflags', '+bitexact',
+                    '-flags:a', '+bitexact', path], check=True)
+
+
+def build_corpus(ffmpeg_cmd, directory, files):
+    """Genera in directory i file mancanti o cambiati e ne restituisce i percorsi.
+
+    Restituisce una lista di (CorpusFile, percorso) nell'ordine di files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    corpus = []
+    for spec in files:
+        path = os.path.join(directory, spec.name + '.mp3')
+        if manifest.get(spec.name) != spec.to_dict() \
+                or not os.path.exists(path):
+            generate_file(ffmpeg_cmd, spec, path)
+            manifest[spec.name] = spec.to_dict()
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=1)
+        corpus.append((spec, path))
+    return corpus
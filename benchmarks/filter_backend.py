@@ -0,0 +1,119 @@
+"""Confronto tra il motore di analisi NumPy e quello a filtri di ffmpeg.
+
+Genera con ffmpeg una libreria di clip MP3 brevi (rumore rosa e toni a
+livelli, sample rate e canali diversi), le analizza con entrambi i motori in
+un solo processo e riporta il tempo totale e la differenza massima per
+ciascuna misura. Il processo termina con codice 1 se una differenza supera
+la tolleranza: 0.01 dB per RMS e picco, 0.06 LU per loudness e LRA, che
+ebur128 stampa con un decimale, e 0.5 dB per il true peak: il filtro di
+interpolazione di ffmpeg è più corto e sulle clip brevi tende a stimarlo
+qualche decimo più alto.
+
+Uso:
+    python benchmarks/filter_backend.py [--clips 64] [--seconds 3]
+        [--metric lufs] [--ffmpeg PATH]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusFile, generate_file  # noqa: E402
+from dbprecision.analysis import (  # noqa: E402
+    BACKEND_FFMPEG, BACKEND_NUMPY, METRIC_LUFS, METRIC_RMS, AnalysisOptions,
+    analyze_mp3_group, group_analysis_jobs)
+
+# Differenza massima ammessa per ciascuna misura
+TOLERANCES = {'rms_db': 0.01, 'peak_db': 0.01, 'lufs': 0.06,
+              'loudness_range': 0.06, 'true_peak_db': 0.5}
+
+# Formati delle clip, usati a rotazione: (sample rate, canali)
+FORMATS = ((44100, 2), (48000, 2), (44100, 1), (32000, 1))
+
+
+def generate_clip(ffmpeg_cmd, path, index, seconds):
+    """Clip deterministica: rumore rosa o tono, a un livello dipendente da index."""
+    sample_rate, channels = FORMATS[index % len(FORMATS)]
+    generate_file(ffmpeg_cmd, CorpusFile(
+        f'clip_{index:04d}', 'clip', seconds, sample_rate, channels,
+        signal=('tone', 'noise')[index % 2], level=0.05 + 0.04 * (index % 7),
+        seed=index), path)
+
+
+def run_backend(paths, options):
+    """Analizza tutti i file e restituisce (secondi, risultati)."""
+    start = time.perf_counter()
+    results = []
+    for _, (group_paths, _) in group_analysis_jobs(enumerate(paths), options):
+        results += analyze_mp3_group(group_paths, options)
+    return time.perf_counter() - start, results
+
+
+def measures(loudness):
+    return {'rms_db': loudness.rms_db, 'peak_db': loudness.peak_db,
+            'lufs': loudness.lufs, 'loudness_range': loudness.loudness_range,
+            'true_peak_db': loudness.true_peak_db}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clips', type=int, default=64,
+                        help='numero di clip generate')
+    parser.add_argument('--seconds', type=float, default=3,
+                        help='durata di ciascuna clip in secondi')
+    parser.add_argument('--metric', choices=(METRIC_RMS, METRIC_LUFS),
+                        default=METRIC_LUFS)
+    parser.add_argument('--ffmpeg', default='ffmpeg')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='dbprecision_bench_') as tmp_dir:
+        paths = []
+        for index in range(args.clips):
+            path = os.path.join(tmp_dir, f'clip_{index:04d}.mp3')
+            generate_clip(args.ffmpeg, path, index, args.seconds)
+            paths.append(path)
+
+        timings = {}
+        results = {}
+        for backend in (BACKEND_NUMPY, BACKEND_FFMPEG):
+            options = AnalysisOptions(ffmpeg_cmd=args.ffmpeg,
+                                      metric=args.metric, backend=backend)
+            timings[backend], results[backend] = run_backend(paths, options)
+
+    print(f"{'motore':>8} {'tempo s':>9} {'clip/s':>8}")
+    for backend, seconds in timings.items():
+        print(f"{backend:>8} {seconds:>9.2f} {args.clips / seconds:>8.1f}")
+    print(f"velocità relativa: "
+          f"{timings[BACKEND_NUMPY] / timings[BACKEND_FFMPEG]:.2f}x")
+
+    failed = False
+    differences = {name: 0.0 for name in TOLERANCES}
+    for path, expected, actual in zip(paths, results[BACKEND_NUMPY],
+                                      results[BACKEND_FFMPEG]):
+        if expected[0] is None or actual[0] is None:
+            print(f"{os.path.basename(path)}: errore "
+                  f"{expected[2] or actual[2]}")
+            failed = True
+            continue
+        expected, actual = measures(expected[0]), measures(actual[0])
+        for name in differences:
+            if expected[name] is not None and actual[name] is not None:
+                differences[name] = max(differences[name],
+                                        abs(expected[name] - actual[name]))
+
+    print(f"{'misura':>15} {'diff max':>9} {'toll.':>6}")
+    for name, difference in differences.items():
+        flag = ''
+        if difference > TOLERANCES[name]:
+            flag = '  fuori tolleranza'
+            failed = True
+        print(f"{name:>15} {difference:>9.4f} {TOLERANCES[name]:>6}{flag}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
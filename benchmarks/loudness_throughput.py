@@ -0,0 +1,94 @@
+"""Benchmark della velocità di misura del volume, in multipli del tempo reale.
+
+Misura su PCM sintetico già in memoria (la decodifica non è inclusa) quante
+volte il tempo reale vengono elaborati l'RMS e la loudness BS.1770, con e
+senza true peak, su un singolo core. L'obiettivo per la loudness completa è
+almeno TARGET_REALTIME volte il tempo reale; il processo termina con codice 1
+se una misura resta sotto l'obiettivo.
+
+Uso:
+    python benchmarks/loudness_throughput.py [--seconds 600]
+        [--sample-rates 44100 48000] [--channels 2] [--block-frames 65536]
+"""
+import os
+
+# Un solo thread per le librerie numeriche: il risultato è per core
+for _name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_name, '1')
+
+import argparse  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbprecision.analysis import (  # noqa: E402
+    DEFAULT_BLOCK_FRAMES, LoudnessAccumulator, METRIC_RMS)
+from dbprecision.loudness import LoudnessMeter  # noqa: E402
+
+# Multipli del tempo reale richiesti alla loudness con true peak
+TARGET_REALTIME = 100.0
+
+
+def make_signal(seconds, sample_rate, channels):
+    """Rumore a -20 dBFS circa, interlacciato in float32."""
+    rng = np.random.default_rng(1)
+    samples = rng.standard_normal(seconds * sample_rate * channels,
+                                  dtype=np.float32)
+    samples *= 0.1
+    return samples
+
+
+def run_case(make_meter, samples, block_samples):
+    """Alimenta il misuratore a blocchi e restituisce i secondi impiegati."""
+    start = time.perf_counter()
+    meter = make_meter()
+    for offset in range(0, len(samples), block_samples):
+        meter.add(samples[offset:offset + block_samples])
+    meter.result()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=int, default=600,
+                        help='durata del segnale di prova in secondi')
+    parser.add_argument('--sample-rates', type=int, nargs='+',
+                        default=[44100, 48000])
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--block-frames', type=int,
+                        default=DEFAULT_BLOCK_FRAMES)
+    args = parser.parse_args()
+
+    below_target = False
+    print(f"{'Hz':>7} {'misura':>16} {'tempo s':>9} {'x reale':>9}")
+    for sample_rate in args.sample_rates:
+        samples = make_signal(args.seconds, sample_rate, args.channels)
+        block_samples = args.block_frames * args.channels
+        cases = [
+            ('rms', lambda: LoudnessAccumulator(
+                sample_rate, args.channels, METRIC_RMS), False),
+            ('lufs', lambda: LoudnessMeter(
+                sample_rate, args.channels, true_peak=False), False),
+            ('lufs+true peak', lambda: LoudnessMeter(
+                sample_rate, args.channels), True),
+        ]
+        for name, make_meter, checked in cases:
+            # Primo giro a vuoto: filtri e FFT vengono preparati una volta
+            run_case(make_meter, samples[:block_samples], block_samples)
+            elapsed = run_case(make_meter, samples, block_samples)
+            realtime = args.seconds / elapsed
+            flag = ''
+            if checked and realtime < TARGET_REALTIME:
+                flag = f'  < {TARGET_REALTIME:.0f}x'
+                below_target = True
+            print(f"{sample_rate:>7} {name:>16} {elapsed:>9.2f} "
+                  f"{realtime:>9.0f}{flag}")
+
+    sys.exit(1 if below_target else 0)
+
+
+if __name__ == '__main__':
+    main()
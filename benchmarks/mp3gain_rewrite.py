@@ -0,0 +1,222 @@
+"""Confronto tra la riscrittura a blocchi di global_gain e quella in memoria.
+
+dbprecision.mp3gain.apply_gain_steps legge il file tramite mmap e lo copia a
+blocchi modificando solo i byte dei campi e dei CRC. Questo script ricava
+il risultato atteso con il procedimento originale, che carica l'intero
+file in un bytearray e lo riscrive, e verifica che le due uscite siano
+identiche byte per byte per diversi spostamenti di global_gain (compreso
+uno che satura l'intervallo 0-255) e blocchi di dimensione dispari.
+
+I file vengono generati con ffmpeg (MPEG1, MPEG2 e MPEG2.5, CBR con frame
+Info e VBR con frame Xing) e poi modificati per coprire i casi che ffmpeg
+non produce: frame protetti da CRC (bit di protezione attivato e due byte
+di CRC al posto dell'inizio delle side info: l'audio non è più
+decodificabile ma la struttura dei frame sì), frame VBRI al posto di Xing,
+tag ID3v2 con byte spuri prima del primo frame, tag Lyrics3v2, APEv2 e
+ID3v1 in coda. Oltre all'uguaglianza con il riferimento si controlla che
+intestazione, frame Info/Xing/VBRI e tag in coda restino invariati.
+Il processo termina con codice 1 se un confronto fallisce.
+
+Uso:
+    python benchmarks/mp3gain_rewrite.py [--seconds 20] [--ffmpeg PATH]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from mutagen.apev2 import APEv2  # noqa: E402
+from mutagen.id3 import ID3, TIT2  # noqa: E402
+
+from benchmarks.corpus import CorpusFile, generate_file  # noqa: E402
+from dbprecision import mp3gain  # noqa: E402
+
+# Spostamenti di global_gain provati su ogni file; 200 satura i granuli
+STEPS = (-3, 1, 4, 200)
+
+# Dimensioni dei blocchi di copia provate: la predefinita e due dispari
+CHUNK_SIZES = (mp3gain.COPY_CHUNK_SIZE, 4093, 417)
+
+# File generati con ffmpeg: (nome, sample rate, canali, codifica)
+SOURCES = (
+    ('mpeg1_cbr_stereo', 44100, 2, 'cbr'),
+    ('mpeg1_vbr_stereo', 48000, 2, 'vbr'),
+    ('mpeg1_cbr_mono', 32000, 1, 'cbr'),
+    ('mpeg2_cbr_mono', 22050, 1, 'cbr'),
+    ('mpeg2_vbr_stereo', 24000, 2, 'vbr'),
+    ('mpeg25_cbr_mono', 11025, 1, 'cbr'),
+)
+
+# Byte spuri tra il tag ID3v2 e il primo frame, con finte sincronizzazioni
+JUNK = b'\xff\x00junk\xff\xe0' * 8
+
+
+def reference_rewrite(data, steps):
+    """Riscrittura in memoria: (file riscritto, granuli, granuli limitati)."""
+    data = bytearray(data)
+    start, end = mp3gain.audio_region(io.BytesIO(data), len(data))
+    offsets, protected_frames = mp3gain.scan_frames(data, start, end)
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    clipped = 0
+    if steps and len(offsets):
+        gains = mp3gain.read_gains(buffer, offsets)
+        new_gains = np.where(gains > 0, gains + steps, 0)
+        clipped = int(np.count_nonzero((new_gains < 0) | (new_gains > 255)))
+        np.clip(new_gains, 0, 255, out=new_gains)
+        mp3gain.write_gains(buffer, offsets, new_gains)
+        for frame_start, side_info_size in protected_frames:
+            crc = mp3gain.frame_crc(data, frame_start, side_info_size)
+            data[frame_start + 4:frame_start + 6] = crc.to_bytes(2, 'big')
+    return bytes(data), len(offsets), clipped
+
+
+def frame_starts(data):
+    """Inizio di ogni frame, seguendo le lunghezze dal primo."""
+    start, end = mp3gain.audio_region(io.BytesIO(data), len(data))
+    starts = []
+    pos = start
+    while pos + 4 <= end:
+        header = mp3gain.parse_header(data, pos)
+        if header is None:
+            break
+        starts.append(pos)
+        pos += header[0]
+    return starts
+
+
+def with_crc(data):
+    """Attiva la protezione CRC in tutti i frame tranne il frame Info/Xing."""
+    data = bytearray(data)
+    for pos in frame_starts(data)[1:]:
+        data[pos + 1] &= 0xFE
+    return bytes(data)
+
+
+def with_vbri(data):
+    """Sostituisce il frame Xing/Info con un'intestazione VBRI."""
+    data = bytearray(data)
+    first = frame_starts(data)[0]
+    header = mp3gain.parse_header(data, first)
+    data[first + 4:first + header[0]] = bytes(header[0] - 4)
+    data[first + 36:first + 40] = b'VBRI'
+    return bytes(data)
+
+
+def lyrics3_tag(text):
+    """Tag Lyrics3v2 con il solo campo LYR."""
+    body = b'LYRICSBEGIN' + b'LYR' + b'%05d' % len(text) + text
+    return body + b'%06d' % len(body) + b'LYRICS200'
+
+
+def with_tags(path, data):
+    """Scrive in path data con ID3v2, byte spuri, Lyrics3v2, APEv2 e ID3v1.
+
+    Restituisce (byte iniziali fino al primo frame audio, byte finali dopo
+    l'ultimo frame), che la riscrittura deve lasciare invariati.
+    """
+    first, second = frame_starts(data)[:2]
+    with open(path, 'wb') as f:
+        f.write(data[:first] + JUNK + data[first:]
+                + lyrics3_tag(b'riga di prova'))
+    ape = APEv2()
+    ape['Title'] = 'prova'
+    ape.save(path)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=['prova']))
+    tags.save(path, v1=2)
+    with open(path, 'rb') as f:
+        tagged = f.read()
+    head = tagged.index(JUNK) + len(JUNK) + second - first
+    tail = tagged.index(b'LYRICSBEGIN')
+    return tagged[:head], tagged[tail:]
+
+
+def build_inputs(ffmpeg_cmd, directory, seconds):
+    """Genera i file di prova: lista di (nome, percorso, byte invariati)."""
+    inputs = []
+    for index, (name, sample_rate, channels, encoding) in enumerate(SOURCES):
+        path = os.path.join(directory, name + '.mp3')
+        generate_file(ffmpeg_cmd, CorpusFile(
+            name, 'clip', seconds, sample_rate, channels, encoding, 'music',
+            0.2, index + 1), path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Il frame Info/Xing iniziale non contiene audio
+        info_end = frame_starts(data)[1]
+        inputs.append((name, path, (data[:info_end], b'')))
+
+        variants = [('crc', with_crc(data))]
+        if encoding == 'vbr':
+            variants.append(('vbri', with_vbri(data)))
+        for suffix, variant in variants:
+            variant_path = os.path.join(directory, f'{name}_{suffix}.mp3')
+            with open(variant_path, 'wb') as f:
+                f.write(variant)
+            inputs.append((f'{name}_{suffix}', variant_path,
+                           (variant[:info_end], b'')))
+
+        tagged_path = os.path.join(directory, f'{name}_tags.mp3')
+        inputs.append((f'{name}_tags', tagged_path,
+                       with_tags(tagged_path, data)))
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=20,
+                        help='durata di ciascun file generato in secondi')
+    parser.add_argument('--ffmpeg', default='ffmpeg')
+    args = parser.parse_args()
+
+    failed = False
+    timings = {'memoria': 0.0, 'blocchi': 0.0}
+    print(f"{'file':>26} {'granuli':>8} {'CRC':>5} {'confronti':>10}")
+    with tempfile.TemporaryDirectory(prefix='dbprecision_bench_') as tmp_dir:
+        output_path = os.path.join(tmp_dir, 'output.mp3')
+        for name, path, (head, tail) in build_inputs(args.ffmpeg, tmp_dir,
+                                                     args.seconds):
+            with open(path, 'rb') as f:
+                data = f.read()
+            protected = len(mp3gain.scan_frames(
+                data, *mp3gain.audio_region(io.BytesIO(data), len(data)))[1])
+            errors = []
+            compared = 0
+            for steps in STEPS:
+                start = time.perf_counter()
+                expected = reference_rewrite(data, steps)
+                timings['memoria'] += time.perf_counter() - start
+                if expected[0] == data:
+                    errors.append(f"{steps:+d}: nessun byte modificato")
+                if not expected[0].startswith(head) \
+                        or not expected[0].endswith(tail):
+                    errors.append(f"{steps:+d}: intestazione o tag modificati")
+                for chunk_size in CHUNK_SIZES:
+                    mp3gain.COPY_CHUNK_SIZE = chunk_size
+                    start = time.perf_counter()
+                    counts = mp3gain.apply_gain_steps(path, steps, output_path)
+                    timings['blocchi'] += time.perf_counter() - start
+                    with open(output_path, 'rb') as f:
+                        actual = f.read()
+                    compared += 1
+                    if (actual, *counts) != expected:
+                        errors.append(f"{steps:+d}, blocchi da {chunk_size}: "
+                                      "uscita diversa dal riferimento")
+                mp3gain.COPY_CHUNK_SIZE = CHUNK_SIZES[0]
+            print(f"{name:>26} {expected[1]:>8} {protected:>5} "
+                  f"{compared:>10}{'  ERRORE' if errors else ''}")
+            for error in errors:
+                print(f"    {error}")
+            failed = failed or bool(errors)
+
+    for label, seconds in timings.items():
+        print(f"tempo totale {label}: {seconds:.2f} s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
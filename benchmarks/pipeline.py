@@ -0,0 +1,338 @@
+"""Benchmark end-to-end di analisi e normalizzazione sul corpus sintetico.
+
+Per ogni caso (analisi RMS/LUFS, normalizzazione con ricodifica, senza
+ricodifica o solo tag) e per ogni categoria del corpus (clip, brani, file
+lunghi) i file vengono elaborati in sequenza da un processo figlio nuovo,
+su una copia del corpus. Per ciascuna combinazione vengono registrati:
+
+- tempo reale e velocità in secondi di audio per secondo (x reale);
+- tempo per fase (vedi dbprecision.timing), dagli eventi 'timing' di
+  normalize_file;
+- RSS di picco del processo Python e dei processi ffmpeg;
+- spazio temporaneo su disco di picco (file accanto agli originali e in
+  TMPDIR).
+
+Disco e memoria di ffmpeg vengono campionati ogni POLL_INTERVAL secondi
+(la RSS di ffmpeg solo su Linux): i picchi dei file più brevi possono
+sfuggire.
+
+Con --json i risultati vengono salvati insieme a commit, versioni e
+impronta del corpus; benchmarks/compare.py confronta due di questi file.
+
+Uso:
+    python benchmarks/pipeline.py [--preset quick] [--tasks ...] [--runs 1]
+        [--corpus-dir DIR] [--json FILE] [--ffmpeg PATH]
+
+Richiede un sistema POSIX (modulo resource).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.corpus import PRESETS, build_corpus, corpus_digest  # noqa: E402
+from dbprecision.analysis import (  # noqa: E402
+    BACKEND_FFMPEG, DEFAULT_BLOCK_FRAMES, METRIC_LUFS, AnalysisOptions,
+    analyze_mp3_group, group_analysis_jobs)
+from dbprecision.normalize import (  # noqa: E402
+    MODE_GAIN, MODE_REENCODE, MODE_TAGS, NormalizeOptions, normalize_file)
+from dbprecision.timing import STAGE_LABELS  # noqa: E402
+
+RESULTS_FORMAT = 1  # Versione del formato del file JSON
+
+TARGET_DB = -18.0
+POLL_INTERVAL = 0.01
+
+# Casi: nome -> (funzione, parametri delle opzioni)
+TASKS = {
+    'analyze-rms': ('analyze', {}),
+    'analyze-lufs': ('analyze', {'metric': METRIC_LUFS}),
+    'analyze-lufs-filters': ('analyze', {'metric': METRIC_LUFS,
+                                         'backend': BACKEND_FFMPEG}),
+    'normalize-reencode': ('normalize', {'mode': MODE_REENCODE}),
+    'normalize-gain': ('normalize', {'mode': MODE_GAIN}),
+    'normalize-tags': ('normalize', {'mode': MODE_TAGS}),
+}
+
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss è in KB su Linux e in byte su macOS
+    if sys.platform == 'darwin':
+        return rss / (1024 * 1024)
+    return rss / 1024
+
+
+def _tree_size(directory):
+    total = 0
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        total += _tree_size(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass  # File rimosso durante la scansione
+    except OSError:
+        pass
+    return total
+
+
+def _children_peak_kb():
+    """VmHWM più alto tra i processi figli attivi (solo Linux, altrimenti 0).
+
+    I figli non ancora passati all'exec sono copie di questo processo e
+    vengono ignorati.
+    """
+    peak = 0
+    try:
+        tasks = os.listdir('/proc/self/task')
+        with open('/proc/self/comm') as f:
+            own_name = f.read().strip()
+    except OSError:
+        return 0
+    for task in tasks:
+        try:
+            with open(f'/proc/self/task/{task}/children') as f:
+                pids = f.read().split()
+        except OSError:
+            continue
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('Name:') \
+                                and line.split(None, 1)[1].strip() == own_name:
+                            break
+                        if line.startswith('VmHWM:'):
+                            peak = max(peak, int(line.split()[1]))
+                            break
+            except (OSError, ValueError):
+                pass  # Processo già terminato
+    return peak
+
+
+class ResourceMonitor(threading.Thread):
+    """Campiona lo spazio occupato dalle cartelle e la RSS dei processi figli.
+
+    ru_maxrss dei figli non serve: su Linux un figlio eredita dal processo
+    che lo avvia il picco di memoria raggiunto fino all'exec.
+    """
+
+    def __init__(self, directories):
+        super().__init__(daemon=True)
+        self.directories = directories
+        self.baseline = self._disk_total()
+        self.disk_peak = self.baseline
+        self.children_peak_kb = 0
+        self._stop_event = threading.Event()
+
+    def _disk_total(self):
+        return sum(_tree_size(directory) for directory in self.directories)
+
+    def _sample(self):
+        self.disk_peak = max(self.disk_peak, self._disk_total())
+        self.children_peak_kb = max(self.children_peak_kb,
+                                    _children_peak_kb())
+
+    def run(self):
+        while not self._stop_event.wait(POLL_INTERVAL):
+            self._sample()
+
+    def stop(self):
+        """Ferma il campionamento e restituisce (MB temporanei, MB dei figli)."""
+        self._stop_event.set()
+        self.join()
+        self._sample()
+        return ((self.disk_peak - self.baseline) / (1024 * 1024),
+                self.children_peak_kb / 1024)
+
+
+def run_child(task, ffmpeg_cmd, files_dir):
+    """Esegue un caso sui file di files_dir e stampa le misure in JSON."""
+    kind, params = TASKS[task]
+    paths = sorted(os.path.join(files_dir, name)
+                   for name in os.listdir(files_dir) if name.endswith('.mp3'))
+    stages = {}
+    errors = 0
+    monitor = ResourceMonitor([files_dir, tempfile.gettempdir()])
+    monitor.start()
+    start = time.perf_counter()
+
+    if kind == 'analyze':
+        options = AnalysisOptions(block_frames=DEFAULT_BLOCK_FRAMES,
+                                  ffmpeg_cmd=ffmpeg_cmd, **params)
+        for _, (group, _) in group_analysis_jobs(enumerate(paths), options):
+            errors += sum(1 for result in analyze_mp3_group(group, options)
+                          if result[0] is None)
+        stages['analyze'] = time.perf_counter() - start
+    else:
+        options = NormalizeOptions(TARGET_DB, block_frames=DEFAULT_BLOCK_FRAMES,
+                                   ffmpeg_cmd=ffmpeg_cmd, **params)
+
+        def report(kind, *data):
+            if kind == 'timing':
+                for stage, seconds in data[3].items():
+                    stages[stage] = stages.get(stage, 0.0) + seconds
+
+        for row, path in enumerate(paths):
+            if not normalize_file(path, row, options, report=report):
+                errors += 1
+
+    elapsed = time.perf_counter() - start
+    temp_peak_mb, ffmpeg_rss_mb = monitor.stop()
+    print(json.dumps({
+        'seconds': elapsed, 'errors': errors, 'stages': stages,
+        'max_rss_mb': _max_rss_mb(), 'ffmpeg_max_rss_mb': ffmpeg_rss_mb,
+        'temp_peak_mb': temp_peak_mb}))
+
+
+def measure(task, ffmpeg_cmd, corpus, work_dir):
+    """Esegue run_child in un nuovo processo su una copia dei file."""
+    files_dir = os.path.join(work_dir, 'files')
+    tmp_dir = os.path.join(work_dir, 'tmp')
+    os.makedirs(files_dir)
+    os.makedirs(tmp_dir)
+    try:
+        for spec, path in corpus:
+            shutil.copyfile(path, os.path.join(files_dir, spec.name + '.mp3'))
+        env = dict(os.environ, TMPDIR=tmp_dir)
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', task,
+             '--files-dir', files_dir, '--ffmpeg', ffmpeg_cmd],
+            env=env, check=True, capture_output=True, text=True)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(files_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def median_stats(runs):
+    """Mediana di ogni misura su più esecuzioni dello stesso caso."""
+    stats = {name: statistics.median(run[name] for run in runs)
+             for name, value in runs[0].items() if name != 'stages'}
+    stage_names = list(dict.fromkeys(name for run in runs
+                                     for name in run['stages']))
+    stats['stages'] = {name: statistics.median(run['stages'].get(name, 0.0)
+                                               for run in runs)
+                       for name in stage_names}
+    return stats
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def environment(ffmpeg_cmd, preset, files, runs):
+    """Commit, versioni e macchina, per rendere confrontabili i risultati."""
+    import numpy
+    from dbprecision.ffmpeg import ffmpeg_info
+    info = ffmpeg_info(ffmpeg_cmd)
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': numpy.__version__,
+        'ffmpeg': info.version if info else '',
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'preset': preset,
+        'corpus': corpus_digest(files),
+        'runs': runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick',
+                        help='corpus da usare (default: quick)')
+    parser.add_argument('--tasks', nargs='+', choices=list(TASKS),
+                        default=list(TASKS), metavar='CASO',
+                        help=f"casi da eseguire: {', '.join(TASKS)}")
+    parser.add_argument('--runs', type=int, default=1,
+                        help='esecuzioni per caso (viene usata la mediana)')
+    parser.add_argument('--corpus-dir',
+                        help='cartella in cui conservare il corpus generato')
+    parser.add_argument('--json', metavar='FILE',
+                        help='salva i risultati in formato JSON')
+    parser.add_argument('--ffmpeg', default='ffmpeg')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--files-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.ffmpeg, args.files_dir)
+        return
+
+    files = PRESETS[args.preset]
+    results = {}
+    failed = False
+    with tempfile.TemporaryDirectory(prefix='dbprecision_bench_') as tmp_dir:
+        corpus = build_corpus(args.ffmpeg,
+                              args.corpus_dir or os.path.join(tmp_dir, 'corpus'),
+                              files)
+        categories = []
+        for spec, _ in corpus:
+            if spec.category not in categories:
+                categories.append(spec.category)
+
+        print(f"{'caso':>30} {'file':>5} {'audio s':>8} {'tempo s':>8} "
+              f"{'x reale':>8} {'RSS MB':>7} {'ffmpeg':>7} {'temp MB':>8}")
+        for task in args.tasks:
+            for category in categories:
+                subset = [item for item in corpus
+                          if item[0].category == category]
+                audio_seconds = sum(spec.seconds for spec, _ in subset)
+                work_dir = os.path.join(tmp_dir, 'work')
+                stats = median_stats([measure(task, args.ffmpeg, subset,
+                                              work_dir)
+                                      for _ in range(args.runs)])
+                stats['files'] = len(subset)
+                stats['audio_seconds'] = audio_seconds
+                stats['realtime'] = audio_seconds / stats['seconds']
+                name = f'{task}/{category}'
+                results[name] = stats
+
+                flag = ''
+                if stats['errors']:
+                    flag = f"  {stats['errors']:.0f} errori"
+                    failed = True
+                print(f"{name:>30} {len(subset):>5} {audio_seconds:>8.0f} "
+                      f"{stats['seconds']:>8.2f} {stats['realtime']:>8.1f} "
+                      f"{stats['max_rss_mb']:>7.1f} "
+                      f"{stats['ffmpeg_max_rss_mb']:>7.1f} "
+                      f"{stats['temp_peak_mb']:>8.1f}{flag}")
+                for stage, seconds in stats['stages'].items():
+                    print(f"{'':>32}{seconds:>8.2f} s  "
+                          f"{STAGE_LABELS.get(stage, stage)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'format': RESULTS_FORMAT,
+                       'environment': environment(args.ffmpeg, args.preset,
+                                                  files, args.runs),
+                       'results': results}, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
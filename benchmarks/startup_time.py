@@ -0,0 +1,143 @@
+"""Benchmark del tempo di avvio a freddo di GUI e riga di comando.
+
+Ogni caso viene eseguito più volte in un processo nuovo con -X importtime:
+dal rapporto vengono ricavati il tempo degli import che un interprete vuoto
+non esegue e i moduli più lenti. Il tempo reale del processo, al netto
+dell'interprete vuoto, include anche la creazione della finestra nel caso
+gui-window.
+
+Oltre al budget in millisecondi viene controllato che all'avvio non vengano
+caricati moduli pesanti che servono solo più tardi (NumPy, mutagen...), e
+che la riga di comando non importi PyQt6. Il processo termina con codice 1
+se un caso supera il budget o carica un modulo vietato.
+
+Uso:
+    python benchmarks/startup_time.py [--runs 5] [--top 8] [--json FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduli che nessun avvio deve caricare: servono solo durante un lotto
+LAZY_MODULES = ('numpy', 'mutagen', 'sqlite3', 'urllib.request', 'requests',
+                'dbprecision.analysis', 'dbprecision.normalize')
+
+SHOW_WINDOW = (
+    "import sys\n"
+    "from PyQt6.QtWidgets import QApplication\n"
+    "from main import MP3Normalizer\n"
+    "app = QApplication(sys.argv)\n"
+    "window = MP3Normalizer()\n"
+    "window.show()\n"
+    "app.processEvents()\n"
+)
+
+# nome, argomenti dell'interprete, budget di import in ms, moduli vietati.
+# Il budget della GUI comprende la creazione una tantum degli enum di Qt
+# (circa 25 ms), fatta all'import dalla definizione di FileListModel
+CASES = [
+    ('gui', ['-c', 'import main'], 150, LAZY_MODULES),
+    ('gui-window', ['-c', SHOW_WINDOW], 150, LAZY_MODULES),
+    ('cli', ['-m', 'dbprecision', '--help'], 20,
+     LAZY_MODULES + ('PyQt6',)),
+]
+
+
+def parse_importtime(stderr):
+    """Restituisce {modulo: (self µs, cumulativo µs, livello)} dal rapporto."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        self_us, cumulative_us, name = int(fields[0]), int(fields[1]), fields[2]
+        level = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (self_us, cumulative_us, level)
+    return modules
+
+
+def program_import_us(modules, baseline_modules):
+    """Tempo degli import di primo livello che l'interprete vuoto non fa."""
+    return sum(cumulative for module, (_, cumulative, level) in modules.items()
+               if level == 0 and module not in baseline_modules)
+
+
+def run_once(args):
+    """Esegue l'interprete e restituisce (secondi reali, moduli importati)."""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                            cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise Exception(f"{' '.join(args)} terminato con codice "
+                        f"{result.returncode}:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5,
+                        help='esecuzioni per caso (viene usata la mediana)')
+    parser.add_argument('--top', type=int, default=8,
+                        help='moduli più lenti da elencare per caso')
+    parser.add_argument('--json', metavar='FILE',
+                        help='salva i risultati in formato JSON')
+    args = parser.parse_args()
+
+    baseline_runs = [run_once(['-c', 'pass']) for _ in range(args.runs)]
+    baseline_modules = baseline_runs[0][1]
+    baseline_s = statistics.median(t for t, _ in baseline_runs)
+
+    failed = False
+    results = []
+    print(f"{'caso':>11} {'import ms':>10} {'budget':>7} {'reale ms':>9}")
+    for name, case_args, budget_ms, forbidden in CASES:
+        runs = [run_once(case_args) for _ in range(args.runs)]
+        import_ms = statistics.median(
+            program_import_us(m, baseline_modules) for _, m in runs) / 1000
+        wall_ms = (statistics.median(t for t, _ in runs) - baseline_s) * 1000
+        modules = runs[-1][1]
+        loaded = sorted(m for m in forbidden
+                        if m in modules or any(k.startswith(m + '.')
+                                               for k in modules))
+        slowest = sorted(((self_us, module) for module, (self_us, _, _)
+                          in modules.items() if module not in baseline_modules),
+                         reverse=True)[:args.top]
+
+        flag = ''
+        if import_ms > budget_ms:
+            flag = '  > budget'
+            failed = True
+        if loaded:
+            flag += f"  carica {', '.join(loaded)}"
+            failed = True
+        print(f"{name:>11} {import_ms:>10.1f} {budget_ms:>7} "
+              f"{wall_ms:>9.1f}{flag}")
+        for self_us, module in slowest:
+            print(f"{'':>13}{self_us / 1000:>7.1f} ms  {module}")
+
+        results.append({'case': name, 'import_ms': round(import_ms, 2),
+                        'budget_ms': budget_ms, 'wall_ms': round(wall_ms, 2),
+                        'forbidden_loaded': loaded,
+                        'slowest': [[module, self_us] for self_us, module
+                                    in slowest]})
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'runs': args.runs, 'python': sys.version.split()[0],
+                       'cases': results}, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
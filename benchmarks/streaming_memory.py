@@ -0,0 +1,115 @@
+"""Benchmark della memoria di picco della normalizzazione a blocchi.
+
+Genera con ffmpeg file MP3 sintetici di durata crescente (di default 3 minuti,
+30 minuti e 3 ore), li normalizza ciascuno in un processo figlio separato e
+riporta la RSS di picco del processo Python. Con l'elaborazione a blocchi la
+RSS deve restare piatta al crescere della durata; con --whole viene misurata
+anche l'elaborazione del file intero in memoria per confronto.
+
+Uso:
+    python benchmarks/streaming_memory.py [--durations 180 1800 10800]
+        [--block-frames 65536] [--whole] [--ffmpeg PATH]
+
+Richiede un sistema POSIX (modulo resource).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusFile, generate_file  # noqa: E402
+from dbprecision.analysis import (  # noqa: E402
+    DEFAULT_BLOCK_FRAMES, analyze_stream, clip_samples, decode_to_array,
+    encode_from_array, gain_to_target, measure_loudness, normalize_stream)
+
+TARGET_DB = -20.0
+FFMPEG_OPTIONS = ['-b:a', '192k']
+
+
+def generate_input(ffmpeg_cmd, path, duration):
+    """Genera un MP3 stereo di rumore rosa della durata indicata (secondi)."""
+    generate_file(ffmpeg_cmd, CorpusFile(f'input_{duration}', 'long', duration,
+                                         signal='noise'), path)
+
+
+def max_rss_mb():
+    """RSS di picco del processo corrente in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss è in KB su Linux e in byte su macOS
+    if sys.platform == 'darwin':
+        return rss / (1024 * 1024)
+    return rss / 1024
+
+
+def run_child(ffmpeg_cmd, input_path, block_frames):
+    """Normalizza un file nel processo corrente e stampa le misure in JSON."""
+    output_path = input_path + '.out.mp3'
+    start = time.perf_counter()
+    if block_frames > 0:
+        loudness = analyze_stream(ffmpeg_cmd, input_path, block_frames)
+        gain = gain_to_target(TARGET_DB, loudness.rms_db)
+        normalize_stream(ffmpeg_cmd, input_path, gain, FFMPEG_OPTIONS,
+                         output_path, block_frames)
+    else:
+        samples, channels, sample_rate = decode_to_array(ffmpeg_cmd, input_path)
+        loudness = measure_loudness(samples, sample_rate, channels)
+        samples *= gain_to_target(TARGET_DB, loudness.rms_db)
+        clip_samples(samples)
+        encode_from_array(ffmpeg_cmd, samples, sample_rate, channels,
+                          FFMPEG_OPTIONS, output_path)
+    elapsed = time.perf_counter() - start
+    os.unlink(output_path)
+    print(json.dumps({'seconds': elapsed, 'max_rss_mb': max_rss_mb(),
+                      'duration': loudness.duration}))
+
+
+def measure(ffmpeg_cmd, input_path, block_frames):
+    """Esegue run_child in un nuovo processo e restituisce le misure."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', input_path,
+         '--block-frames', str(block_frames), '--ffmpeg', ffmpeg_cmd],
+        check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--durations', type=int, nargs='+',
+                        default=[180, 1800, 10800],
+                        help='durate dei file di prova in secondi')
+    parser.add_argument('--block-frames', type=int,
+                        default=DEFAULT_BLOCK_FRAMES)
+    parser.add_argument('--whole', action='store_true',
+                        help='misura anche l\'elaborazione del file intero')
+    parser.add_argument('--ffmpeg', default='ffmpeg')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.ffmpeg, args.child, args.block_frames)
+        return
+
+    modes = [('blocchi', args.block_frames)]
+    if args.whole:
+        modes.append(('intero', 0))
+
+    print(f"{'durata':>10} {'modalità':>10} {'RSS MB':>10} {'tempo s':>10}")
+    with tempfile.TemporaryDirectory(prefix='dbprecision_bench_') as tmp_dir:
+        for duration in args.durations:
+            input_path = os.path.join(tmp_dir, f'input_{duration}.mp3')
+            generate_input(args.ffmpeg, input_path, duration)
+            for mode_name, block_frames in modes:
+                stats = measure(args.ffmpeg, input_path, block_frames)
+                print(f"{duration:>9}s {mode_name:>10} "
+                      f"{stats['max_rss_mb']:>10.1f} {stats['seconds']:>10.2f}")
+            os.unlink(input_path)
+
+
+if __name__ == '__main__':
+    main()
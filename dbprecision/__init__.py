@@ -0,0 +1,3 @@
+"""Motore di analisi e normalizzazione di dBPrecision, indipendente dalla GUI."""
+
+__version__ = '1.5.0'
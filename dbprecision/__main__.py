@@ -0,0 +1,11 @@
+"""Avvio della riga di comando con python -m dbprecision."""
+import sys
+
+from dbprecision.cli import main
+
+if __name__ == '__main__':
+    if getattr(sys, 'frozen', False):
+        # Necessario per il pool di processi nell'eseguibile congelato
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Modalità album: un solo guadagno per tutti i file di un album.
+
+I file vengono raggruppati per cartella (ALBUM_FOLDER) oppure per album e
+artista dell'album nei tag ID3 (ALBUM_TAG). Senza artista dell'album conta
+anche la cartella, così raccolte omonime di artisti diversi restano
+separate; un file senza tag album resta nell'album della sua cartella.
+
+Il volume dell'album si ricava dalle misure dei singoli file, senza
+conservarne né rileggerne il PCM: per l'RMS si sommano somma dei quadrati e
+numero di campioni, per i LUFS si uniscono gli istogrammi di gating delle
+finestre da 400 ms (vedi dbprecision.loudness.gating_histogram) e il gate
+relativo si applica all'album intero, come se i brani fossero un unico
+file. Il picco dell'album è il più alto tra quelli dei brani.
+
+Le misure mancanti (file non ancora analizzati o misurati con i filtri di
+ffmpeg, che non danno l'istogramma) vengono calcolate in parallelo con il
+motore NumPy, riusando e aggiornando la cache delle analisi.
+"""
+import os
+
+from mutagen.id3 import ID3
+
+from dbprecision.analysis import (AnalysisOptions, analyze_mp3_group,
+                                  db_from_mean_square, group_analysis_jobs)
+from dbprecision.cache import file_stamp
+from dbprecision.journal import read_marker
+from dbprecision.loudness import histogram_loudness
+from dbprecision.normalize import measurement_is_current
+from dbprecision.options import ALBUM_TAG, BACKEND_NUMPY, METRIC_LUFS
+from dbprecision.parallel import WorkerCrashed
+
+
+def _tag_text(tags, frame_id):
+    frame = tags.get(frame_id) if tags is not None else None
+    if frame is None or not frame.text:
+        return ''
+    return str(frame.text[0]).strip()
+
+
+def album_name(file_path, grouping):
+    """Nome dell'album del file secondo il raggruppamento (ALBUM_*).
+
+    Due file con lo stesso nome appartengono allo stesso album.
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    if grouping == ALBUM_TAG:
+        try:
+            tags = ID3(file_path)
+        except Exception:
+            tags = None
+        album = _tag_text(tags, 'TALB')
+        if album:
+            artist = _tag_text(tags, 'TPE2')
+            if artist:
+                return f"{artist} - {album}"
+            return f"{album} ({folder})"
+    return folder
+
+
+def has_album_data(file_path, measurement, metric):
+    """True se la misura è valida e basta per il volume di un album."""
+    if not measurement_is_current(file_path, measurement, metric):
+        return False
+    loudness = measurement[0]
+    if metric == METRIC_LUFS:
+        return loudness.loudness_histogram is not None
+    return loudness.n_samples > 0
+
+
+class AlbumLoudness:
+    """Volume di un album combinato dalle misure (LoudnessResult) dei file."""
+
+    def __init__(self):
+        self.files = 0
+        self.duration = 0.0
+        self.sum_squares = 0.0
+        self.n_samples = 0
+        self.peak = 0.0  # True peak se misurato, altrimenti picco (lineare)
+        self._histogram = {}  # Classe di gating -> finestre
+
+    def add(self, loudness):
+        self.files += 1
+        self.duration += loudness.duration
+        self.sum_squares += loudness.sum_squares
+        self.n_samples += loudness.n_samples
+        self.peak = max(self.peak, loudness.highest_peak)
+        for index, count in loudness.loudness_histogram or ():
+            self._histogram[index] = self._histogram.get(index, 0) + count
+
+    def level(self, metric):
+        """Volume dell'album (dB RMS o LUFS), o None senza misure."""
+        if self.files == 0:
+            return None
+        if metric == METRIC_LUFS:
+            return histogram_loudness(sorted(self._histogram.items()))
+        if self.n_samples == 0:
+            return None
+        return db_from_mean_square(self.sum_squares / self.n_samples)
+
+
+class AlbumGain:
+    """Guadagno comune di un album, passato alla normalizzazione dei suoi file."""
+
+    __slots__ = ('name', 'gain_db', 'peak', 'files')
+
+    def __init__(self, name, gain_db, peak, files):
+        self.name = name
+        self.gain_db = gain_db  # Guadagno applicato a ogni file (dB)
+        self.peak = peak  # Picco più alto tra i file misurati (lineare)
+        self.files = files  # Numero di file dell'album nel lotto
+
+
+def _marker_gain(file_path):
+    try:
+        return float(read_marker(file_path)['gain_db'])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+def album_gains(entries, options, measurements):
+    """Guadagno comune di ogni album: {percorso: AlbumGain}.
+
+    entries è una sequenza di (percorso normalizzato, già normalizzato). Se
+    un file dell'album è già normalizzato (lotto ripreso) vale il guadagno
+    scritto nel suo marcatore, così i file rimasti ricevono lo stesso;
+    altrimenti quello che porta il volume dell'album a options.target_db.
+    Gli album senza misure non compaiono nel risultato.
+    """
+    groups = {}
+    for path, done in entries:
+        groups.setdefault(album_name(path, options.album), []).append(
+            (path, done))
+    gains = {}
+    for name, files in groups.items():
+        album = AlbumLoudness()
+        gain_db = None
+        for path, done in files:
+            if done:
+                if gain_db is None:
+                    gain_db = _marker_gain(path)
+                continue
+            measurement = measurements.get(path)
+            if has_album_data(path, measurement, options.metric):
+                album.add(measurement[0])
+        if gain_db is None:
+            level = album.level(options.metric)
+            if level is None:
+                continue
+            gain_db = options.target_db - level
+        gain = AlbumGain(name, gain_db, album.peak, len(files))
+        for path, _ in files:
+            gains[path] = gain
+    return gains
+
+
+def missing_measurements(items, metric, measurements, cache=None):
+    """(chiave, percorso) dei file senza una misura utilizzabile per l'album.
+
+    items è una sequenza di (chiave, percorso); le voci della cache che
+    bastano entrano in measurements (percorso normalizzato ->
+    (LoudnessResult, file_stamp)).
+    """
+    missing = []
+    for key, file_path in items:
+        path = os.path.normpath(file_path)
+        if has_album_data(path, measurements.get(path), metric):
+            continue
+        cached = cache.get(path) if cache else None
+        if cached:
+            try:
+                measurement = (cached[0], file_stamp(path))
+            except OSError:
+                measurement = None
+            if has_album_data(path, measurement, metric):
+                measurements[path] = measurement
+                continue
+        missing.append((key, file_path))
+    return missing
+
+
+def measure_files(jobs, options, measurements, runner, on_measured,
+                  on_event, is_cancelled, cache=None, on_poll=None):
+    """Misura in parallelo i file di jobs ((chiave, percorso)) per gli album.
+
+    Ogni misura riuscita entra in measurements e nella cache;
+    on_measured(chiave, errore) viene chiamata per ogni file, con errore
+    vuoto se la misura è riuscita; on_poll viene passata a runner.run. Se un
+    processo del pool muore, i file rimasti ricevono l'errore in
+    on_measured. Restituisce False se annullata.
+    """
+    analysis_options = AnalysisOptions(
+        options.use_pipes, options.block_frames, options.ffmpeg_cmd,
+        options.metric, BACKEND_NUMPY)
+    paths = dict(jobs)
+    # Stato dei file all'avvio della misura, come nell'analisi
+    stamps = {}
+
+    def on_start(keys):
+        for key in keys:
+            try:
+                stamps[key] = file_stamp(paths[key])
+            except OSError:
+                stamps[key] = None
+
+    def on_result(keys, results):
+        for key, (loudness, bitrate_kbps, error) in zip(keys, results):
+            stamp = stamps.pop(key, None)
+            if loudness is not None and stamp is not None:
+                measurements[os.path.normpath(paths[key])] = (loudness, stamp)
+                if cache:
+                    cache.put(paths[key], loudness, bitrate_kbps)
+            on_measured(key, error)
+
+    try:
+        return runner.run(analyze_mp3_group,
+                          group_analysis_jobs(jobs, analysis_options),
+                          on_result, on_event, is_cancelled, on_start,
+                          on_poll)
+    except WorkerCrashed as e:
+        for keys in e.keys:
+            for key in keys:
+                on_measured(key, str(e))
+        return True
@@ -0,0 +1,850 @@
+"""Analisi del volume dei file audio, senza dipendenze da PyQt6.
+
+Il modulo raccoglie la decodifica tramite ffmpeg, la lettura/scrittura dei
+WAV e il calcolo vettorizzato del livello RMS (e, su richiesta, della
+loudness BS.1770 tramite dbprecision.loudness) usati sia dall'analisi sia
+dalla normalizzazione.
+
+Le funzioni a blocchi e il passaggio unico di ffmpeg accettano un
+StageTimer (vedi dbprecision.timing) e una callback on_progress(frazione):
+l'avanzamento segue i frame effettivamente decodificati o, quando il PCM
+non passa da Python, l'uscita -progress di ffmpeg.
+"""
+import os
+import struct
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+from mutagen.mp3 import MP3
+
+from dbprecision.loudness import LoudnessMeter
+from dbprecision.options import (  # noqa: F401 (reesportati)
+    ANALYSIS_CANCELLED, BACKEND_FFMPEG, BACKEND_NUMPY, DEFAULT_BLOCK_FRAMES,
+    METRIC_LUFS, METRIC_RMS, AnalysisOptions)
+
+
+# Codici di formato del chunk 'fmt ' dei file WAV
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Numero di campioni elaborati per volta nel calcolo della somma dei quadrati
+SUM_SQUARES_CHUNK = 1 << 20
+
+# Dimensione delle letture dalla pipe di ffmpeg
+PIPE_READ_SIZE = 1 << 20
+
+# Intervallo massimo tra due controlli dell'annullamento mentre si attende
+# ffmpeg: un processo annullato viene terminato entro questo tempo
+CANCEL_POLL_INTERVAL = 0.1
+
+# Campioni elaborati tra due controlli dell'annullamento quando un file
+# intero è in memoria (measure_loudness, amplify)
+CANCEL_CHUNK_SAMPLES = 1 << 22
+
+
+def read_wav(path):
+    """Legge un file WAV PCM intero (8/16/24/32 bit) o float (32/64 bit).
+
+    Restituisce (n_channels, sampwidth, framerate, is_float, frames) dove
+    frames sono i byte grezzi del chunk 'data'. Il modulo wave della libreria
+    standard non gestisce i WAV float, per questo i chunk vengono letti a mano.
+    """
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise Exception(f"File WAV non valido: {path}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise Exception(f"Chunk 'data' non trovato in {path}")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if chunk_size % 2:
+                    f.read(1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise Exception(f"Chunk 'fmt ' mancante in {path}")
+                frames = f.read(chunk_size)
+                break
+            else:
+                f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+    format_tag, n_channels, framerate, _, _, bits = struct.unpack(
+        '<HHIIHH', fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # Il sottoformato è nei primi due byte del GUID
+        format_tag = struct.unpack('<H', fmt[24:26])[0]
+
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise Exception(f"Formato WAV non supportato ({format_tag})")
+
+    sampwidth = bits // 8
+    # Scarta un eventuale frame incompleto alla fine del chunk
+    frame_size = sampwidth * n_channels
+    frames = frames[:len(frames) - len(frames) % frame_size]
+    return n_channels, sampwidth, framerate, format_tag == WAVE_FORMAT_IEEE_FLOAT, frames
+
+
+def write_wav(path, frames, n_channels, sampwidth, framerate, is_float=False):
+    """Scrive un file WAV PCM intero o float con i byte già codificati."""
+    format_tag = WAVE_FORMAT_IEEE_FLOAT if is_float else WAVE_FORMAT_PCM
+    block_align = n_channels * sampwidth
+    fmt = struct.pack('<HHIIHH', format_tag, n_channels, framerate,
+                      framerate * block_align, block_align, sampwidth * 8)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sI4s', b'RIFF',
+                4 + (8 + len(fmt)) + (8 + len(frames)), b'WAVE'))
+        f.write(struct.pack('<4sI', b'fmt ', len(fmt)) + fmt)
+        f.write(struct.pack('<4sI', b'data', len(frames)))
+        f.write(frames)
+
+
+def pcm_to_float(frames, sampwidth, is_float=False):
+    """Converte i byte PCM in un array NumPy float normalizzato tra -1 e 1.
+
+    Per 8/16/24 bit si usa float32, per 32 bit intero e 64 bit float si usa
+    float64 per non perdere risoluzione. L'array restituito è sempre una copia
+    scrivibile, così i passaggi successivi possono lavorare in place.
+    """
+    if is_float:
+        if sampwidth == 4:
+            return np.frombuffer(frames, dtype='<f4').astype(np.float32)
+        if sampwidth == 8:
+            return np.frombuffer(frames, dtype='<f8').astype(np.float64)
+        raise Exception(f"Larghezza campione float non supportata: {sampwidth}")
+
+    if sampwidth == 1:
+        # I WAV a 8 bit sono senza segno, centrati su 128
+        samples = np.frombuffer(frames, dtype=np.uint8).astype(np.float32)
+        samples -= 128.0
+        samples *= 1.0 / 128.0
+    elif sampwidth == 2:
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32)
+        samples *= 1.0 / 32768.0
+    elif sampwidth == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = raw[:, 0].astype(np.int32)
+        ints |= raw[:, 1].astype(np.int32) << 8
+        ints |= raw[:, 2].astype(np.int32) << 16
+        # Estensione del segno dal bit 23
+        ints <<= 8
+        ints >>= 8
+        samples = ints.astype(np.float32)
+        samples *= 1.0 / 8388608.0
+    elif sampwidth == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float64)
+        samples *= 1.0 / 2147483648.0
+    else:
+        raise Exception(f"Larghezza campione non supportata: {sampwidth}")
+    return samples
+
+
+def float_to_pcm(samples, sampwidth, is_float=False):
+    """Limita i campioni tra -1 e 1 e li riconverte in byte PCM.
+
+    L'array in ingresso viene modificato in place.
+    """
+    np.clip(samples, -1.0, 1.0, out=samples)
+
+    if is_float:
+        return samples.astype('<f4' if sampwidth == 4 else '<f8').tobytes()
+
+    if sampwidth == 1:
+        samples *= 127.0
+        samples += 128.0
+        return samples.astype(np.uint8).tobytes()
+    if sampwidth == 2:
+        samples *= 32767.0
+        return samples.astype('<i2').tobytes()
+    if sampwidth == 3:
+        samples *= 8388607.0
+        ints = samples.astype('<i4')
+        return ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    if sampwidth == 4:
+        samples *= 2147483647.0
+        return samples.astype('<i4').tobytes()
+    raise Exception(f"Larghezza campione non supportata: {sampwidth}")
+
+
+def sum_of_squares_and_peak(samples):
+    """Restituisce (somma dei quadrati, picco assoluto) calcolati a blocchi."""
+    total = 0.0
+    peak = 0.0
+    for start in range(0, len(samples), SUM_SQUARES_CHUNK):
+        block = samples[start:start + SUM_SQUARES_CHUNK].astype(
+            np.float64, copy=False)
+        total += float(np.dot(block, block))
+        peak = max(peak, float(np.max(np.abs(block))))
+    return total, peak
+
+
+def db_from_mean_square(mean_square):
+    """Converte un valore quadratico medio in dB RMS."""
+    return float(20 * np.log10(np.sqrt(mean_square) + 1e-10))
+
+
+def gain_to_target(target_db, current_db):
+    """Guadagno lineare necessario per portare current_db a target_db."""
+    return 10 ** ((target_db - current_db) / 20.0)
+
+
+class LoudnessResult:
+    """Risultato dell'analisi del volume di un file audio.
+
+    lufs, loudness_range e true_peak valgono None se l'analisi non ha
+    calcolato le misure BS.1770 (metrica METRIC_RMS). sum_squares,
+    n_samples e loudness_histogram (l'istogramma di gating di
+    dbprecision.loudness, None con i filtri di ffmpeg) permettono di
+    combinare le misure di più file nel volume di un album.
+    """
+
+    __slots__ = ('rms_db', 'peak', 'sample_rate', 'channels', 'duration',
+                 'sum_squares', 'n_samples', 'lufs', 'loudness_range',
+                 'true_peak', 'loudness_histogram')
+
+    def __init__(self, rms_db, peak, sample_rate, channels, duration,
+                 sum_squares=0.0, n_samples=0, lufs=None, loudness_range=None,
+                 true_peak=None, loudness_histogram=None):
+        self.rms_db = rms_db
+        self.peak = peak
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.duration = duration
+        self.sum_squares = sum_squares
+        self.n_samples = n_samples
+        self.lufs = lufs
+        self.loudness_range = loudness_range
+        self.true_peak = true_peak
+        self.loudness_histogram = loudness_histogram
+
+    @property
+    def peak_db(self):
+        """Picco assoluto espresso in dBFS."""
+        return float(20 * np.log10(self.peak + 1e-10))
+
+    @property
+    def true_peak_db(self):
+        """True peak in dBTP, oppure None se non calcolato."""
+        if self.true_peak is None:
+            return None
+        return float(20 * np.log10(self.true_peak + 1e-10))
+
+    @property
+    def highest_peak(self):
+        """True peak se calcolato, altrimenti picco dei campioni (lineare)."""
+        return self.true_peak if self.true_peak is not None else self.peak
+
+    def level(self, metric):
+        """Volume secondo la metrica indicata (dB RMS o LUFS), o None."""
+        if metric == METRIC_LUFS:
+            return self.lufs
+        return self.rms_db
+
+    def to_dict(self):
+        """Rappresentazione serializzabile in JSON."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Ricostruisce un risultato da to_dict (le chiavi sconosciute sono ignorate)."""
+        return cls(**{name: data[name] for name in cls.__slots__
+                      if name in data})
+
+    def __repr__(self):
+        lufs = f", lufs={self.lufs:.2f}" if self.lufs is not None else ''
+        return (f"LoudnessResult(rms_db={self.rms_db:.2f}, peak={self.peak:.4f}{lufs}, "
+                f"sample_rate={self.sample_rate}, channels={self.channels}, "
+                f"duration={self.duration:.2f})")
+
+
+class LoudnessAccumulator:
+    """Accumula somma dei quadrati e picco di blocchi successivi di campioni.
+
+    Permette di misurare il volume di un flusso di lunghezza arbitraria
+    mantenendo in memoria un solo blocco alla volta. Con METRIC_LUFS gli
+    stessi blocchi alimentano anche un LoudnessMeter BS.1770.
+    """
+
+    def __init__(self, sample_rate, channels, metric=METRIC_RMS):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sum_squares = 0.0
+        self.peak = 0.0
+        self.n_samples = 0
+        self.meter = None
+        if metric == METRIC_LUFS:
+            self.meter = LoudnessMeter(sample_rate, channels)
+
+    def add(self, samples):
+        """Aggiunge un blocco di campioni interlacciati tra -1 e 1."""
+        total, peak = sum_of_squares_and_peak(samples)
+        self.sum_squares += total
+        self.peak = max(self.peak, peak)
+        self.n_samples += len(samples)
+        if self.meter is not None:
+            self.meter.add(samples)
+
+    def result(self):
+        """Restituisce il LoudnessResult dei campioni accumulati."""
+        if self.n_samples == 0:
+            raise Exception("Impossibile leggere i dati audio")
+
+        lufs = loudness_range = true_peak = histogram = None
+        if self.meter is not None:
+            lufs, loudness_range, true_peak = self.meter.result()
+            histogram = self.meter.histogram()
+
+        return LoudnessResult(
+            rms_db=db_from_mean_square(self.sum_squares / self.n_samples),
+            peak=self.peak,
+            sample_rate=self.sample_rate,
+            channels=self.channels,
+            duration=self.n_samples / float(self.channels * self.sample_rate),
+            sum_squares=self.sum_squares,
+            n_samples=self.n_samples,
+            lufs=lufs,
+            loudness_range=loudness_range,
+            true_peak=true_peak,
+            loudness_histogram=histogram)
+
+
+def measure_loudness(samples, sample_rate, channels, metric=METRIC_RMS,
+                     is_cancelled=None):
+    """Calcola RMS e picco di un array di campioni interlacciati tra -1 e 1."""
+    accumulator = LoudnessAccumulator(sample_rate, channels, metric)
+    if is_cancelled is None:
+        accumulator.add(samples)
+        return accumulator.result()
+    # A blocchi, così che l'annullamento non attenda la fine di un file lungo
+    chunk = CANCEL_CHUNK_SAMPLES - CANCEL_CHUNK_SAMPLES % channels
+    for start in range(0, len(samples), chunk):
+        if is_cancelled():
+            raise OperationCancelled()
+        accumulator.add(samples[start:start + chunk])
+    return accumulator.result()
+
+
+def clip_samples(samples):
+    """Limita in place i campioni tra -1 e 1."""
+    np.clip(samples, -1.0, 1.0, out=samples)
+    return samples
+
+
+def amplify(samples, gain_linear, is_cancelled=None):
+    """Applica in place guadagno e limitazione, controllando l'annullamento."""
+    for start in range(0, len(samples), CANCEL_CHUNK_SAMPLES):
+        if is_cancelled is not None and is_cancelled():
+            raise OperationCancelled()
+        chunk = samples[start:start + CANCEL_CHUNK_SAMPLES]
+        chunk *= gain_linear
+        clip_samples(chunk)
+    return samples
+
+
+def audio_info(file_path):
+    """Restituisce (sample_rate, channels, durata in secondi) dall'intestazione MP3."""
+    info = MP3(file_path).info
+    return info.sample_rate, info.channels, info.length
+
+
+def mp3_bitrate_kbps(file_path):
+    """Bitrate (medio per i file VBR) dall'intestazione MP3, in kbps."""
+    return round(MP3(file_path).info.bitrate / 1000)
+
+
+def probe_audio(file_path):
+    """Restituisce (sample_rate, channels) letti dall'intestazione MP3."""
+    return audio_info(file_path)[:2]
+
+
+def _progress_reporter(on_progress, total):
+    """update(fatto) che chiama on_progress(frazione) a ogni punto percentuale."""
+    if on_progress is None or not total:
+        return None
+    last = [-1]
+
+    def update(done):
+        percent = min(100, int(100 * done / total))
+        if percent != last[0]:
+            last[0] = percent
+            on_progress(percent / 100)
+    return update
+
+
+class OperationCancelled(Exception):
+    """Sollevata quando un'elaborazione viene annullata dall'utente."""
+
+
+def _ffmpeg_error(returncode, stderr, stdout=''):
+    """Costruisce l'eccezione per un processo ffmpeg terminato con errore."""
+    error_msg = f"Errore ffmpeg (exit code {returncode})"
+    if stderr:
+        error_msg += f": {stderr}"
+    if stdout:
+        error_msg += f" | stdout: {stdout}"
+    return Exception(error_msg)
+
+
+def _decoder_cmd(ffmpeg_cmd, file_path, sample_rate, channels):
+    """Comando ffmpeg che decodifica in PCM float32 grezzo sullo stdout."""
+    return [ffmpeg_cmd, '-v', 'quiet', '-threads', '0', '-i', file_path,
+            '-vn', '-f', 'f32le', '-acodec', 'pcm_f32le',
+            '-ar', str(sample_rate), '-ac', str(channels), 'pipe:1']
+
+
+def _encoder_cmd(ffmpeg_cmd, sample_rate, channels, ffmpeg_options, output_path):
+    """Comando ffmpeg che codifica in MP3 il PCM float32 letto dallo stdin."""
+    return [ffmpeg_cmd, '-y', '-v', 'error', '-threads', '0',
+            '-f', 'f32le', '-ar', str(sample_rate), '-ac', str(channels),
+            '-i', 'pipe:0', '-f', 'mp3'] + ffmpeg_options + [output_path]
+
+
+def _kill(process):
+    """Termina ffmpeg e ne attende l'uscita, così i file aperti vengono chiusi."""
+    if process.poll() is None:
+        process.kill()
+    process.communicate()
+
+
+def _communicate(process, is_cancelled=None):
+    """process.communicate() che termina ffmpeg se il lavoro viene annullato.
+
+    L'annullamento viene controllato ogni CANCEL_POLL_INTERVAL secondi;
+    il processo viene ucciso e atteso prima di sollevare OperationCancelled.
+    """
+    if is_cancelled is None:
+        return process.communicate()
+    while True:
+        try:
+            return process.communicate(timeout=CANCEL_POLL_INTERVAL)
+        except subprocess.TimeoutExpired:
+            if is_cancelled():
+                _kill(process)
+                raise OperationCancelled()
+        except BaseException:
+            _kill(process)
+            raise
+
+
+def _wait(process, is_cancelled):
+    """process.wait() che termina ffmpeg se il lavoro viene annullato."""
+    while True:
+        try:
+            return process.wait(timeout=CANCEL_POLL_INTERVAL)
+        except subprocess.TimeoutExpired:
+            if is_cancelled():
+                process.kill()
+                process.wait()
+                raise OperationCancelled()
+
+
+def run_ffmpeg(cmd, input_data=None, is_cancelled=None):
+    """Esegue ffmpeg e restituisce gli avvisi scritti su stderr.
+
+    input_data, se presente, viene scritto sullo stdin del processo.
+    Solleva un'eccezione con il messaggio di ffmpeg se il processo fallisce
+    e OperationCancelled, dopo averlo terminato, se is_cancelled() diventa
+    vera (solo senza input_data: vedi encode_from_array).
+    """
+    process = subprocess.Popen(
+        cmd, stdin=subprocess.PIPE if input_data is not None else None,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if input_data is not None:
+        stdout, stderr = process.communicate(input=input_data)
+    else:
+        stdout, stderr = _communicate(process, is_cancelled)
+    stdout = stdout.decode(errors='replace').strip()
+    stderr = stderr.decode(errors='replace').strip()
+    if process.returncode != 0:
+        raise _ffmpeg_error(process.returncode, stderr, stdout)
+    return stderr
+
+
+def decode_to_array(ffmpeg_cmd, file_path, sample_rate=None, channels=None,
+                    is_cancelled=None):
+    """Decodifica un file audio in memoria tramite pipe, senza WAV su disco.
+
+    ffmpeg scrive PCM float32 grezzo sullo stdout; sample rate e canali,
+    se non indicati, vengono letti dall'intestazione MP3 e forzati in uscita
+    perché il PCM grezzo non ha intestazione.
+    Restituisce (campioni float32 interlacciati, channels, sample_rate).
+    """
+    if sample_rate is None or channels is None:
+        sample_rate, channels = probe_audio(file_path)
+
+    cmd = _decoder_cmd(ffmpeg_cmd, file_path, sample_rate, channels)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    buffer = bytearray()
+    completed = False
+    try:
+        while True:
+            if is_cancelled is not None and is_cancelled():
+                raise OperationCancelled()
+            chunk = process.stdout.read(PIPE_READ_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+        completed = True
+    finally:
+        if not completed and process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+    frame_size = 4 * channels
+    del buffer[len(buffer) - len(buffer) % frame_size:]
+    if not buffer:
+        raise Exception("Impossibile leggere i dati audio")
+    # np.frombuffer su un bytearray restituisce un array scrivibile, senza copie
+    return np.frombuffer(buffer, dtype='<f4'), channels, sample_rate
+
+
+def encode_from_array(ffmpeg_cmd, samples, sample_rate, channels,
+                      ffmpeg_options, output_path, is_cancelled=None):
+    """Codifica in MP3 i campioni float passandoli a ffmpeg tramite stdin."""
+    data = memoryview(np.ascontiguousarray(samples, dtype='<f4')).cast('B')
+    cmd = _encoder_cmd(ffmpeg_cmd, sample_rate, channels,
+                       ffmpeg_options, output_path)
+    if is_cancelled is None:
+        return run_ffmpeg(cmd, input_data=data)
+
+    # Scrittura a blocchi: communicate(timeout=...) non riprende a scrivere
+    # l'input dopo un timeout, e l'annullamento va controllato tra i blocchi
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=stderr_file)
+        try:
+            for start in range(0, len(data), PIPE_READ_SIZE):
+                if is_cancelled():
+                    raise OperationCancelled()
+                process.stdin.write(data[start:start + PIPE_READ_SIZE])
+            process.stdin.close()
+        except BrokenPipeError:
+            # L'encoder è terminato: l'errore viene riportato dal codice di uscita
+            pass
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        _wait(process, is_cancelled)
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors='replace').strip()
+
+    if process.returncode != 0:
+        raise _ffmpeg_error(process.returncode, stderr)
+    return stderr
+
+
+def _read_full(stream, buffer):
+    """Riempie buffer dalla pipe e restituisce i byte letti.
+
+    Restituisce meno di len(buffer) byte solo alla fine del flusso.
+    """
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(buffer):
+        n = stream.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def iter_pcm_blocks(ffmpeg_cmd, file_path, sample_rate, channels,
+                    block_frames=DEFAULT_BLOCK_FRAMES, is_cancelled=None,
+                    timer=None):
+    """Decodifica tramite pipe restituendo blocchi di al massimo block_frames frame.
+
+    Il buffer viene riutilizzato tra un blocco e il successivo, quindi ogni
+    blocco va consumato prima di chiedere il prossimo: la memoria occupata
+    dipende solo da block_frames e non dalla durata del file. L'attesa di
+    ogni blocco viene sommata alla fase 'decode' di timer.
+    """
+    cmd = _decoder_cmd(ffmpeg_cmd, file_path, sample_rate, channels)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    frame_size = 4 * channels
+    buffer = bytearray(block_frames * frame_size)
+    completed = False
+    try:
+        while True:
+            if is_cancelled is not None and is_cancelled():
+                raise OperationCancelled()
+            start = time.perf_counter()
+            n_bytes = _read_full(process.stdout, buffer)
+            if timer is not None:
+                timer.add('decode', time.perf_counter() - start)
+            n_bytes -= n_bytes % frame_size
+            if n_bytes:
+                yield np.frombuffer(buffer, dtype='<f4', count=n_bytes // 4)
+            if n_bytes < len(buffer):
+                break
+        completed = True
+    finally:
+        if not completed and process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def analyze_stream(ffmpeg_cmd, file_path, block_frames=DEFAULT_BLOCK_FRAMES,
+                   is_cancelled=None, metric=METRIC_RMS, timer=None,
+                   on_progress=None):
+    """Misura il volume di un file a blocchi, con memoria costante."""
+    sample_rate, channels, duration = audio_info(file_path)
+    accumulator = LoudnessAccumulator(sample_rate, channels, metric)
+    update = _progress_reporter(on_progress, duration * sample_rate * channels)
+    for block in iter_pcm_blocks(ffmpeg_cmd, file_path, sample_rate, channels,
+                                 block_frames, is_cancelled, timer):
+        start = time.perf_counter()
+        accumulator.add(block)
+        if timer is not None:
+            timer.add('analyze', time.perf_counter() - start)
+        if update:
+            update(accumulator.n_samples)
+    return accumulator.result()
+
+
+def normalize_stream(ffmpeg_cmd, file_path, gain_linear, ffmpeg_options,
+                     output_path, block_frames=DEFAULT_BLOCK_FRAMES,
+                     is_cancelled=None, timer=None, on_progress=None):
+    """Secondo passaggio a blocchi: decodifica, guadagno, limitazione e codifica.
+
+    Ogni blocco decodificato viene amplificato, limitato e scritto subito
+    sullo stdin dell'encoder. Restituisce gli avvisi di ffmpeg.
+    """
+    sample_rate, channels, duration = audio_info(file_path)
+    update = _progress_reporter(on_progress, duration * sample_rate * channels)
+    written = 0
+    cmd = _encoder_cmd(ffmpeg_cmd, sample_rate, channels,
+                       ffmpeg_options, output_path)
+
+    # stderr su file temporaneo: una pipe piena bloccherebbe l'encoder
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=stderr_file)
+        try:
+            for block in iter_pcm_blocks(ffmpeg_cmd, file_path, sample_rate,
+                                         channels, block_frames, is_cancelled,
+                                         timer):
+                start = time.perf_counter()
+                block *= gain_linear
+                clip_samples(block)
+                gained = time.perf_counter()
+                process.stdin.write(memoryview(block).cast('B'))
+                if timer is not None:
+                    timer.add('gain', gained - start)
+                    timer.add('encode', time.perf_counter() - gained)
+                written += len(block)
+                if update:
+                    update(written)
+            start = time.perf_counter()
+            process.stdin.close()
+        except BrokenPipeError:
+            # L'encoder è terminato: l'errore viene riportato dal codice di uscita
+            pass
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        returncode = process.wait()
+        if timer is not None:
+            # L'encoder finisce di scrivere gli ultimi frame
+            timer.add('encode', time.perf_counter() - start)
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors='replace').strip()
+
+    if returncode != 0:
+        raise _ffmpeg_error(returncode, stderr)
+    return stderr
+
+
+def run_ffmpeg_progress(cmd, duration, on_progress, is_cancelled=None):
+    """Come run_ffmpeg, con l'avanzamento letto dall'uscita -progress di ffmpeg.
+
+    cmd non deve usare lo stdout; on_progress(frazione) riceve il tempo
+    già elaborato diviso per duration (secondi). L'annullamento viene
+    controllato a ogni riga, che ffmpeg scrive almeno due volte al secondo.
+    """
+    cmd = cmd[:1] + ['-progress', 'pipe:1', '-nostats'] + cmd[1:]
+    update = _progress_reporter(on_progress, duration * 1e6)
+    # stderr su file temporaneo: il ciclo legge solo lo stdout
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=stderr_file)
+        try:
+            for line in process.stdout:
+                if is_cancelled is not None and is_cancelled():
+                    raise OperationCancelled()
+                key, _, value = line.partition(b'=')
+                # out_time_ms è anch'esso in microsecondi (nome storico)
+                if update and key in (b'out_time_us', b'out_time_ms'):
+                    try:
+                        update(int(value))
+                    except ValueError:
+                        pass  # 'N/A' prima del primo frame
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors='replace').strip()
+
+    if returncode != 0:
+        raise _ffmpeg_error(returncode, stderr)
+    return stderr
+
+
+def apply_gain(ffmpeg_cmd, file_path, gain_linear, ffmpeg_options, output_path,
+               duration=None, on_progress=None, is_cancelled=None):
+    """Decodifica, guadagno, limitazione e codifica in un unico processo ffmpeg.
+
+    Usato quando il volume del file è già noto dall'analisi: il PCM non passa
+    da Python. La conversione a 16 bit limita i campioni oltre il fondo scala
+    come clip_samples. Con duration e on_progress l'avanzamento viene letto
+    da ffmpeg. Restituisce gli avvisi di ffmpeg.
+    """
+    cmd = [ffmpeg_cmd, '-y', '-nostdin', '-v', 'error', '-threads', '0',
+           '-i', file_path, '-vn',
+           '-af', f'volume={gain_linear!r}:precision=float,'
+                  'aformat=sample_fmts=s16p',
+           '-f', 'mp3'] + ffmpeg_options + [output_path]
+    if duration and on_progress:
+        return run_ffmpeg_progress(cmd, duration, on_progress, is_cancelled)
+    return run_ffmpeg(cmd, is_cancelled=is_cancelled)
+
+
+def encode_wav(ffmpeg_cmd, wav_path, ffmpeg_options, output_path,
+               duration=None, on_progress=None, is_cancelled=None):
+    """Codifica in MP3 un file WAV."""
+    cmd = [ffmpeg_cmd, '-y', '-nostdin', '-v', 'error', '-threads', '0', '-i',
+           wav_path, '-f', 'mp3'] + ffmpeg_options + [output_path]
+    if duration and on_progress:
+        return run_ffmpeg_progress(cmd, duration, on_progress, is_cancelled)
+    return run_ffmpeg(cmd, is_cancelled=is_cancelled)
+
+
+def decode_to_wav(ffmpeg_cmd, file_path, wav_path, is_cancelled=None):
+    """Decodifica un file audio in WAV tramite ffmpeg."""
+    cmd = [ffmpeg_cmd, '-y', '-nostdin', '-v', 'quiet', '-threads', '0',
+           '-i', file_path, wav_path]
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    _communicate(process, is_cancelled)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+def load_wav_samples(wav_path):
+    """Legge un WAV e restituisce (campioni float, n_channels, sampwidth, framerate, is_float)."""
+    n_channels, sampwidth, framerate, is_float, frames = read_wav(wav_path)
+    if not frames:
+        raise Exception("Impossibile leggere i dati audio")
+    samples = pcm_to_float(frames, sampwidth, is_float)
+    return samples, n_channels, sampwidth, framerate, is_float
+
+
+def analyze_file(file_path, ffmpeg_cmd='ffmpeg', use_pipes=True,
+                 block_frames=0, is_cancelled=None, metric=METRIC_RMS):
+    """Decodifica un file audio e ne misura il volume.
+
+    Con use_pipes il PCM viene letto direttamente dalla pipe di ffmpeg
+    (a blocchi se block_frames è maggiore di zero), altrimenti passa per un
+    WAV temporaneo. Solleva un'eccezione se la decodifica o la lettura non
+    riescono.
+    """
+    if use_pipes and block_frames > 0:
+        return analyze_stream(ffmpeg_cmd, file_path, block_frames,
+                              is_cancelled, metric)
+
+    if use_pipes:
+        samples, n_channels, framerate = decode_to_array(
+            ffmpeg_cmd, file_path, is_cancelled=is_cancelled)
+        return measure_loudness(samples, framerate, n_channels, metric,
+                                is_cancelled)
+
+    fd, tmp_wav = tempfile.mkstemp(suffix='.wav')
+    os.close(fd)
+    try:
+        decode_to_wav(ffmpeg_cmd, file_path, tmp_wav, is_cancelled)
+        if os.path.getsize(tmp_wav) == 0:
+            raise Exception("Impossibile leggere i dati audio")
+        samples, n_channels, _, framerate, _ = load_wav_samples(tmp_wav)
+        return measure_loudness(samples, framerate, n_channels, metric,
+                                is_cancelled)
+    finally:
+        try:
+            os.unlink(tmp_wav)
+        except OSError:
+            pass
+
+
+def analyze_mp3(file_path, options, report=None, is_cancelled=None):
+    """Misura volume e bitrate di un file MP3 senza sollevare eccezioni.
+
+    Pensata per l'esecuzione nel pool di processi: restituisce
+    (LoudnessResult o None, bitrate in kbps o None, messaggio di errore),
+    con messaggio vuoto se l'analisi è riuscita.
+    """
+    try:
+        loudness = analyze_file(file_path, options.ffmpeg_cmd,
+                                options.use_pipes, options.block_frames,
+                                is_cancelled, options.metric)
+    except OperationCancelled:
+        return None, None, ANALYSIS_CANCELLED
+    except Exception as e:
+        return None, None, str(e) or e.__class__.__name__
+
+    try:
+        bitrate_kbps = mp3_bitrate_kbps(file_path)
+    except Exception:
+        bitrate_kbps = None
+    return loudness, bitrate_kbps, ''
+
+
+def analyze_mp3_group(file_paths, options, report=None, is_cancelled=None):
+    """Analizza un gruppo di file e restituisce una tupla di analyze_mp3 per file.
+
+    Con BACKEND_FFMPEG tutto il gruppo viene misurato da un solo processo
+    ffmpeg (vedi dbprecision.filterstats).
+    """
+    if options.backend == BACKEND_FFMPEG:
+        from dbprecision.filterstats import analyze_mp3_filters
+        return analyze_mp3_filters(file_paths, options, report, is_cancelled)
+    return [analyze_mp3(file_path, options, report, is_cancelled)
+            for file_path in file_paths]
+
+
+def group_analysis_jobs(jobs, options):
+    """Raggruppa (chiave, percorso) in lavori per analyze_mp3_group.
+
+    Restituisce una lista di (tupla di chiavi, (tupla di percorsi, options)):
+    un file per lavoro con il motore NumPy, FILTER_BATCH_SIZE con i filtri
+    di ffmpeg.
+    """
+    size = 1
+    if options.backend == BACKEND_FFMPEG:
+        from dbprecision.filterstats import FILTER_BATCH_SIZE
+        size = FILTER_BATCH_SIZE
+    jobs = list(jobs)
+    groups = []
+    for start in range(0, len(jobs), size):
+        keys, paths = zip(*jobs[start:start + size])
+        groups.append((keys, (paths, options)))
+    return groups
@@ -0,0 +1,203 @@
+"""Cache persistente su disco dei risultati dell'analisi.
+
+I risultati sono salvati in un database SQLite nella cartella dati
+dell'utente. Ogni voce è indicizzata dal percorso del file insieme a
+dimensione e data di modifica, e da un hash del contenuto audio che esclude
+i tag ID3: un file rinominato, spostato o con i soli tag modificati viene
+riconosciuto senza essere decodificato di nuovo.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from dbprecision.analysis import LoudnessResult
+from dbprecision.mp3gain import audio_region
+from dbprecision.paths import user_data_dir
+
+CACHE_FILENAME = 'analysis_cache.sqlite3'
+
+# Versione dello schema: se cambia, la cache esistente viene ricreata
+SCHEMA_VERSION = 1
+
+# Numero massimo di voci conservate; le meno usate vengono eliminate
+DEFAULT_MAX_ENTRIES = 200000
+
+# Byte letti in ciascuno dei tre punti campionati per l'hash del contenuto
+HASH_BLOCK_SIZE = 64 * 1024
+
+# Numero di scritture raggruppate in un'unica transazione
+COMMIT_EVERY = 500
+
+
+def file_stamp(path):
+    """Restituisce (dimensione, mtime in ns) del file."""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def content_hash(path):
+    """Hash dei dati audio campionati all'inizio, a metà e alla fine.
+
+    Legge al massimo tre blocchi da HASH_BLOCK_SIZE indipendentemente dalla
+    dimensione del file; la lunghezza dei dati audio fa parte dell'hash.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        start, end = audio_region(f, os.fstat(f.fileno()).st_size)
+        length = end - start
+        digest.update(length.to_bytes(8, 'little'))
+        if length <= 3 * HASH_BLOCK_SIZE:
+            offsets = [start]
+            block_size = length
+        else:
+            offsets = [start, start + (length - HASH_BLOCK_SIZE) // 2,
+                       end - HASH_BLOCK_SIZE]
+            block_size = HASH_BLOCK_SIZE
+        for offset in offsets:
+            f.seek(offset)
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Cache SQLite dei risultati di analyze_mp3.
+
+    Un'istanza va usata dal solo thread che l'ha creata.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path or os.path.join(user_data_dir(), CACHE_FILENAME)
+        self.max_entries = max_entries
+        self._pending_writes = 0
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+
+    def _create_schema(self):
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.execute('DROP TABLE IF EXISTS results')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_hash '
+                           'ON results (content_hash)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_access '
+                           'ON results (last_access)')
+        self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        self._conn.commit()
+
+    @staticmethod
+    def _decode(data):
+        data = json.loads(data)
+        return LoudnessResult.from_dict(data['loudness']), data['bitrate']
+
+    def get(self, path):
+        """Restituisce (LoudnessResult, bitrate in kbps) oppure None.
+
+        Se dimensione e data di modifica coincidono la voce è valida senza
+        leggere il file; altrimenti si confronta l'hash del contenuto audio,
+        così un file con i soli tag modificati resta in cache.
+        """
+        path = os.path.abspath(path)
+        try:
+            size, mtime_ns = file_stamp(path)
+        except OSError:
+            return None
+
+        row = self._conn.execute(
+            'SELECT size, mtime_ns, data FROM results WHERE path = ?',
+            (path,)).fetchone()
+        if row and row[0] == size and row[1] == mtime_ns:
+            self._touch(path)
+            return self._decode(row[2])
+
+        try:
+            digest = content_hash(path)
+        except OSError:
+            return None
+        row = self._conn.execute(
+            'SELECT data FROM results WHERE content_hash = ? LIMIT 1',
+            (digest,)).fetchone()
+        if row is None:
+            return None
+
+        # Stesso audio con nuovo percorso o nuovi tag: aggiorna la voce
+        self._write(path, size, mtime_ns, digest, row[0])
+        return self._decode(row[0])
+
+    def put(self, path, loudness, bitrate_kbps):
+        """Salva il risultato dell'analisi di un file."""
+        path = os.path.abspath(path)
+        try:
+            size, mtime_ns = file_stamp(path)
+            digest = content_hash(path)
+        except OSError:
+            return
+        data = json.dumps({'loudness': loudness.to_dict(),
+                           'bitrate': bitrate_kbps})
+        self._write(path, size, mtime_ns, digest, data)
+
+    def invalidate(self, path):
+        """Rimuove la voce di un file (ad esempio dopo la normalizzazione)."""
+        self._conn.execute('DELETE FROM results WHERE path = ?',
+                           (os.path.abspath(path),))
+        self._maybe_commit()
+
+    def _touch(self, path):
+        self._conn.execute(
+            'UPDATE results SET last_access = ? WHERE path = ?',
+            (time.time(), path))
+        self._maybe_commit()
+
+    def _write(self, path, size, mtime_ns, digest, data):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO results '
+            '(path, size, mtime_ns, content_hash, data, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (path, size, mtime_ns, digest, data, time.time()))
+        self._maybe_commit()
+
+    def _maybe_commit(self):
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def evict(self):
+        """Elimina le voci meno usate oltre max_entries."""
+        self._conn.execute(
+            'DELETE FROM results WHERE path IN ('
+            'SELECT path FROM results ORDER BY last_access DESC '
+            'LIMIT -1 OFFSET ?)', (self.max_entries,))
+        self.commit()
+
+    def purge_missing(self):
+        """Elimina le voci dei file che non esistono più. Restituisce quante."""
+        paths = [row[0] for row in
+                 self._conn.execute('SELECT path FROM results')]
+        missing = [(path,) for path in paths if not os.path.exists(path)]
+        self._conn.executemany('DELETE FROM results WHERE path = ?', missing)
+        self.commit()
+        return len(missing)
+
+    def clear(self):
+        """Svuota la cache."""
+        self._conn.execute('DELETE FROM results')
+        self.commit()
+
+    def close(self):
+        self.commit()
+        self._conn.close()
@@ -0,0 +1,591 @@
+"""Interfaccia a riga di comando di dBPrecision, senza PyQt6.
+
+Uso:
+    python -m dbprecision analyze [opzioni] PERCORSI...
+    python -m dbprecision normalize [--target-db -20] [opzioni] PERCORSI...
+
+I percorsi possono essere file MP3 o cartelle (con --recursive anche le
+sottocartelle, filtrate con --include, --exclude e --max-depth). I risultati
+vanno sullo stdout nel formato scelto con --format (text, json o csv); avvisi
+e avanzamento vanno sullo stderr.
+
+I moduli di elaborazione (NumPy compreso) vengono importati solo quando un
+comando parte, così --help e gli errori sugli argomenti sono immediati.
+
+Codici di uscita:
+    0    tutti i file elaborati correttamente
+    1    almeno un file non è stato elaborato
+    2    argomenti non validi
+    3    ffmpeg non trovato
+    4    nessun file MP3 nei percorsi indicati
+    130  interrotto dall'utente (Ctrl+C)
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import signal
+import sys
+import threading
+
+from dbprecision import __version__
+from dbprecision.options import DEFAULT_TOLERANCE_DB
+
+EXIT_OK = 0
+EXIT_FAILED_FILES = 1
+EXIT_USAGE = 2
+EXIT_NO_FFMPEG = 3
+EXIT_NO_INPUT = 4
+EXIT_INTERRUPTED = 130
+
+# Bitrate di uscita selezionabili e corrispondente quality_value della GUI
+BITRATE_QUALITY = {'192': 0, '256': 1, '320': 2}
+
+ANALYZE_COLUMNS = ('path', 'rms_db', 'peak_db', 'lufs', 'loudness_range',
+                   'true_peak_db', 'duration', 'bitrate_kbps', 'error')
+NORMALIZE_COLUMNS = ('path', 'status')
+
+PLAN_COLUMNS = ('path', 'action', 'gain_db', 'bitrate_kbps', 'duration',
+                'estimate_seconds', 'album')
+
+# Stato dei file già normalizzati da un lotto precedente
+SKIPPED = 'saltato'
+# Stato dei file già entro la tolleranza dal livello richiesto
+AT_TARGET = 'al livello'
+
+
+class _Console:
+    """Messaggi sullo stderr, soppressi con --quiet tranne gli errori."""
+
+    def __init__(self, quiet):
+        self.quiet = quiet
+
+    def info(self, message):
+        if not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    def error(self, message):
+        print(f"errore: {message}", file=sys.stderr, flush=True)
+
+
+def collect_mp3_files(paths, recursive=False, include=(), exclude=(),
+                      max_depth=None):
+    """Espande file e cartelle nella lista dei file da elaborare.
+
+    Restituisce (file trovati, percorsi inesistenti, cartelle illeggibili).
+    I file indicati esplicitamente vengono sempre inclusi; nelle cartelle
+    valgono i glob include/exclude e, senza recursive, solo il primo livello.
+    """
+    from dbprecision.scan import FileScanner
+
+    files = []
+    missing = []
+    errors = []
+    seen = set()
+
+    def add(path):
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+
+    for path in paths:
+        if os.path.isfile(path):
+            add(path)
+        elif os.path.isdir(path):
+            scanner = FileScanner(include, exclude,
+                                  max_depth if recursive else 0)
+            for found in scanner.scan(path):
+                add(found)
+            errors.extend(scanner.errors)
+        else:
+            missing.append(path)
+    return files, missing, errors
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='dbprecision',
+        description='Analisi e normalizzazione del volume di file MP3.')
+    parser.add_argument('--version', action='version',
+                        version=f'%(prog)s {__version__}')
+    commands = parser.add_subparsers(dest='command', required=True,
+                                     metavar='COMANDO')
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('paths', nargs='+', metavar='PERCORSO',
+                        help='file MP3 o cartelle da elaborare')
+    common.add_argument('-r', '--recursive', action='store_true',
+                        help='includi le sottocartelle')
+    common.add_argument('--max-depth', type=int, default=None, metavar='N',
+                        help='livelli di sottocartelle visitati (implica -r)')
+    common.add_argument('--include', action='append', default=[],
+                        metavar='GLOB',
+                        help='file da includere nelle cartelle (predefinito: '
+                             '*.mp3); ripetibile')
+    common.add_argument('--exclude', action='append', default=[],
+                        metavar='GLOB',
+                        help='file o cartelle da escludere; ripetibile')
+    common.add_argument('-j', '--jobs', type=int, default=None,
+                        help='processi paralleli (predefinito: uno per CPU)')
+    common.add_argument('--format', choices=('text', 'json', 'csv'),
+                        default='text', help='formato dei risultati')
+    common.add_argument('--metric', choices=('rms', 'lufs'), default='rms',
+                        help='misura del volume: dB RMS o LUFS (EBU R128)')
+    common.add_argument('--ffmpeg', metavar='PERCORSO',
+                        help='eseguibile ffmpeg (predefinito: ricerca automatica)')
+    common.add_argument('--wav', action='store_true',
+                        help='passa da file WAV temporanei invece delle pipe')
+    common.add_argument('--block-frames', type=int, default=0,
+                        help='frame per blocco a memoria costante (0 = file intero)')
+    common.add_argument('--no-cache', action='store_true',
+                        help='non usare la cache delle analisi')
+    common.add_argument('-q', '--quiet', action='store_true',
+                        help='mostra solo gli errori sullo stderr')
+
+    analyze = commands.add_parser('analyze', parents=[common],
+                                  help='misura volume e bitrate dei file')
+    analyze.add_argument('--backend', choices=('numpy', 'ffmpeg'),
+                         default='numpy',
+                         help='motore di analisi: decodifica con NumPy o '
+                              'filtri astats/ebur128 di ffmpeg, più file '
+                              'per processo (LUFS con un decimale)')
+
+    normalize = commands.add_parser('normalize', parents=[common],
+                                    help='normalizza i file sovrascrivendoli')
+    normalize.add_argument('-t', '--target-db', type=float, default=-20.0,
+                           help='livello di destinazione in dB o LUFS '
+                                '(predefinito: -20)')
+    normalize.add_argument('--mode', choices=('reencode', 'gain', 'tags'),
+                           default='reencode',
+                           help='ricodifica, global_gain senza ricodifica '
+                                'o solo tag ReplayGain')
+    normalize.add_argument('--bitrate', choices=['keep'] + list(BITRATE_QUALITY),
+                           default='keep',
+                           help='bitrate di uscita in kbps, oppure keep per '
+                                'mantenere quello originale')
+    normalize.add_argument('--album', choices=('off', 'folder', 'tag'),
+                           default='off',
+                           help='un guadagno comune per cartella o per album '
+                                'dei tag ID3, calcolato dal volume '
+                                "dell'album intero (predefinito: off, un "
+                                'guadagno per file)')
+    normalize.add_argument('--force', action='store_true',
+                           help='normalizza anche i file già normalizzati '
+                                'con le stesse opzioni (vedi il marcatore '
+                                'TXXX:DBPRECISION)')
+    normalize.add_argument('--tolerance', type=float,
+                           default=DEFAULT_TOLERANCE_DB, metavar='DB',
+                           help='lascia invariati i file già entro DB dal '
+                                'livello misurato in cache (predefinito: '
+                                f'{DEFAULT_TOLERANCE_DB:g})')
+    normalize.add_argument('--dry-run', action='store_true',
+                           help='mostra il piano (azione, guadagno e tempo '
+                                'stimato per file) senza modificare nulla')
+    normalize.add_argument('--timings', metavar='FILE',
+                           help='salva i tempi per fase di ogni file in '
+                                'FILE (CSV se termina con .csv, altrimenti '
+                                'JSON)')
+    return parser
+
+
+def write_rows(rows, columns, output_format, stream):
+    """Scrive i risultati in formato text, json o csv."""
+    if output_format == 'json':
+        json.dump(rows, stream, indent=2, ensure_ascii=False)
+        stream.write('\n')
+        return
+    if output_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=columns,
+                                lineterminator='\n')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: '' if row[key] is None else row[key]
+                             for key in columns})
+        return
+
+    def text(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f'{value:.2f}'
+        return str(value)
+
+    table = [list(columns)] + [[text(row[key]) for key in columns]
+                               for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    for line in table:
+        stream.write('  '.join(cell.ljust(width) for cell, width
+                               in zip(line, widths)).rstrip() + '\n')
+
+
+def _open_cache(args, console):
+    if args.no_cache:
+        return None
+    from dbprecision.cache import AnalysisCache
+    try:
+        return AnalysisCache()
+    except Exception as e:
+        console.info(f"avviso: cache delle analisi non disponibile: {e}")
+        return None
+
+
+def _open_journal(console):
+    from dbprecision.journal import NormalizeJournal
+    try:
+        return NormalizeJournal()
+    except Exception as e:
+        console.info(f"avviso: registro delle normalizzazioni non "
+                     f"disponibile: {e}")
+        return None
+
+
+def _analysis_row(path, loudness, bitrate_kbps, error):
+    row = dict.fromkeys(ANALYZE_COLUMNS)
+    row['path'] = path
+    row['error'] = error or None
+    if loudness is not None:
+        row.update(rms_db=loudness.rms_db, peak_db=loudness.peak_db,
+                   lufs=loudness.lufs, loudness_range=loudness.loudness_range,
+                   true_peak_db=loudness.true_peak_db,
+                   duration=loudness.duration, bitrate_kbps=bitrate_kbps)
+    return row
+
+
+def run_analyze(args, files, ffmpeg_cmd, cancel, console):
+    """Analizza i file; restituisce (righe dei risultati, lotto completo)."""
+    from dbprecision.analysis import (AnalysisOptions, analyze_mp3_group,
+                                      group_analysis_jobs)
+    from dbprecision.parallel import ParallelRunner, WorkerCrashed
+
+    options = AnalysisOptions(not args.wav, args.block_frames, ffmpeg_cmd,
+                              args.metric, args.backend)
+    results = [None] * len(files)
+    cache = _open_cache(args, console)
+    try:
+        jobs = []
+        for index, path in enumerate(files):
+            cached = cache.get(path) if cache else None
+            if cached and cached[0].level(args.metric) is not None:
+                results[index] = (cached[0], cached[1], '')
+            else:
+                jobs.append((index, path))
+        if cache and len(jobs) < len(files):
+            console.info(f"{len(files) - len(jobs)} file letti dalla cache "
+                         "delle analisi")
+
+        done = [len(files) - len(jobs)]
+
+        def on_result(indices, group_results):
+            for index, result in zip(indices, group_results):
+                results[index] = result
+                done[0] += 1
+                loudness, bitrate_kbps, error = result
+                if cache and loudness is not None:
+                    cache.put(files[index], loudness, bitrate_kbps)
+                console.info(f"[{done[0]}/{len(files)}] {files[index]}"
+                             f"{': ' + error if error else ''}")
+
+        def on_event(kind, *data):
+            if kind == 'log':
+                console.info(data[0])
+
+        try:
+            complete = ParallelRunner(args.jobs).run(
+                analyze_mp3_group, group_analysis_jobs(jobs, options),
+                on_result, on_event, cancel.is_set)
+        except WorkerCrashed as e:
+            # I file già analizzati restano nei risultati
+            console.error(str(e))
+            for indices in e.keys:
+                for index in indices:
+                    results[index] = (None, None, str(e))
+            complete = True
+    finally:
+        if cache:
+            cache.close()
+
+    rows = [_analysis_row(path, *result) for path, result
+            in zip(files, results) if result is not None]
+    return rows, complete
+
+
+def _plan_row(item):
+    row = dict.fromkeys(PLAN_COLUMNS)
+    row.update(path=item.path, action=item.action, gain_db=item.gain_db,
+               bitrate_kbps=item.bitrate_kbps, duration=item.duration,
+               estimate_seconds=item.estimate,
+               album=item.album.name if item.album else None)
+    return row
+
+
+def _measure_albums(files, options, measurements, runner, journal, cache,
+                    cancel, console):
+    """Completa le misure dei file per la modalità album.
+
+    Restituisce False se la misura è stata annullata.
+    """
+    from dbprecision.album import measure_files, missing_measurements
+
+    # I file già normalizzati non contano: vale il guadagno del marcatore
+    items = [(index, path) for index, path in enumerate(files)
+             if journal is None or not journal.is_done(path, options)]
+    missing = missing_measurements(items, options.metric, measurements, cache)
+    if not missing:
+        return True
+    console.info(f"{len(missing)} file da misurare per il volume degli album")
+    measured = [0]
+
+    def on_measured(index, error):
+        measured[0] += 1
+        console.info(f"[{measured[0]}/{len(missing)}] misura {files[index]}"
+                     f"{': ' + error if error else ''}")
+
+    def on_event(kind, *data):
+        if kind == 'log':
+            console.info(data[0])
+
+    return measure_files(missing, options, measurements, runner, on_measured,
+                         on_event, cancel.is_set, cache)
+
+
+def run_normalize(args, files, ffmpeg_cmd, cancel, console):
+    """Normalizza i file; restituisce (righe dei risultati, lotto completo).
+
+    Con --dry-run le righe sono il piano del lotto e nessun file viene
+    modificato. Con --album i file senza una misura in cache vengono prima
+    misurati, anche con --dry-run.
+    """
+    from dbprecision.analysis import ANALYSIS_CANCELLED
+    from dbprecision.cache import file_stamp
+    from dbprecision.normalize import NormalizeOptions, normalize_planned
+    from dbprecision.options import ALBUM_OFF
+    from dbprecision.parallel import ParallelRunner, WorkerCrashed
+    from dbprecision.plan import (ACTION_DONE, ACTION_SKIP, AUDIO_ACTIONS,
+                                  EtaTracker,
+                                  ThroughputHistory, format_duration,
+                                  plan_normalization)
+    from dbprecision.timing import RunReport
+
+    keep_bitrate = args.bitrate == 'keep'
+    options = NormalizeOptions(
+        args.target_db, keep_bitrate, BITRATE_QUALITY.get(args.bitrate, 2),
+        not args.wav, args.block_frames, ffmpeg_cmd, args.mode, args.metric,
+        args.tolerance, args.album)
+    runner = ParallelRunner(args.jobs)
+
+    statuses = [None] * len(files)
+    cache = _open_cache(args, console)
+    journal = _open_journal(console)
+    try:
+        # Una misura valida in cache evita la decodifica di analisi e
+        # permette al piano di riconoscere i file già al livello richiesto
+        measurements = {}
+        for path in files:
+            cached = cache.get(path) if cache else None
+            if cached:
+                try:
+                    measurements[os.path.normpath(path)] = (
+                        cached[0], file_stamp(path))
+                except OSError:
+                    pass
+
+        # I file completati da un lotto precedente vengono saltati
+        done_journal = None if args.force else journal
+        # Il guadagno di un album richiede le misure di tutti i suoi file
+        if options.album != ALBUM_OFF and not _measure_albums(
+                files, options, measurements, runner, done_journal, cache,
+                cancel, console):
+            return [], False
+
+        history = ThroughputHistory()
+        plan = plan_normalization(
+            enumerate(files), options, measurements, done_journal,
+            runner.max_workers, history)
+        for line in plan.summary_lines():
+            console.info(line)
+        if args.dry_run:
+            return [_plan_row(item) for item in plan.files], True
+
+        for item in plan.files:
+            if item.action == ACTION_DONE:
+                statuses[item.key] = SKIPPED
+            elif item.action == ACTION_SKIP:
+                statuses[item.key] = AT_TARGET
+        if plan.counts().get(ACTION_DONE):
+            console.info("i file già normalizzati vengono saltati "
+                         "(--force per rielaborarli)")
+
+        # Dal file più lungo: con più processi il lotto finisce prima
+        jobs = [(item.key, (files[item.key], item.key, options,
+                            measurements.get(item.path), item.action,
+                            item.album))
+                for item in plan.pending()]
+        actions = {item.key: item.action for item in plan.files}
+        done = [len(files) - len(jobs)]
+        eta = EtaTracker(plan)
+        # Tempo reale dei file completati, dagli eventi 'timing'
+        seconds = {}
+
+        def on_result(index, success):
+            done[0] += 1
+            eta.file_done(index, seconds.pop(index, None))
+            if success:
+                statuses[index] = 'ok'
+                # Con i soli tag ReplayGain la misura in cache resta valida
+                if cache and actions[index] in AUDIO_ACTIONS:
+                    cache.invalidate(files[index])
+                if journal:
+                    journal.record(files[index], options)
+            elif cancel.is_set():
+                statuses[index] = ANALYSIS_CANCELLED.lower()
+            else:
+                statuses[index] = 'errore'
+            remaining = ''
+            if done[0] < len(files):
+                remaining = (f" (circa {format_duration(eta.remaining_seconds())}"
+                             " rimanenti)")
+            console.info(f"[{done[0]}/{len(files)}] {files[index]}: "
+                         f"{statuses[index]}{remaining}")
+
+        timings = RunReport()
+
+        def on_event(kind, *data):
+            if kind == 'log':
+                console.info(data[0])
+            elif kind == 'timing':
+                timings.add(*data[1:])
+                seconds[data[0]] = sum(data[3].values())
+
+        try:
+            complete = runner.run(normalize_planned, jobs, on_result,
+                                  on_event, cancel.is_set)
+        except WorkerCrashed as e:
+            # I file già normalizzati restano nei risultati
+            console.error(str(e))
+            for index in e.keys:
+                statuses[index] = 'errore'
+            complete = True
+        timings.finish()
+    finally:
+        if cache:
+            cache.close()
+        if journal:
+            journal.close()
+
+    # Le velocità misurate migliorano la stima dei lotti successivi
+    history.update(plan, timings)
+    try:
+        history.save()
+    except OSError:
+        pass
+
+    for line in timings.summary_lines():
+        console.info(line)
+    if args.timings:
+        try:
+            timings.save(args.timings)
+        except OSError as e:
+            console.error(f"impossibile salvare i tempi in {args.timings}: {e}")
+
+    rows = [{'path': path, 'status': status} for path, status
+            in zip(files, statuses) if status is not None]
+    return rows, complete
+
+
+def _install_interrupt_handler(cancel, console):
+    """Il primo Ctrl+C annulla il lotto, il secondo interrompe subito."""
+    def handler(signum, frame):
+        if cancel.is_set():
+            raise KeyboardInterrupt
+        cancel.set()
+        console.info("interruzione richiesta: attendo i file in corso "
+                     "(Ctrl+C di nuovo per uscire subito)")
+    signal.signal(signal.SIGINT, handler)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    console = _Console(args.quiet)
+
+    if args.jobs is not None and args.jobs < 1:
+        console.error("--jobs deve essere almeno 1")
+        return EXIT_USAGE
+    if args.block_frames < 0:
+        console.error("--block-frames non può essere negativo")
+        return EXIT_USAGE
+
+    if getattr(args, 'tolerance', 0) < 0:
+        console.error("--tolerance non può essere negativa")
+        return EXIT_USAGE
+
+    if args.max_depth is not None and args.max_depth < 0:
+        console.error("--max-depth non può essere negativo")
+        return EXIT_USAGE
+
+    files, missing, scan_errors = collect_mp3_files(
+        args.paths, args.recursive or args.max_depth is not None,
+        args.include, args.exclude, args.max_depth)
+    for path in missing:
+        console.error(f"percorso non trovato: {path}")
+    for path, message in scan_errors:
+        console.info(f"avviso: cartella non leggibile {path}: {message}")
+    if not files:
+        console.error("nessun file MP3 trovato")
+        return EXIT_NO_INPUT
+
+    from dbprecision.ffmpeg import ffmpeg_info, find_ffmpeg_executable
+    ffmpeg_cmd = args.ffmpeg or find_ffmpeg_executable()
+    if ffmpeg_cmd:
+        # --ffmpeg accetta anche un nome di comando cercato nel PATH
+        ffmpeg_cmd = shutil.which(ffmpeg_cmd) or (
+            ffmpeg_cmd if os.path.isfile(ffmpeg_cmd) else None)
+    if not ffmpeg_cmd:
+        console.error("ffmpeg non trovato: installalo o indica --ffmpeg")
+        return EXIT_NO_FFMPEG
+    # Versione ed encoder vengono letti una volta e salvati su disco
+    info = ffmpeg_info(ffmpeg_cmd)
+    if info is None:
+        console.error(f"ffmpeg non funzionante: {ffmpeg_cmd}")
+        return EXIT_NO_FFMPEG
+    if args.command == 'normalize' and args.mode == 'reencode' \
+            and not info.can_encode_mp3():
+        console.error(f"ffmpeg {info.version} non include un encoder MP3 "
+                      "(libmp3lame): usa --mode gain o tags")
+        return EXIT_NO_FFMPEG
+    if args.command == 'analyze' and args.backend == 'ffmpeg':
+        from dbprecision.options import BACKEND_FFMPEG_FILTERS
+        required = BACKEND_FFMPEG_FILTERS[args.metric]
+        if not info.has_filters(required):
+            console.info(f"avviso: ffmpeg {info.version} non ha i filtri "
+                         f"{', '.join(required)}: uso il motore numpy")
+            args.backend = 'numpy'
+
+    cancel = threading.Event()
+    _install_interrupt_handler(cancel, console)
+    try:
+        if args.command == 'analyze':
+            rows, complete = run_analyze(args, files, ffmpeg_cmd, cancel,
+                                         console)
+            columns = ANALYZE_COLUMNS
+            failed = any(row['error'] for row in rows)
+        else:
+            rows, complete = run_normalize(args, files, ffmpeg_cmd, cancel,
+                                           console)
+            if args.dry_run:
+                columns = PLAN_COLUMNS
+                failed = False
+            else:
+                columns = NORMALIZE_COLUMNS
+                failed = any(row['status'] not in ('ok', SKIPPED, AT_TARGET)
+                             for row in rows)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+    write_rows(rows, columns, args.format, sys.stdout)
+    if not complete or cancel.is_set():
+        return EXIT_INTERRUPTED
+    if failed or missing:
+        return EXIT_FAILED_FILES
+    return EXIT_OK
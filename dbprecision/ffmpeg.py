@@ -0,0 +1,184 @@
+"""Ricerca dell'eseguibile ffmpeg, condivisa da GUI e riga di comando.
+
+Il percorso viene cercato una sola volta per sessione. Versione, encoder e
+filtri disponibili vengono letti da ffmpeg alla prima richiesta e salvati in
+un file JSON nella cartella dati dell'utente: la voce vale finché dimensione
+e data di modifica dell'eseguibile non cambiano, quindi i controlli
+successivi non avviano alcun processo.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+PROBE_FILENAME = 'ffmpeg_probe.json'
+
+# Versione del formato del file JSON: se cambia, le voci vengono rilette
+PROBE_VERSION = 1
+
+PROBE_TIMEOUT = 10  # Secondi concessi a ciascuna interrogazione di ffmpeg
+
+# Encoder con cui ffmpeg può scrivere l'MP3 della ricodifica (-f mp3)
+MP3_ENCODERS = ('libmp3lame', 'libshine')
+
+_UNSET = object()
+_found_path = _UNSET  # Percorso trovato in questa sessione (anche None)
+_probed = {}  # Percorso reale -> (stamp, FfmpegInfo), per questa sessione
+
+
+def _search_ffmpeg():
+    # Prima cerca nella cartella del programma (Windows)
+    if sys.platform == "win32":
+        app_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+        ffmpeg_path = os.path.join(app_dir, "ffmpeg", "bin", "ffmpeg.exe")
+        if os.path.exists(ffmpeg_path):
+            return ffmpeg_path
+
+    # Per Linux/macOS, cerca nella home dell'utente
+    else:
+        ffmpeg_path = os.path.join(
+            os.path.expanduser("~"), "ffmpeg", "bin", "ffmpeg")
+        if os.path.exists(ffmpeg_path):
+            return ffmpeg_path
+
+    # Quindi cerca nel PATH di sistema, senza avviare where/which
+    return shutil.which('ffmpeg')
+
+
+def find_ffmpeg_executable(refresh=False):
+    """Trova il percorso dell'eseguibile ffmpeg, oppure None.
+
+    Il risultato viene riusato per tutta la sessione; refresh=True (per
+    esempio dopo averlo scaricato) ripete la ricerca.
+    """
+    global _found_path
+    if refresh or _found_path is _UNSET or (
+            _found_path and not os.path.exists(_found_path)):
+        _found_path = _search_ffmpeg()
+    return _found_path
+
+
+class FfmpegInfo:
+    """Versione e funzionalità di un eseguibile ffmpeg."""
+
+    __slots__ = ('path', 'version', 'encoders', 'filters')
+
+    def __init__(self, path, version='', encoders=(), filters=()):
+        self.path = path
+        self.version = version  # Es. '6.1.1', vuota se sconosciuta
+        self.encoders = frozenset(encoders)
+        self.filters = frozenset(filters)
+
+    def has_encoder(self, name):
+        return name in self.encoders
+
+    def has_filter(self, name):
+        return name in self.filters
+
+    def has_filters(self, names):
+        return all(name in self.filters for name in names)
+
+    def can_encode_mp3(self):
+        return any(name in self.encoders for name in MP3_ENCODERS)
+
+    def to_dict(self):
+        return {'version': self.version, 'encoders': sorted(self.encoders),
+                'filters': sorted(self.filters)}
+
+
+def _binary_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _run_listing(path, option):
+    result = subprocess.run(
+        [path, '-hide_banner', option], stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        errors='replace', timeout=PROBE_TIMEOUT)
+    return result.stdout
+
+
+def _parse_listing(text):
+    """Nomi dalle righe ' FLAGS nome descrizione' di -encoders e -filters."""
+    names = set()
+    for line in text.splitlines():
+        fields = line.split()
+        # Le righe della legenda hanno i flag seguiti da '=' o da '->'
+        if len(fields) >= 3 and fields[1] not in ('=', '->') \
+                and not fields[0].endswith(':'):
+            names.add(fields[1])
+    return names
+
+
+def probe_ffmpeg(path):
+    """Interroga ffmpeg e restituisce un FfmpegInfo (tre processi brevi)."""
+    version_text = _run_listing(path, '-version')
+    match = re.search(r'ffmpeg version (\S+)', version_text)
+    return FfmpegInfo(path, match.group(1) if match else '',
+                      _parse_listing(_run_listing(path, '-encoders')),
+                      _parse_listing(_run_listing(path, '-filters')))
+
+
+def _probe_file():
+    from dbprecision.paths import user_data_dir
+    return os.path.join(user_data_dir(), PROBE_FILENAME)
+
+
+def _load_probes(probe_file):
+    try:
+        with open(probe_file, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != PROBE_VERSION:
+        return {}
+    return data.get('binaries', {})
+
+
+def ffmpeg_info(path):
+    """FfmpegInfo di path, dalla sessione, dal file JSON o interrogando ffmpeg.
+
+    Restituisce None se path non esiste o non è un ffmpeg funzionante.
+    """
+    try:
+        real_path = os.path.realpath(shutil.which(path) or path)
+        stamp = _binary_stamp(real_path)
+    except (OSError, TypeError):
+        return None
+    info = _probed.get(real_path)
+    if info is not None and info[0] == stamp:
+        return info[1]
+
+    probe_file = None
+    binaries = {}
+    try:
+        probe_file = _probe_file()
+        binaries = _load_probes(probe_file)
+    except OSError:
+        pass
+    entry = binaries.get(real_path)
+    if entry and entry.get('stamp') == stamp:
+        info = FfmpegInfo(path, entry['version'], entry['encoders'],
+                          entry['filters'])
+    else:
+        try:
+            info = probe_ffmpeg(path)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if not info.version and not info.encoders:
+            return None
+        if probe_file:
+            binaries[real_path] = dict(info.to_dict(), stamp=stamp)
+            try:
+                tmp_file = probe_file + '.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({'version': PROBE_VERSION,
+                               'binaries': binaries}, f)
+                os.replace(tmp_file, probe_file)
+            except OSError:
+                pass
+    _probed[real_path] = (stamp, info)
+    return info
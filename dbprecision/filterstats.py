@@ -0,0 +1,203 @@
+"""Analisi del volume con i filtri astats ed ebur128 di ffmpeg.
+
+Il PCM non arriva mai in Python: ffmpeg decodifica e misura, e dal suo log
+vengono letti RMS, picco e numero di campioni (astats) e, con METRIC_LUFS,
+loudness integrata, LRA e true peak (ebur128). Un solo processo analizza
+fino a FILTER_BATCH_SIZE file, ognuno con la propria catena di filtri: con
+librerie di clip brevi l'avvio di ffmpeg non domina più il tempo totale.
+
+RMS e picco coincidono con il motore NumPy entro 1e-6 dB; ebur128 stampa
+loudness, LRA e true peak con un decimale, quindi per LUFS l'accordo è
+entro 0.05 LU, e il suo true peak può risultare qualche decimo di dB più
+alto (vedi benchmarks/filter_backend.py).
+"""
+import re
+import subprocess
+
+from mutagen.mp3 import MP3
+
+from dbprecision.analysis import (ANALYSIS_CANCELLED, LoudnessResult,
+                                  OperationCancelled, db_from_mean_square)
+from dbprecision.loudness import SEGMENTS_PER_SECOND, SHORT_TERM_SEGMENTS
+from dbprecision.options import METRIC_LUFS
+
+# File analizzati da un singolo processo ffmpeg
+FILTER_BATCH_SIZE = 16
+
+# Intervallo tra due controlli dell'annullamento mentre ffmpeg lavora
+POLL_INTERVAL = 0.1
+
+# Blocchi da 16384 campioni invece dei frame MP3 da 1152: astats costa
+# meno per campione, e le misure non cambiano
+_ASTATS = ('asetnsamples=n=16384:p=0,astats@f{0}=measure_perchannel=none:'
+           'measure_overall=RMS_level+Peak_level+Number_of_samples')
+_EBUR128 = 'ebur128@f{0}=peak=true:framelog=verbose'
+
+# Righe del log: '[astats@f3 @ 0x...] testo' o continuazioni senza prefisso
+_PREFIX = re.compile(r'^\[(astats|ebur128)@f(\d+) @ [^\]]*\] ?(.*)$')
+_LOG_PREFIX = re.compile(r'^\[[^\]]* @ [^\]]*\]')
+_NUMBER = r'(-?(?:inf|\d+(?:\.\d+)?))'
+_FIELDS = {
+    'astats': (('rms_db', re.compile(r'RMS level dB: ' + _NUMBER)),
+               ('peak_db', re.compile(r'Peak level dB: ' + _NUMBER)),
+               ('frames', re.compile(r'Number of samples: ' + _NUMBER))),
+    'ebur128': (('lufs', re.compile(r'^I:\s+' + _NUMBER + ' LUFS')),
+                ('loudness_range', re.compile(r'^LRA:\s+' + _NUMBER + ' LU')),
+                ('true_peak_db', re.compile(r'^Peak:\s+' + _NUMBER + ' dB'))),
+}
+
+
+def build_command(ffmpeg_cmd, file_paths, metric):
+    """Comando ffmpeg che misura tutti i file con una catena di filtri ciascuno."""
+    cmd = [ffmpeg_cmd, '-nostdin', '-hide_banner', '-nostats', '-v', 'info']
+    chains = []
+    for index, file_path in enumerate(file_paths):
+        cmd += ['-i', file_path]
+        chain = _ASTATS.format(index)
+        if metric == METRIC_LUFS:
+            chain += ',' + _EBUR128.format(index)
+        chains.append(f'[{index}:a:0]{chain}[o{index}]')
+    cmd += ['-filter_complex', ';'.join(chains)]
+    for index in range(len(file_paths)):
+        cmd += ['-map', f'[o{index}]']
+    # Le uscite vengono scartate: servono solo le statistiche nel log
+    return cmd + ['-c:a', 'pcm_f32le', '-f', 'null', '-']
+
+
+def parse_stats(log, count):
+    """Estrae dal log di ffmpeg un dizionario di misure per ciascun file."""
+    stats = [{} for _ in range(count)]
+    current = None
+    for line in log.splitlines():
+        match = _PREFIX.match(line)
+        if match:
+            current = (match.group(1), int(match.group(2)))
+            text = match.group(3)
+        elif _LOG_PREFIX.match(line):
+            current = None
+            continue
+        else:
+            text = line
+        if current is None or current[1] >= count:
+            continue
+        text = text.strip()
+        for name, pattern in _FIELDS[current[0]]:
+            found = pattern.search(text)
+            if found:
+                stats[current[1]][name] = float(found.group(1))
+    return stats
+
+
+def _mp3_info(file_path):
+    """(sample rate, canali, bitrate in kbps) dall'intestazione, o tre None."""
+    try:
+        info = MP3(file_path).info
+    except Exception:
+        return None, None, None
+    return info.sample_rate, info.channels, round(info.bitrate / 1000)
+
+
+def _loudness_result(stats, sample_rate, channels, metric):
+    frames = stats.get('frames')
+    if not frames or 'rms_db' not in stats or not sample_rate:
+        raise Exception("Impossibile leggere i dati audio")
+    n_samples = int(frames) * channels
+    mean_square = 10 ** (stats['rms_db'] / 10)
+    lufs = loudness_range = true_peak = None
+    if metric == METRIC_LUFS:
+        if 'lufs' not in stats:
+            raise Exception("Loudness non riportata da ffmpeg")
+        lufs = stats['lufs']
+        loudness_range = stats.get('loudness_range')
+        # Con meno di due finestre short-term ebur128 riporta un LRA privo
+        # di senso: come LoudnessMeter, il file non ha dinamica misurabile
+        if frames * SEGMENTS_PER_SECOND < (SHORT_TERM_SEGMENTS + 1) * sample_rate:
+            loudness_range = 0.0
+        true_peak = 10 ** (stats.get('true_peak_db', stats['peak_db']) / 20)
+    return LoudnessResult(
+        rms_db=db_from_mean_square(mean_square),
+        peak=10 ** (stats.get('peak_db', float('-inf')) / 20),
+        sample_rate=sample_rate,
+        channels=channels,
+        duration=frames / float(sample_rate),
+        sum_squares=mean_square * n_samples,
+        n_samples=n_samples,
+        lufs=lufs,
+        loudness_range=loudness_range,
+        true_peak=true_peak)
+
+
+def measure_files(ffmpeg_cmd, file_paths, metric, is_cancelled=None):
+    """Misura i file con un solo processo ffmpeg.
+
+    Restituisce per ogni file (LoudnessResult, bitrate in kbps o None)
+    oppure un'eccezione. Solleva un'eccezione se ffmpeg fallisce (un file
+    illeggibile fa fallire l'intero comando) e OperationCancelled se
+    l'analisi viene annullata.
+    """
+    process = subprocess.Popen(
+        build_command(ffmpeg_cmd, file_paths, metric), stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    while True:
+        try:
+            _, log = process.communicate(timeout=POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            if is_cancelled is not None and is_cancelled():
+                process.kill()
+                process.communicate()
+                raise OperationCancelled()
+    log = log.decode(errors='replace')
+    if process.returncode != 0:
+        lines = [line for line in log.splitlines() if line.strip()]
+        raise Exception(f"Errore ffmpeg (exit code {process.returncode})"
+                        + (f": {lines[-1]}" if lines else ''))
+
+    results = []
+    for stats, file_path in zip(parse_stats(log, len(file_paths)), file_paths):
+        sample_rate, channels, bitrate_kbps = _mp3_info(file_path)
+        try:
+            results.append((_loudness_result(stats, sample_rate, channels,
+                                             metric), bitrate_kbps))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def analyze_mp3_filters(file_paths, options, report=None, is_cancelled=None):
+    """Come analyze_mp3, per un gruppo di file misurati dai filtri di ffmpeg.
+
+    Se il comando unico fallisce, i file vengono ripresi uno alla volta
+    così che un file danneggiato non faccia perdere le misure degli altri.
+    """
+    try:
+        try:
+            measured = measure_files(options.ffmpeg_cmd, file_paths,
+                                     options.metric, is_cancelled)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            if len(file_paths) == 1:
+                measured = [e]
+            else:
+                measured = []
+                for file_path in file_paths:
+                    try:
+                        measured += measure_files(options.ffmpeg_cmd,
+                                                  [file_path], options.metric,
+                                                  is_cancelled)
+                    except OperationCancelled:
+                        raise
+                    except Exception as e:
+                        measured.append(e)
+    except OperationCancelled:
+        return [(None, None, ANALYSIS_CANCELLED)] * len(file_paths)
+
+    results = []
+    for result in measured:
+        if isinstance(result, Exception):
+            results.append((None, None, str(result)
+                            or result.__class__.__name__))
+        else:
+            results.append((*result, ''))
+    return results
@@ -0,0 +1,5 @@
+"""Interfaccia grafica PyQt6 di dBPrecision.
+
+È l'unica parte del pacchetto che importa PyQt6; il resto di dbprecision
+resta utilizzabile senza interfaccia (vedi dbprecision.cli).
+"""
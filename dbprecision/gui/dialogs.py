@@ -0,0 +1,32 @@
+"""Finestre di dialogo della GUI."""
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QDialog, QLabel, QVBoxLayout
+
+from dbprecision import __version__
+
+
+class AboutDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Informazioni su dBPrecision")
+        self.setFixedSize(400, 250)
+
+        layout = QVBoxLayout()
+
+        title = QLabel("<h2>dBPrecision</h2>")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title)
+
+        description = QLabel(
+            f"<p>Versione: {__version__}</p>"
+            "<p>Applicazione per normalizzare il volume dei file MP3 mantenendo la qualità audio originale "
+            "e tutti i metadati (incluse le immagini).</p>"
+            "<p>Per ulteriori informazioni, visita il sito web: https://www.alexis82.it</p>"
+            "<p>Realizzato da: Alessio Abrugiati</p>"
+            "<p>Copyright 2025 dBPrecision. Tutti i diritti riservati.</p>"
+        )
+        description.setWordWrap(True)
+        description.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(description)
+
+        self.setLayout(layout)
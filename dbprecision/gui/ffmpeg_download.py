@@ -0,0 +1,215 @@
+"""Download e installazione di FFmpeg dalla GUI.
+
+Importato solo quando l'utente sceglie il download, così urllib e zipfile
+non pesano sull'avvio dell'applicazione.
+"""
+import os
+import shutil
+import sys
+import urllib.request
+import zipfile
+
+from PyQt6.QtWidgets import (QApplication, QDialog, QLabel, QMessageBox,
+                             QProgressBar, QVBoxLayout)
+
+
+def download_ffmpeg(parent):
+    """Scarica FFmpeg da Internet e lo installa nella cartella prevista."""
+    # Determina la cartella di destinazione prima di tutto
+    if sys.platform == "win32":
+        # Per Windows, la cartella ffmpeg va nella directory principale del software
+        # Otteniamo il percorso del file eseguibile corrente
+        app_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+        dest_dir = os.path.join(app_dir, "ffmpeg")
+    else:
+        # Per Linux e macOS, creiamo la cartella nella home dell'utente
+        dest_dir = os.path.join(os.path.expanduser("~"), "ffmpeg")
+
+    # Crea la cartella ffmpeg e la sua sottocartella bin prima di iniziare
+    os.makedirs(dest_dir, exist_ok=True)
+    os.makedirs(os.path.join(dest_dir, "bin"), exist_ok=True)
+
+    # URL per il download di FFmpeg
+    ffmpeg_url = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
+
+    # Crea una finestra di dialogo con barra di progresso
+    progress_dialog = QDialog(parent)
+    progress_dialog.setWindowTitle("Download FFmpeg")
+    progress_dialog.setFixedSize(400, 100)
+    layout = QVBoxLayout(progress_dialog)
+
+    status_label = QLabel("Inizializzazione download...")
+    layout.addWidget(status_label)
+
+    progress_bar = QProgressBar()
+    progress_bar.setMinimum(0)
+    progress_bar.setMaximum(100)
+    progress_bar.setValue(0)
+    layout.addWidget(progress_bar)
+
+    # Mostra la finestra di dialogo
+    progress_dialog.show()
+    QApplication.processEvents()
+
+    try:
+        # Cartella per il download temporaneo
+        download_dir = os.path.join(
+            os.path.expanduser("~"), "ffmpeg_download")
+        os.makedirs(download_dir, exist_ok=True)
+
+        # Percorso del file zip
+        zip_path = os.path.join(download_dir, "ffmpeg.zip")
+
+        # Funzione per aggiornare il progresso del download
+        def report_progress(block_num, block_size, total_size):
+            if total_size > 0:
+                # Calcola la percentuale di download completata
+                percent = min(
+                    100, int(block_num * block_size * 100 / total_size))
+                status_label.setText(
+                    f"Download in corso: {percent}% completato")
+                progress_bar.setValue(percent)
+                QApplication.processEvents()
+
+        # Scarica il file con callback per il progresso
+        status_label.setText("Download in corso...")
+        QApplication.processEvents()
+        urllib.request.urlretrieve(
+            ffmpeg_url, zip_path, reporthook=report_progress)
+
+        # Aggiorna il messaggio e resetta la barra di progresso per l'estrazione
+        status_label.setText("Estrazione dei file in corso...")
+        progress_bar.setValue(0)
+        QApplication.processEvents()
+
+        # Estrai il file zip
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            # Conta il numero totale di file nell'archivio
+            total_files = len(zip_ref.namelist())
+            extracted_files = 0
+
+            # Estrai i file uno per uno, aggiornando il progresso
+            for file in zip_ref.namelist():
+                zip_ref.extract(file, download_dir)
+                extracted_files += 1
+                percent = min(
+                    100, int(extracted_files * 100 / total_files))
+                progress_bar.setValue(percent)
+                if extracted_files % 10 == 0:  # Aggiorna solo ogni 10 file per performance
+                    status_label.setText(
+                        f"Estrazione in corso: {percent}% completato")
+                    QApplication.processEvents()
+
+        # Cerca i file ffmpeg, ffprobe e ffplay all'interno della cartella estratta
+        ffmpeg_files = []
+        extracted_dir = None
+
+        # Aggiorna stato
+        status_label.setText("Individuazione dei file ffmpeg...")
+        QApplication.processEvents()
+
+        # Trova la directory principale estratta (di solito contiene una sola cartella con tutti i file)
+        for item in os.listdir(download_dir):
+            item_path = os.path.join(download_dir, item)
+            if os.path.isdir(item_path) and item.startswith("ffmpeg"):
+                extracted_dir = item_path
+                break
+
+        if extracted_dir:
+            status_label.setText("Copia dei file in corso...")
+            progress_bar.setValue(0)
+            QApplication.processEvents()
+
+            # Cerchiamo nella cartella bin all'interno della directory estratta
+            bin_dir = os.path.join(extracted_dir, "bin")
+            if os.path.exists(bin_dir):
+                # Conta il numero totale di file da copiare
+                bin_files = [f for f in os.listdir(
+                    bin_dir) if os.path.isfile(os.path.join(bin_dir, f))]
+                total_bin_files = len(bin_files)
+                copied_files = 0
+
+                # Copia tutti i file dalla cartella bin alla cartella di destinazione
+                for file in bin_files:
+                    src_file = os.path.join(bin_dir, file)
+                    dest_file = os.path.join(dest_dir, "bin", file)
+                    shutil.copy2(src_file, dest_file)
+
+                    # Se è un file eseguibile, aggiungi permessi di esecuzione su Linux/macOS
+                    if sys.platform != "win32" and (file.startswith("ff") and not file.endswith(".txt")):
+                        # Aggiungi permessi di esecuzione
+                        os.chmod(dest_file, 0o755)
+
+                    ffmpeg_files.append(dest_file)
+                    copied_files += 1
+                    percent = min(
+                        100, int(copied_files * 100 / total_bin_files))
+                    progress_bar.setValue(percent)
+                    status_label.setText(
+                        f"Copia dei file in corso: {percent}% completato")
+                    QApplication.processEvents()
+
+            # Mostra un messaggio con le istruzioni appropriate
+            if ffmpeg_files:
+                # Completato con successo
+                progress_bar.setValue(100)
+                status_label.setText("Installazione completata!")
+                QApplication.processEvents()
+
+                if sys.platform == "win32":
+                    msg = (
+                        "FFmpeg è stato scaricato e installato in:\n"
+                        f"{dest_dir}\n\n"
+                        "I file ffmpeg sono stati installati nella cartella del programma."
+                    )
+                else:
+                    msg = (
+                        "FFmpeg è stato scaricato e installato in:\n"
+                        f"{dest_dir}\n\n"
+                        "Per utilizzare FFmpeg globalmente, aggiungi questa cartella al tuo PATH:\n"
+                        f"echo 'export PATH=\"$PATH:{os.path.join(dest_dir, 'bin')}\"' >> ~/.bashrc\n"
+                        "e riavvia il terminale.\n\n"
+                        "Oppure puoi utilizzare il percorso completo:\n"
+                        f"{os.path.join(dest_dir, 'bin', 'ffmpeg')}"
+                    )
+                progress_dialog.close()
+                QMessageBox.information(
+                    parent, "Installazione completata", msg)
+            else:
+                progress_dialog.close()
+                QMessageBox.warning(
+                    parent, "Errore", "Impossibile trovare i file ffmpeg nel pacchetto scaricato.")
+        else:
+            progress_dialog.close()
+            QMessageBox.warning(
+                parent, "Errore", "Impossibile trovare la cartella estratta di ffmpeg.")
+
+        # Pulizia: rimuove il file zip scaricato e la cartella temporanea
+        try:
+            status_label.setText("Pulizia dei file temporanei...")
+            QApplication.processEvents()
+
+            if os.path.exists(zip_path):
+                os.remove(zip_path)
+            # Rimuoviamo i file temporanei di estrazione, ma manteniamo quelli nella destinazione finale
+            if sys.platform == "win32":
+                # Su Windows può essere problematico rimuovere file in uso, usiamo shutil
+                shutil.rmtree(download_dir, ignore_errors=True)
+            else:
+                for item in os.listdir(download_dir):
+                    item_path = os.path.join(download_dir, item)
+                    if os.path.isdir(item_path):
+                        shutil.rmtree(item_path, ignore_errors=True)
+        except Exception as e:
+            print(f"Errore durante la pulizia: {str(e)}")
+
+        # Chiude la finestra di dialogo del progresso se ancora aperta
+        if progress_dialog.isVisible():
+            progress_dialog.close()
+
+    except Exception as e:
+        # Assicurati che la finestra di dialogo sia chiusa in caso di errore
+        if progress_dialog.isVisible():
+            progress_dialog.close()
+        QMessageBox.critical(
+            parent, "Errore", f"Si è verificato un errore durante il download:\n{str(e)}")
@@ -0,0 +1,332 @@
+"""Modello della lista dei file per la QTableView della finestra principale.
+
+I dati sono tenuti per colonne: percorsi e nomi in liste, volume, bitrate e
+stato in array NumPy. Ogni file è identificato dal suo indice di inserimento
+(lo stesso della lista passata ai worker), che non cambia con ordinamento e
+filtro: la vista mostra solo la permutazione _order di questi indici.
+
+Gli aggiornamenti dei worker vengono raccolti e notificati alla vista con un
+solo dataChanged ogni FLUSH_INTERVAL_MS, così anche liste da centinaia di
+migliaia di file restano fluide. NumPy viene importato al primo file
+aggiunto, per non rallentare l'avvio della finestra.
+"""
+import os
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer
+
+np = None  # Modulo numpy, caricato da _load_numpy
+
+COLUMN_NAME = 0
+COLUMN_LEVEL = 1
+COLUMN_BITRATE = 2
+COLUMN_STATUS = 3
+HEADERS = ('File MP3', 'Valore dB', 'Bitrate', 'Stato')
+
+# Stati di un file, nell'ordine usato anche per l'ordinamento della colonna
+STATUS_PENDING = 0
+STATUS_ANALYZING = 1
+STATUS_READY = 2
+STATUS_ANALYSIS_ERROR = 3
+STATUS_CANCELLED = 4
+STATUS_NORMALIZING = 5
+STATUS_DONE = 6
+STATUS_ERROR = 7
+STATUS_SKIPPED = 8
+STATUS_AT_TARGET = 9
+STATUS_TEXT = {
+    STATUS_PENDING: 'In attesa di analisi',
+    STATUS_ANALYZING: 'Analisi in corso...',
+    STATUS_READY: 'Pronto per la normalizzazione',
+    STATUS_ANALYSIS_ERROR: 'Errore',
+    STATUS_CANCELLED: 'Annullato',
+    STATUS_NORMALIZING: 'Normalizzazione in corso...',
+    STATUS_DONE: 'Completato',
+    STATUS_ERROR: 'Errore',
+    STATUS_SKIPPED: 'Già normalizzato',
+    STATUS_AT_TARGET: 'Già al livello richiesto',
+}
+
+# Valori di bitrate con significato speciale
+BITRATE_UNKNOWN = -1  # Non ancora analizzato: cella vuota
+BITRATE_NA = 0  # Analisi fallita o annullata: N/D
+
+FLUSH_INTERVAL_MS = 50
+
+_INITIAL_CAPACITY = 1024
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+class FileListModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._sort_column = -1  # -1 = ordine di inserimento
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._filter = ''
+        self._dirty = set()
+        self._reset_columns()
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def _reset_columns(self):
+        self._paths = []
+        self._names = []  # Nome mostrato (percorso relativo alla cartella)
+        self._lower_names = []  # Per filtro e ordinamento senza maiuscole
+        self._messages = {}  # Indice -> messaggio di errore dell'analisi
+        self._count = 0
+        # Array creati al primo inserimento (vedi _ensure_capacity)
+        self._level = None  # dB o LUFS, NaN = non misurato
+        self._is_lufs = None
+        self._bitrate = None  # kbps o BITRATE_*
+        self._status = None  # STATUS_*
+        self._sorted = ()  # Tutti gli indici, nell'ordine della colonna scelta
+        self._order = ()  # Riga della vista -> indice
+        self._position = ()  # Indice -> riga della vista o -1
+        self._dirty.clear()
+
+    # --- Dimensioni e contenuto ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        i = int(self._order[index.row()])
+        column = index.column()
+        if column == COLUMN_NAME:
+            return self._names[i]
+        if column == COLUMN_LEVEL:
+            return self._level_text(i)
+        if column == COLUMN_BITRATE:
+            bitrate = int(self._bitrate[i])
+            if bitrate == BITRATE_UNKNOWN:
+                return ''
+            return f'{bitrate} kbps' if bitrate != BITRATE_NA else 'N/D'
+        status = int(self._status[i])
+        if status == STATUS_ANALYSIS_ERROR:
+            return f"Errore: {self._messages.get(i, '')}"
+        return STATUS_TEXT[status]
+
+    def _level_text(self, i):
+        level = self._level[i]
+        if not np.isnan(level):
+            return f"{level:.2f} {'LUFS' if self._is_lufs[i] else 'dB'}"
+        if self._status[i] == STATUS_ANALYSIS_ERROR:
+            return 'Errore'
+        return 'N/D' if self._bitrate[i] == BITRATE_NA else ''
+
+    # --- Accesso per indice di inserimento ---
+
+    def file_count(self):
+        """Numero di file nella lista, compresi quelli nascosti dal filtro."""
+        return self._count
+
+    def path(self, i):
+        return self._paths[i]
+
+    def name(self, i):
+        return self._names[i]
+
+    def names(self):
+        """Copia dei nomi mostrati, nell'ordine di inserimento."""
+        return list(self._names)
+
+    def jobs(self):
+        """Tupla immutabile di (indice, percorso) di tutti i file, per i worker."""
+        return tuple(enumerate(self._paths))
+
+    def index_at(self, row):
+        """Indice di inserimento del file mostrato alla riga row della vista."""
+        return int(self._order[row])
+
+    # --- Modifica ---
+
+    def clear(self):
+        self.beginResetModel()
+        self._reset_columns()
+        self.endResetModel()
+
+    def append(self, paths, root=None):
+        """Aggiunge i file in fondo; con root il nome è il percorso relativo."""
+        if not paths:
+            return
+        _load_numpy()
+        start = self._count
+        end = start + len(paths)
+        if root:
+            # I percorsi della scansione iniziano già con root: basta tagliarlo
+            prefix = os.path.join(root, '')
+            names = [path[len(prefix):] if path.startswith(prefix)
+                     else os.path.relpath(path, root) for path in paths]
+        else:
+            names = [os.path.basename(path) for path in paths]
+        lower_names = [name.lower() for name in names]
+
+        self._ensure_capacity(end)
+        self._level[start:end] = np.nan
+        self._is_lufs[start:end] = False
+        self._bitrate[start:end] = BITRATE_UNKNOWN
+        self._status[start:end] = STATUS_PENDING
+
+        new = np.arange(start, end, dtype=np.int64)
+        if self._filter:
+            visible = new[np.fromiter((self._filter in name
+                                       for name in lower_names),
+                                      dtype=bool, count=len(new))]
+        else:
+            visible = new
+        first_row = len(self._order)
+        if len(visible):
+            self.beginInsertRows(QModelIndex(), first_row,
+                                 first_row + len(visible) - 1)
+        self._paths.extend(paths)
+        self._names.extend(names)
+        self._lower_names.extend(lower_names)
+        self._count = end
+        # I nuovi file vanno in fondo: l'ordinamento si aggiorna al prossimo clic
+        self._sorted = np.concatenate([self._sorted, new])
+        self._order = np.concatenate([self._order, visible])
+        self._position = np.concatenate(
+            [self._position, np.full(len(new), -1, dtype=np.int64)])
+        self._position[visible] = np.arange(first_row, first_row + len(visible))
+        if len(visible):
+            self.endInsertRows()
+
+    def set_status(self, i, status, message=None):
+        self._status[i] = status
+        if message is not None:
+            self._messages[i] = message
+        self._mark_dirty(i)
+
+    def set_analysis(self, i, level, is_lufs, bitrate_kbps, status,
+                     message=None):
+        """Risultato dell'analisi; level None se il file non è stato misurato."""
+        self._level[i] = np.nan if level is None else level
+        self._is_lufs[i] = is_lufs
+        self._bitrate[i] = BITRATE_NA if bitrate_kbps is None else bitrate_kbps
+        self.set_status(i, status, message)
+
+    def _mark_dirty(self, i):
+        self._dirty.add(i)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """Notifica alla vista in un solo segnale le righe modificate."""
+        if not self._dirty:
+            return
+        indices = np.fromiter(self._dirty, dtype=np.int64,
+                              count=len(self._dirty))
+        self._dirty.clear()
+        rows = self._position[indices]
+        rows = rows[rows >= 0]
+        if len(rows):
+            self.dataChanged.emit(
+                self.index(int(rows.min()), 0),
+                self.index(int(rows.max()), len(HEADERS) - 1))
+
+    def _ensure_capacity(self, size):
+        if self._level is None:
+            self._level = np.empty(0, dtype=np.float64)
+            self._is_lufs = np.empty(0, dtype=bool)
+            self._bitrate = np.empty(0, dtype=np.int32)
+            self._status = np.empty(0, dtype=np.int8)
+            self._sorted = self._order = self._position = np.empty(
+                0, dtype=np.int64)
+        capacity = len(self._level)
+        if size <= capacity:
+            return
+        # Crescita geometrica: aggiungere a lotti resta lineare nel totale
+        capacity = max(size, capacity * 2, _INITIAL_CAPACITY)
+        for name in ('_level', '_is_lufs', '_bitrate', '_status'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    # --- Ordinamento e filtro ---
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._relayout()
+
+    def set_filter(self, text):
+        """Mostra solo i file il cui nome contiene text (senza maiuscole)."""
+        text = text.strip().lower()
+        if text == self._filter:
+            return
+        self._filter = text
+        self._relayout()
+
+    def _sort_keys(self):
+        n = self._count
+        column = self._sort_column
+        if column == COLUMN_NAME:
+            return np.array(self._lower_names, dtype=str)
+        if column == COLUMN_LEVEL:
+            return self._level[:n]
+        if column == COLUMN_BITRATE:
+            return self._bitrate[:n]
+        if column == COLUMN_STATUS:
+            return self._status[:n]
+        return None
+
+    def _relayout(self):
+        if not self._count:
+            return
+        self.flush()
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        persistent_items = [(int(self._order[index.row()]), index.column())
+                            for index in persistent]
+
+        keys = self._sort_keys()
+        if keys is None:
+            order = np.arange(self._count, dtype=np.int64)
+        else:
+            descending = self._sort_order == Qt.SortOrder.DescendingOrder
+            if descending and keys.dtype.kind in 'fi':
+                # I valori mancanti (NaN) restano in fondo anche al contrario
+                order = np.argsort(-keys, kind='stable')
+            else:
+                order = np.argsort(keys, kind='stable')
+                if descending:
+                    order = order[::-1]
+        self._sorted = order.astype(np.int64)
+
+        if self._filter:
+            mask = np.fromiter((self._filter in name
+                                for name in self._lower_names),
+                               dtype=bool, count=self._count)
+            self._order = self._sorted[mask[self._sorted]]
+        else:
+            self._order = self._sorted
+        self._position = np.full(self._count, -1, dtype=np.int64)
+        self._position[self._order] = np.arange(len(self._order))
+
+        new_indexes = []
+        for i, column in persistent_items:
+            row = int(self._position[i])
+            new_indexes.append(self.index(row, column) if row >= 0
+                               else QModelIndex())
+        self.changePersistentIndexList(persistent, new_indexes)
+        self.layoutChanged.emit()
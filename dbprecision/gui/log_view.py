@@ -0,0 +1,71 @@
+"""Area di log della finestra principale.
+
+I messaggi vengono raccolti e aggiunti alla vista in un solo blocco ogni
+LOG_FLUSH_INTERVAL_MS, e la vista conserva al più max_lines righe: anche
+migliaia di messaggi al secondo dai worker non bloccano l'interfaccia.
+Il log completo può essere scritto in parallelo su un file.
+"""
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QPlainTextEdit
+
+DEFAULT_LOG_LINES = 5000
+LOG_FLUSH_INTERVAL_MS = 100
+
+
+class LogView(QPlainTextEdit):
+    def __init__(self, max_lines=DEFAULT_LOG_LINES, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self._pending = []
+        self._log_file = None
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def append(self, text):
+        """Accoda un messaggio (anche di più righe) al log."""
+        self._pending.append(text)
+        if self._log_file:
+            self._log_file.write(text + '\n')
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """Mostra i messaggi in attesa con un solo aggiornamento della vista."""
+        if self._log_file:
+            self._log_file.flush()
+        if not self._pending:
+            return
+        # Le righe oltre il limite verrebbero scartate subito dalla vista
+        pending = self._pending[-self.maximumBlockCount():]
+        self._pending = []
+        self.appendPlainText('\n'.join(pending))
+
+    def toPlainText(self):
+        self.flush()
+        return super().toPlainText()
+
+    def max_lines(self):
+        return self.maximumBlockCount()
+
+    def set_max_lines(self, max_lines):
+        """Righe conservate nella vista; le più vecchie vengono eliminate."""
+        self.flush()
+        self.setMaximumBlockCount(max_lines)
+
+    # --- Copia del log su file ---
+
+    def log_file_path(self):
+        return self._log_file.name if self._log_file else None
+
+    def start_log_file(self, path):
+        """Scrive in coda a path tutti i messaggi da qui in avanti."""
+        self.stop_log_file()
+        self._log_file = open(path, 'a', encoding='utf-8')
+
+    def stop_log_file(self):
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
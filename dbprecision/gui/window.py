@@ -0,0 +1,1296 @@
+"""Finestra principale di dBPrecision."""
+import os
+import subprocess
+import sys
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QAction, QIcon
+from PyQt6.QtWidgets import (
+    QApplication, QCheckBox, QComboBox, QDoubleSpinBox, QFileDialog,
+    QHBoxLayout, QHeaderView, QInputDialog, QLabel, QLineEdit, QMainWindow,
+    QMenu, QMessageBox, QProgressBar, QPushButton, QSlider, QSpinBox,
+    QTableView, QVBoxLayout, QWidget)
+
+from dbprecision.ffmpeg import ffmpeg_info, find_ffmpeg_executable
+from dbprecision.gui.dialogs import AboutDialog
+from dbprecision.gui.file_model import (
+    STATUS_ANALYSIS_ERROR, STATUS_ANALYZING, STATUS_CANCELLED, STATUS_READY,
+    FileListModel)
+from dbprecision.gui.log_view import LogView
+from dbprecision.gui.workers import (AnalysisWorker, NormalizationWorker,
+                                     ScanWorker)
+from dbprecision.options import (
+    ALBUM_FOLDER, ALBUM_OFF, ALBUM_TAG, ANALYSIS_CANCELLED, BACKEND_FFMPEG,
+    BACKEND_FFMPEG_FILTERS, BACKEND_NUMPY, DEFAULT_BLOCK_FRAMES,
+    DEFAULT_TOLERANCE_DB, METRIC_LUFS, METRIC_RMS, MODE_GAIN, MODE_REENCODE,
+    MODE_TAGS, AnalysisOptions, NormalizeOptions)
+from dbprecision.parallel import default_workers
+from dbprecision.scan import DEFAULT_INCLUDE, parse_patterns
+from dbprecision.timing import format_duration
+
+
+class MP3Normalizer(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+
+        # Imposta il focus policy per evitare che la finestra principale riceva focus e input
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+
+        # Imposta l'attributo Qt.WA_TransparentForMouseEvents per impedire eventi del mouse sulla finestra principale
+        # ma questo potrebbe influire anche sui widget figli, quindi non lo usiamo
+
+        # Imposta la finestra come non focalizzabile da mouse
+        self.setAttribute(Qt.WidgetAttribute.WA_MacShowFocusRect, False)
+
+    def keyPressEvent(self, event):
+        # Sovrascrive l'evento di pressione tasti per ignorare l'input da tastiera
+        # nella finestra principale, ma permette che funzioni nei widget come i pulsanti
+        event.ignore()
+
+    def mousePressEvent(self, event):
+        # Sovrascrive l'evento di clic del mouse per evitare che la finestra principale prenda il focus
+        # I widget figli (pulsanti, ecc.) continueranno a ricevere eventi mouse normalmente
+        self.clearFocus()
+        super().mousePressEvent(event)
+
+    def initUI(self):
+        self.setWindowTitle('dBPrecision')
+        self.setWindowIcon(QIcon("icons/dbprecision.png"))
+        self.setGeometry(100, 100, 800, 600)
+
+        # Creazione della barra dei menu
+        menubar = self.menuBar()
+
+        # Determina il colore di sfondo in base al sistema operativo
+        if sys.platform.startswith('win'):
+            # Windows - sfondo chiaro #f0f0f0
+            menubar.setStyleSheet("""
+                QMenuBar {
+                    padding-top: 5px;
+                    padding-bottom: 5px;
+                    background-color: #f0f0f0;
+                }
+                QMenuBar::item {
+                    padding: 5px 10px;
+                    margin: 2px 0px;
+                    background-color: #f0f0f0;
+                }
+            """)
+        else:
+            # Linux - sfondo scuro #3d3d3d (mantiene il colore originale)
+            menubar.setStyleSheet("""
+                QMenuBar {
+                    padding-top: 5px;
+                    padding-bottom: 5px;
+                    background-color: #3d3d3d;
+                }
+                QMenuBar::item {
+                    padding: 5px 10px;
+                    margin: 2px 0px;
+                    background-color: #3d3d3d;
+                }
+            """)
+
+        # Menu File
+        file_menu = menubar.addMenu('&File')
+
+        select_file_action = QAction('Seleziona &File MP3...', self)
+        select_file_action.setShortcut('Ctrl+F')
+        select_file_action.triggered.connect(self.select_file)
+        file_menu.addAction(select_file_action)
+
+        select_folder_action = QAction('Seleziona &Cartella...', self)
+        select_folder_action.setShortcut('Ctrl+D')
+        select_folder_action.triggered.connect(self.select_folder)
+        file_menu.addAction(select_folder_action)
+
+        # Aggiungi azione per cancellare lista
+        clear_list_action = QAction('&Cancella Lista File', self)
+        clear_list_action.setShortcut('Ctrl+R')
+        clear_list_action.triggered.connect(self.clear_file_list)
+        file_menu.addAction(clear_list_action)
+
+        file_menu.addSeparator()
+
+        exit_action = QAction('&Esci', self)
+        exit_action.setShortcut('Ctrl+Q')
+        exit_action.triggered.connect(self.close)
+        file_menu.addAction(exit_action)
+
+        # Menu Strumenti
+        tools_menu = menubar.addMenu('&Strumenti')
+
+        analyze_action = QAction('&Analizza File MP3', self)
+        analyze_action.setShortcut('Ctrl+A')
+        analyze_action.triggered.connect(self.analyze_mp3_files)
+        tools_menu.addAction(analyze_action)
+
+        normalize_action = QAction('&Normalizza File MP3', self)
+        normalize_action.setShortcut('Ctrl+N')
+        normalize_action.triggered.connect(self.normalize_mp3_files)
+        tools_menu.addAction(normalize_action)
+
+        # Azioni e tempo stimato del lotto, senza modificare i file
+        plan_action = QAction('&Piano di normalizzazione', self)
+        plan_action.setShortcut('Ctrl+P')
+        plan_action.triggered.connect(self.show_normalization_plan)
+        tools_menu.addAction(plan_action)
+
+        tools_menu.addSeparator()
+
+        # Cache persistente dei risultati dell'analisi
+        self.use_cache_action = QAction('Usa cache delle &analisi', self)
+        self.use_cache_action.setCheckable(True)
+        self.use_cache_action.setChecked(True)
+        tools_menu.addAction(self.use_cache_action)
+
+        clear_cache_action = QAction('S&vuota cache delle analisi', self)
+        clear_cache_action.triggered.connect(self.clear_analysis_cache)
+        tools_menu.addAction(clear_cache_action)
+
+        # File con il marcatore di dBPrecision o nel registro dei lotti
+        self.skip_done_action = QAction('&Salta i file già normalizzati', self)
+        self.skip_done_action.setCheckable(True)
+        self.skip_done_action.setChecked(True)
+        tools_menu.addAction(self.skip_done_action)
+
+        tools_menu.addSeparator()
+
+        # Copia del log completo su file e dimensione dell'area di log
+        self.log_file_action = QAction('Salva &log su file...', self)
+        self.log_file_action.setCheckable(True)
+        self.log_file_action.toggled.connect(self.toggle_log_file)
+        tools_menu.addAction(self.log_file_action)
+
+        log_lines_action = QAction('&Righe del log...', self)
+        log_lines_action.triggered.connect(self.set_log_lines)
+        tools_menu.addAction(log_lines_action)
+
+        # Tempi per fase dell'ultima normalizzazione, in JSON o CSV
+        self.export_timings_action = QAction(
+            'Esporta &tempi dell\'ultima normalizzazione...', self)
+        self.export_timings_action.setEnabled(False)
+        self.export_timings_action.triggered.connect(self.export_timings)
+        tools_menu.addAction(self.export_timings_action)
+
+        # Menu Tools (per Windows)
+        tools_en_menu = menubar.addMenu('&Sistema')
+
+        # Sottomenu per ffmpeg
+        ffmpeg_menu = QMenu('Windows', self)
+        tools_en_menu.addMenu(ffmpeg_menu)
+
+        # Aggiungi azione per il controllo e download di ffmpeg
+        check_ffmpeg_action = QAction('Download ffmpeg', self)
+        check_ffmpeg_action.triggered.connect(self.check_ffmpeg)
+        ffmpeg_menu.addAction(check_ffmpeg_action)
+
+        # Sottomenu per linux
+        linux_menu = QMenu('Linux', self)
+        tools_en_menu.addMenu(linux_menu)
+
+        # Aggiungi azione per l'installazione della patch
+        install_patch_action = QAction('Installa patch', self)
+        install_patch_action.triggered.connect(self.install_linux_patch)
+        linux_menu.addAction(install_patch_action)
+
+        # Menu Aiuto
+        help_menu = menubar.addMenu('&Aiuto')
+
+        about_action = QAction('&Informazioni...', self)
+        about_action.triggered.connect(self.show_about)
+        help_menu.addAction(about_action)
+
+        main_widget = QWidget()
+        layout = QVBoxLayout()
+
+        # Aggiungi padding (spazio) in alto e in basso
+        # Sinistra, Alto, Destra, Basso
+        layout.setContentsMargins(10, 20, 10, 20)
+        layout.setSpacing(10)  # Spazio tra gli elementi
+
+        main_widget.setLayout(layout)
+        self.setCentralWidget(main_widget)
+
+        # Imposta il widget centrale come non focalizzabile
+        main_widget.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+
+        # Definisci stile comune per i pulsanti
+        button_style = "padding: 5px 15px; font-weight: bold;"
+        button_height = 32  # Altezza fissa per tutti i pulsanti
+
+        # Layout per selezione file/cartella
+        folder_layout = QHBoxLayout()
+        self.folder_label = QLabel('Seleziona una cartella o un file MP3')
+
+        # Pulsante per selezionare file singolo
+        select_file_btn = QPushButton('Seleziona File MP3')
+        select_file_btn.clicked.connect(self.select_file)
+        select_file_btn.setStyleSheet(button_style)
+        select_file_btn.setFixedHeight(button_height)
+
+        # Pulsante per selezionare cartella
+        select_folder_btn = QPushButton('Seleziona Cartella')
+        select_folder_btn.clicked.connect(self.select_folder)
+        select_folder_btn.setStyleSheet(button_style)
+        select_folder_btn.setFixedHeight(button_height)
+
+        # Pulsante per cancellare la lista
+        clear_list_btn = QPushButton('Cancella Lista')
+        clear_list_btn.clicked.connect(self.clear_file_list)
+        clear_list_btn.setStyleSheet(button_style)
+        clear_list_btn.setFixedHeight(button_height)
+
+        folder_layout.addWidget(self.folder_label)
+        folder_layout.addWidget(select_file_btn)
+        folder_layout.addWidget(select_folder_btn)
+        folder_layout.addWidget(clear_list_btn)
+        layout.addLayout(folder_layout)
+
+        db_layout = QHBoxLayout()
+        self.db_label = QLabel('Livello di Normalizzazione: -20 dB')
+        self.db_slider = QSlider(Qt.Orientation.Horizontal)
+        self.db_slider.setMinimum(-40)
+        self.db_slider.setMaximum(0)
+        self.db_slider.setValue(-20)
+        self.db_slider.valueChanged.connect(self.update_db_label)
+        db_layout.addWidget(self.db_label)
+        db_layout.addWidget(self.db_slider)
+        layout.addLayout(db_layout)
+
+        # Aggiungi opzioni per preservare la qualità
+        quality_main_layout = QVBoxLayout()  # Layout verticale principale
+
+        # Modalità: ricodifica con guadagno esatto o guadagno senza perdita
+        mode_layout = QHBoxLayout()
+        mode_label = QLabel('Modalità:')
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem('Ricodifica (guadagno esatto)', MODE_REENCODE)
+        self.mode_combo.addItem(
+            'Senza ricodifica (passi di 1.5 dB, nessuna perdita)', MODE_GAIN)
+        self.mode_combo.addItem(
+            'Solo tag ReplayGain (audio invariato)', MODE_TAGS)
+        self.mode_combo.currentIndexChanged.connect(self.toggle_mode_options)
+        mode_layout.addWidget(mode_label)
+        mode_layout.addWidget(self.mode_combo)
+
+        # Misura di riferimento per analisi e normalizzazione
+        metric_label = QLabel('Misura:')
+        self.metric_combo = QComboBox()
+        self.metric_combo.addItem('RMS (dB)', METRIC_RMS)
+        self.metric_combo.addItem('Loudness EBU R128 (LUFS)', METRIC_LUFS)
+        self.metric_combo.currentIndexChanged.connect(self.update_db_label)
+        mode_layout.addWidget(metric_label)
+        mode_layout.addWidget(self.metric_combo)
+
+        # File già vicini al livello richiesto: restano invariati
+        tolerance_label = QLabel('Tolleranza:')
+        self.tolerance_spinbox = QDoubleSpinBox()
+        self.tolerance_spinbox.setRange(0.0, 3.0)
+        self.tolerance_spinbox.setSingleStep(0.1)
+        self.tolerance_spinbox.setDecimals(2)
+        self.tolerance_spinbox.setValue(DEFAULT_TOLERANCE_DB)
+        self.tolerance_spinbox.setSuffix(' dB')
+        mode_layout.addWidget(tolerance_label)
+        mode_layout.addWidget(self.tolerance_spinbox)
+
+        # Modalità album: un guadagno comune mantiene i livelli relativi
+        album_label = QLabel('Guadagno:')
+        self.album_combo = QComboBox()
+        self.album_combo.addItem('Per file', ALBUM_OFF)
+        self.album_combo.addItem('Per album (cartella)', ALBUM_FOLDER)
+        self.album_combo.addItem('Per album (tag ID3)', ALBUM_TAG)
+        mode_layout.addWidget(album_label)
+        mode_layout.addWidget(self.album_combo)
+        mode_layout.addStretch(1)
+        quality_main_layout.addLayout(mode_layout)
+
+        # Layout orizzontale per gli elementi della qualità
+        quality_controls_layout = QHBoxLayout()
+        quality_controls_layout.setContentsMargins(
+            0, 0, 0, 0)  # Margine superiore di 10px
+
+        # Etichetta e slider per la qualità di codifica
+        quality_label = QLabel('Qualità codifica:')
+        quality_label.setAlignment(Qt.AlignmentFlag.AlignVCenter)
+        # Spostare verso il basso
+        quality_label.setStyleSheet("margin-top: 0px;")
+
+        # Crea un contenitore per l'etichetta con margine
+        label_container = QWidget()
+        label_layout = QVBoxLayout(label_container)
+        label_layout.setContentsMargins(0, 0, 0, 0)  # Rimuovere i margini
+        label_layout.addWidget(quality_label)
+
+        quality_controls_layout.addWidget(label_container)
+
+        # Imposta il layout per allineare verticalmente al centro
+        quality_controls_layout.setAlignment(Qt.AlignmentFlag.AlignVCenter)
+
+        self.quality_slider = QSlider(Qt.Orientation.Horizontal)
+        self.quality_slider.setMinimum(0)
+        self.quality_slider.setMaximum(2)  # Solo 3 posizioni: 0, 1, 2
+        self.quality_slider.setValue(2)    # Valore predefinito: Alta qualità
+        self.quality_slider.setTickPosition(QSlider.TickPosition.TicksBelow)
+        self.quality_slider.setTickInterval(1)
+        self.quality_slider.setPageStep(1)
+        self.quality_slider.setSingleStep(1)
+        # Disabilitato quando si usa bitrate originale
+        self.quality_slider.setEnabled(False)
+        self.quality_slider.valueChanged.connect(self.update_quality_label)
+        # Crea un contenitore per lo slider con margine superiore
+        slider_container = QWidget()
+        slider_layout = QVBoxLayout(slider_container)
+        # Aggiungi margine superiore allo slider
+        slider_layout.setContentsMargins(0, 12, 0, 0)
+        slider_layout.addWidget(self.quality_slider)
+        quality_controls_layout.addWidget(slider_container)
+
+        # Aggiornato per riflettere il valore predefinito dello slider
+        self.quality_value_label = QLabel('Alta (320k)')
+        self.quality_value_label.setAlignment(Qt.AlignmentFlag.AlignVCenter)
+        quality_controls_layout.addWidget(self.quality_value_label)
+
+        # Aggiungi il layout orizzontale al layout verticale principale
+        quality_main_layout.addLayout(quality_controls_layout)
+
+        # Checkbox per mantenere bitrate originale (sotto alla riga della qualità)
+        self.keep_bitrate_checkbox = QCheckBox('Mantieni bitrate originale')
+        self.keep_bitrate_checkbox.setChecked(True)
+        quality_main_layout.addWidget(self.keep_bitrate_checkbox)
+
+        # Collega il checkbox alla funzione che abilita/disabilita lo slider
+        self.keep_bitrate_checkbox.stateChanged.connect(
+            self.toggle_quality_slider)
+
+        # Checkbox per decodificare in memoria senza WAV temporanei su disco
+        self.use_pipes_checkbox = QCheckBox(
+            'Elaborazione in memoria (senza file WAV temporanei)')
+        self.use_pipes_checkbox.setChecked(True)
+        quality_main_layout.addWidget(self.use_pipes_checkbox)
+
+        # Analisi con i filtri di ffmpeg: nessun PCM in Python, più file
+        # per processo, utile con molte clip brevi
+        self.filter_backend_checkbox = QCheckBox(
+            'Analisi rapida con i filtri di ffmpeg (LUFS con un decimale)')
+        self.filter_backend_checkbox.setChecked(False)
+        quality_main_layout.addWidget(self.filter_backend_checkbox)
+
+        # Elaborazione a blocchi: memoria limitata dalla dimensione del blocco
+        streaming_layout = QHBoxLayout()
+        self.streaming_checkbox = QCheckBox(
+            'Elaborazione a blocchi (memoria costante per file lunghi)')
+        self.streaming_checkbox.setChecked(False)
+        self.block_frames_spinbox = QSpinBox()
+        self.block_frames_spinbox.setRange(1024, 1 << 22)
+        self.block_frames_spinbox.setSingleStep(1024)
+        self.block_frames_spinbox.setValue(DEFAULT_BLOCK_FRAMES)
+        self.block_frames_spinbox.setSuffix(' frame per blocco')
+        self.block_frames_spinbox.setEnabled(False)
+        self.streaming_checkbox.stateChanged.connect(
+            self.toggle_streaming_options)
+        self.use_pipes_checkbox.stateChanged.connect(
+            self.toggle_streaming_options)
+        streaming_layout.addWidget(self.streaming_checkbox)
+        streaming_layout.addWidget(self.block_frames_spinbox)
+        streaming_layout.addStretch(1)
+        quality_main_layout.addLayout(streaming_layout)
+
+        # Numero di file normalizzati contemporaneamente
+        workers_layout = QHBoxLayout()
+        workers_label = QLabel('Processi paralleli:')
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, max(default_workers() * 2, 1))
+        self.workers_spinbox.setValue(default_workers())
+        workers_layout.addWidget(workers_label)
+        workers_layout.addWidget(self.workers_spinbox)
+        workers_layout.addStretch(1)
+        quality_main_layout.addLayout(workers_layout)
+
+        # Scansione delle cartelle: sottocartelle, profondità e filtri
+        scan_layout = QHBoxLayout()
+        self.recursive_checkbox = QCheckBox('Includi sottocartelle')
+        self.recursive_checkbox.setChecked(False)
+        self.max_depth_spinbox = QSpinBox()
+        self.max_depth_spinbox.setRange(0, 64)
+        self.max_depth_spinbox.setValue(0)
+        self.max_depth_spinbox.setSpecialValueText('nessun limite')
+        self.max_depth_spinbox.setPrefix('profondità ')
+        self.max_depth_spinbox.setEnabled(False)
+        self.recursive_checkbox.stateChanged.connect(
+            self.max_depth_spinbox.setEnabled)
+        include_label = QLabel('Includi:')
+        self.include_edit = QLineEdit('; '.join(DEFAULT_INCLUDE))
+        self.include_edit.setToolTip(
+            'Glob dei file da includere, separati da ";" (es. *.mp3; live/*)')
+        exclude_label = QLabel('Escludi:')
+        self.exclude_edit = QLineEdit()
+        self.exclude_edit.setToolTip(
+            'Glob di file o cartelle da saltare, separati da ";"')
+        scan_layout.addWidget(self.recursive_checkbox)
+        scan_layout.addWidget(self.max_depth_spinbox)
+        scan_layout.addWidget(include_label)
+        scan_layout.addWidget(self.include_edit)
+        scan_layout.addWidget(exclude_label)
+        scan_layout.addWidget(self.exclude_edit)
+        quality_main_layout.addLayout(scan_layout)
+
+        layout.addLayout(quality_main_layout)
+
+        buttons_layout = QHBoxLayout()
+
+        self.cancel_scan_btn = QPushButton('Annulla Scansione')
+        self.cancel_scan_btn.clicked.connect(self.cancel_scan)
+        self.cancel_scan_btn.setStyleSheet(
+            "background-color: orange; color: white; " + button_style)
+        self.cancel_scan_btn.setFixedHeight(button_height)
+        self.cancel_scan_btn.setVisible(False)  # Visibile solo in scansione
+        buttons_layout.addWidget(self.cancel_scan_btn)
+
+        self.analyze_btn = QPushButton('Analizza File MP3')
+        self.analyze_btn.clicked.connect(self.analyze_mp3_files)
+        self.analyze_btn.setStyleSheet(button_style)
+        self.analyze_btn.setFixedHeight(button_height)
+        buttons_layout.addWidget(self.analyze_btn)
+
+        self.cancel_analysis_btn = QPushButton('Annulla Analisi')
+        self.cancel_analysis_btn.clicked.connect(self.cancel_analysis)
+        self.cancel_analysis_btn.setStyleSheet(
+            "background-color: orange; color: white; " + button_style)
+        self.cancel_analysis_btn.setFixedHeight(button_height)
+        self.cancel_analysis_btn.setVisible(False)  # Nascosto inizialmente
+        buttons_layout.addWidget(self.cancel_analysis_btn)
+
+        self.normalize_btn = QPushButton('Normalizza File MP3')
+        self.normalize_btn.clicked.connect(self.normalize_mp3_files)
+        self.normalize_btn.setStyleSheet(button_style)
+        self.normalize_btn.setFixedHeight(button_height)
+        buttons_layout.addWidget(self.normalize_btn)
+
+        self.cancel_btn = QPushButton('Annulla Normalizzazione')
+        self.cancel_btn.clicked.connect(self.cancel_normalization)
+        self.cancel_btn.setStyleSheet(
+            "background-color: orange; color: white; " + button_style)
+        self.cancel_btn.setFixedHeight(button_height)
+        self.cancel_btn.setVisible(False)  # Nascosto inizialmente
+        buttons_layout.addWidget(self.cancel_btn)
+
+        layout.addLayout(buttons_layout)
+
+        # Filtro per nome sulla lista dei file
+        filter_layout = QHBoxLayout()
+        filter_label = QLabel('Filtra:')
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText('Parte del nome o del percorso')
+        self.filter_edit.setClearButtonEnabled(True)
+        filter_layout.addWidget(filter_label)
+        filter_layout.addWidget(self.filter_edit)
+        layout.addLayout(filter_layout)
+
+        # Lista dei file: modello a colonne, adatto anche a centinaia di
+        # migliaia di righe (vedi file_model)
+        self.file_model = FileListModel(self)
+        self.filter_edit.textChanged.connect(self.file_model.set_filter)
+        self.files_table = QTableView()
+        self.files_table.setModel(self.file_model)
+        self.files_table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.ResizeMode.Stretch)
+        # Larghezza fissa: adattarla al contenuto richiederebbe di leggere
+        # tutte le righe a ogni aggiornamento
+        self.files_table.horizontalHeader().setSectionResizeMode(
+            1, QHeaderView.ResizeMode.Interactive)
+        self.files_table.horizontalHeader().setSectionResizeMode(
+            2, QHeaderView.ResizeMode.Interactive)
+        self.files_table.horizontalHeader().setSectionResizeMode(
+            3, QHeaderView.ResizeMode.Stretch)
+        self.files_table.horizontalHeader().setDefaultSectionSize(120)
+        self.files_table.setMinimumHeight(200)
+
+        # Righe di altezza fissa e senza numerazione: con l'ordinamento e il
+        # filtro il numero di riga non identifica il file, e l'intestazione
+        # verticale rallenterebbe l'inserimento di molte righe
+        self.files_table.verticalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Fixed)
+        self.files_table.verticalHeader().hide()
+
+        # Imposta la tabella in modalità sola lettura
+        self.files_table.setEditTriggers(
+            QTableView.EditTrigger.NoEditTriggers)
+
+        # Clic sulle intestazioni per ordinare; nessun ordinamento all'avvio
+        self.files_table.horizontalHeader().setSortIndicator(
+            -1, Qt.SortOrder.AscendingOrder)
+        self.files_table.setSortingEnabled(True)
+
+        # Imposta il comportamento di selezione della tabella
+        self.files_table.setSelectionMode(
+            QTableView.SelectionMode.SingleSelection)
+        self.files_table.setSelectionBehavior(
+            QTableView.SelectionBehavior.SelectRows)
+
+        layout.addWidget(self.files_table)
+
+        self.log_area = LogView()
+        self.log_area.setMaximumHeight(100)
+        layout.addWidget(self.log_area)
+
+        # Aggiungi le barre di progresso
+        progress_layout = QVBoxLayout()
+
+        # Barra progresso file totali
+        files_progress_layout = QHBoxLayout()
+        files_progress_label = QLabel('Progresso file:')
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setTextVisible(True)
+        self.progress_bar.setFormat('%v/%m file')
+        self.progress_bar.setValue(0)
+        files_progress_layout.addWidget(files_progress_label)
+        files_progress_layout.addWidget(self.progress_bar)
+        progress_layout.addLayout(files_progress_layout)
+
+        # Barra progresso file corrente
+        current_progress_layout = QHBoxLayout()
+        current_progress_label = QLabel('File corrente:')
+        self.current_file_progress = QProgressBar()
+        self.current_file_progress.setTextVisible(True)
+        self.current_file_progress.setFormat('%p%')
+        self.current_file_progress.setValue(0)
+        current_progress_layout.addWidget(current_progress_label)
+        current_progress_layout.addWidget(self.current_file_progress)
+        progress_layout.addLayout(current_progress_layout)
+
+        # Etichetta stato corrente
+        self.status_label = QLabel('Pronto')
+        self.status_label.setStyleSheet(
+            "QLabel { color: blue; font-weight: bold; }")
+        progress_layout.addWidget(self.status_label)
+
+        layout.addLayout(progress_layout)
+
+        # Aggiungi il pulsante Esci sotto alla barra di progresso
+        exit_layout = QHBoxLayout()
+        exit_layout.addStretch(1)  # Questo spinge il pulsante a destra
+
+        exit_btn = QPushButton('Esci')
+        exit_btn.setStyleSheet(
+            "background-color: red; color: white; " + button_style)
+        exit_btn.clicked.connect(self.close)  # Chiude l'applicazione
+        exit_btn.setFixedWidth(100)  # Larghezza fissa per il pulsante
+        # Stessa altezza degli altri pulsanti
+        exit_btn.setFixedHeight(button_height)
+        exit_layout.addWidget(exit_btn)
+
+        layout.addLayout(exit_layout)
+
+        # Inizializzazione variabili
+        self.selected_folder = None
+        self.selected_files = []  # Lista dei file selezionati
+        self.is_single_file_mode = False  # Modalità file singolo o cartella
+        self.folder_files = []  # File trovati dalla scansione della cartella
+        self.scan_worker = None  # Worker thread per la scansione
+        # Selezione precedente, ripristinata se la scansione viene annullata
+        self._scan_previous = None
+        self.normalization_worker = None  # Worker thread per normalizzazione
+        self.analysis_worker = None  # Worker thread per l'analisi
+        # Risultati dell'analisi riusati dalla normalizzazione:
+        # percorso -> (LoudnessResult, file_stamp)
+        self.analysis_results = {}
+        # RunReport dell'ultima normalizzazione, esportabile dal menu
+        self.last_timings = None
+
+    def toggle_quality_slider(self, state):
+        """Abilita o disabilita lo slider della qualità in base allo stato del checkbox"""
+        self.quality_slider.setEnabled(
+            not state and self.mode_combo.currentData() == MODE_REENCODE)
+
+    def toggle_mode_options(self, index=None):
+        """Le opzioni di codifica servono solo in modalità ricodifica"""
+        reencode = self.mode_combo.currentData() == MODE_REENCODE
+        self.keep_bitrate_checkbox.setEnabled(reencode)
+        self.toggle_quality_slider(self.keep_bitrate_checkbox.isChecked())
+
+    def toggle_streaming_options(self, state=None):
+        """Abilita le opzioni a blocchi solo con l'elaborazione in memoria"""
+        use_pipes = self.use_pipes_checkbox.isChecked()
+        self.streaming_checkbox.setEnabled(use_pipes)
+        self.block_frames_spinbox.setEnabled(
+            use_pipes and self.streaming_checkbox.isChecked())
+
+    def _block_frames(self):
+        """Frame per blocco selezionati (0 = elaborazione del file intero)"""
+        if self.use_pipes_checkbox.isChecked() and self.streaming_checkbox.isChecked():
+            return self.block_frames_spinbox.value()
+        return 0
+
+    def update_quality_label(self):
+        """Aggiorna l'etichetta che mostra il valore di qualità selezionato"""
+        quality_value = self.quality_slider.value()
+        # Mappa i valori dello slider a bitrate specifici
+        if quality_value == 0:
+            bitrate = 192
+            quality_text = f"Bassa ({bitrate}k)"
+        elif quality_value == 1:
+            bitrate = 256
+            quality_text = f"Media ({bitrate}k)"
+        else:  # quality_value == 2
+            bitrate = 320
+            quality_text = f"Alta ({bitrate}k)"
+        self.quality_value_label.setText(quality_text)
+
+    def select_folder(self):
+        # Utilizziamo opzioni speciali per permettere la selezione di unità intere
+        dialog = QFileDialog(self)
+        dialog.setWindowTitle('Seleziona una cartella o un\'unità')
+        dialog.setFileMode(QFileDialog.FileMode.Directory)
+        # Rimuoviamo ShowDirsOnly per consentire la selezione di unità
+        dialog.setOption(QFileDialog.Option.DontUseNativeDialog, True)
+
+        if dialog.exec():
+            folder = dialog.selectedFiles()[0]
+            if folder:
+                self._start_scan(folder)
+
+    def _start_scan(self, folder):
+        """Avvia in background la ricerca dei file MP3 nella cartella"""
+        if self.scan_worker and self.scan_worker.isRunning():
+            self.log_area.append('Attendi il termine della scansione')
+            return
+        if self._is_busy():
+            self.log_area.append('Attendi il termine dell\'elaborazione')
+            return
+
+        # Verifica se il percorso selezionato è un'unità o una cartella normale
+        drive_part, path_part = os.path.splitdrive(folder)
+        is_drive = bool(drive_part and (
+            not path_part or path_part in ['/', '\\']))
+        root = os.path.normpath(folder)
+        if is_drive and root.endswith(':'):
+            root += os.sep
+
+        # Le unità intere vengono sempre visitate in profondità
+        if is_drive or self.recursive_checkbox.isChecked():
+            max_depth = self.max_depth_spinbox.value() or None
+        else:
+            max_depth = 0
+
+        self._scan_previous = (self.selected_folder, self.selected_files,
+                               self.is_single_file_mode, self.folder_files)
+        self.selected_folder = root
+        self.selected_files = []  # Resetta file selezionati
+        self.is_single_file_mode = False
+        self.folder_files = []
+        self.folder_label.setText(f'Cartella selezionata: {root}')
+        self.log_area.append(f'Cartella selezionata: {root}')
+        self.file_model.clear()
+
+        self.scan_worker = ScanWorker(
+            root, parse_patterns(self.include_edit.text()),
+            parse_patterns(self.exclude_edit.text()), max_depth)
+        self.scan_worker.files_found.connect(self._scan_files_found)
+        self.scan_worker.progress.connect(self._scan_progress)
+        self.scan_worker.log_message.connect(self.log_area.append)
+        self.scan_worker.finished.connect(self._scan_finished)
+        self._set_scan_mode(True)
+        self.scan_worker.start()
+
+    def cancel_scan(self):
+        if self.scan_worker and self.scan_worker.isRunning():
+            self.scan_worker.cancel()
+            self.status_label.setText("Annullamento in corso...")
+            self.status_label.setStyleSheet(
+                "QLabel { color: orange; font-weight: bold; }")
+
+    def _set_scan_mode(self, scanning):
+        """Durante la scansione la lista non è ancora completa"""
+        self.cancel_scan_btn.setVisible(scanning)
+        self.analyze_btn.setEnabled(not scanning)
+        self.normalize_btn.setEnabled(not scanning)
+        if scanning:
+            self.status_label.setText("Scansione in corso...")
+            self.status_label.setStyleSheet(
+                "QLabel { color: green; font-weight: bold; }")
+            self.progress_bar.setMaximum(0)  # Barra in movimento continuo
+        else:
+            self.status_label.setStyleSheet(
+                "QLabel { color: blue; font-weight: bold; }")
+            self.progress_bar.setMaximum(1)
+            self.progress_bar.reset()
+
+    def _scan_files_found(self, paths):
+        """Aggiunge alla tabella un lotto di file trovati dalla scansione"""
+        self.folder_files.extend(paths)
+        self.file_model.append(paths, self.selected_folder)
+
+    def _scan_progress(self, dirs_scanned, files_found):
+        self.status_label.setText(
+            f"Scansione in corso... Directory: {dirs_scanned}, "
+            f"file MP3 trovati: {files_found}")
+
+    def _scan_finished(self, complete):
+        # Il segnale arriva dalla fine di run(): attendi l'uscita del thread
+        self.scan_worker.wait()
+        self.scan_worker = None
+        self._set_scan_mode(False)
+
+        if complete:
+            self._scan_previous = None
+            self.status_label.setText('Pronto')
+            self.log_area.append(
+                f'Trovati {len(self.folder_files)} file MP3 nella cartella {self.selected_folder}')
+            self.log_area.append(
+                'Premi "Analizza file MP3" per iniziare l\'analisi')
+            return
+
+        # Scansione annullata: nessuna lista a metà, torna la selezione precedente
+        (self.selected_folder, self.selected_files, self.is_single_file_mode,
+         self.folder_files) = self._scan_previous
+        self._scan_previous = None
+        self.file_model.clear()
+        if self.is_single_file_mode:
+            self.file_model.append(self.selected_files)
+            self.folder_label.setText(
+                f'{len(self.selected_files)} file MP3 selezionati')
+        elif self.selected_folder:
+            self.file_model.append(self.folder_files, self.selected_folder)
+            self.folder_label.setText(
+                f'Cartella selezionata: {self.selected_folder}')
+        else:
+            self.folder_label.setText('Seleziona una cartella o un file MP3')
+        self.status_label.setText('Scansione interrotta')
+        self.log_area.append(
+            'Scansione annullata: ripristinata la lista precedente')
+
+    def _is_busy(self):
+        """True se un'analisi o una normalizzazione è in corso"""
+        return bool(
+            (self.analysis_worker and self.analysis_worker.isRunning()) or
+            (self.normalization_worker and self.normalization_worker.isRunning()))
+
+    def select_file(self):
+        if self.scan_worker and self.scan_worker.isRunning():
+            self.log_area.append('Attendi il termine della scansione')
+            return
+        files, _ = QFileDialog.getOpenFileNames(
+            self, 'Seleziona File MP3', '', 'File MP3 (*.mp3)')
+        if files:
+            # Aggiungi i nuovi file alla lista esistente invece di sostituirla
+            self.selected_files.extend(files)
+
+            # Rimuovi eventuali duplicati mantenendo l'ordine
+            self.selected_files = list(dict.fromkeys(self.selected_files))
+
+            self.selected_folder = None  # Resetta cartella selezionata
+            self.is_single_file_mode = True
+
+            if len(self.selected_files) == 1:
+                self.folder_label.setText(
+                    f'Seleziona un file MP3 o una cartella')
+            else:
+                self.folder_label.setText(
+                    f'{len(self.selected_files)} file MP3 selezionati')
+
+            # Riempi la tabella con i nomi dei file (senza analisi)
+            self.file_model.clear()
+            self.file_model.append(self.selected_files)
+
+            self.log_area.append(
+                f'{len(files)} file MP3 aggiunti alla lista (totale: {len(self.selected_files)})')
+            self.log_area.append(
+                'Premi "Analizza file MP3" per iniziare l\'analisi')
+
+    def update_db_label(self):
+        db_value = self.db_slider.value()
+        self.db_label.setText(
+            f'Livello di Normalizzazione: {db_value} {self._level_unit()}')
+
+    def _level_unit(self):
+        """Unità del livello per la misura selezionata"""
+        return "LUFS" if self.metric_combo.currentData() == METRIC_LUFS else "dB"
+
+    def normalize_mp3_files(self):
+        self._start_normalization(dry_run=False)
+
+    def show_normalization_plan(self):
+        """Mostra azioni e tempo stimato del lotto senza modificare i file"""
+        self._start_normalization(dry_run=True)
+
+    def _start_normalization(self, dry_run):
+        if self.normalization_worker and self.normalization_worker.isRunning():
+            return
+        if self.analysis_worker and self.analysis_worker.isRunning():
+            self.log_area.append('Attendi il termine dell\'analisi')
+            return
+        if self.scan_worker and self.scan_worker.isRunning():
+            self.log_area.append('Attendi il termine della scansione')
+            return
+
+        # Lista dei file fissata ora, nel thread della GUI: il worker riceve
+        # solo percorsi completi e non legge mai la tabella
+        jobs = self.file_model.jobs()
+
+        if not jobs:
+            self.log_area.append('Errore: Nessun file MP3 selezionato')
+            return
+
+        # Trova ffmpeg una sola volta per tutto il lotto
+        mode = self.mode_combo.currentData()
+        ffmpeg_path = self._ffmpeg_for_batch(mode == MODE_REENCODE)
+        if ffmpeg_path is None:
+            return
+
+        target_db = self.db_slider.value()
+        if dry_run:
+            self.log_area.append(
+                f'Piano di normalizzazione a {target_db} {self._level_unit()}')
+        else:
+            self.log_area.append(
+                f'Inizio normalizzazione a {target_db} {self._level_unit()}')
+
+        options = NormalizeOptions(
+            target_db, self.keep_bitrate_checkbox.isChecked(),
+            self.quality_slider.value(), self.use_pipes_checkbox.isChecked(),
+            self._block_frames(), ffmpeg_path, mode,
+            self.metric_combo.currentData(), self.tolerance_spinbox.value(),
+            self.album_combo.currentData())
+
+        # Configura UI per modalità processing
+        self._set_processing_mode(True)
+
+        # Crea e configura il worker thread
+        self.normalization_worker = NormalizationWorker(
+            jobs, options, self.workers_spinbox.value(),
+            dict(self.analysis_results), self.skip_done_action.isChecked(),
+            dry_run, self.use_cache_action.isChecked())
+
+        # Connetti i segnali
+        self.normalization_worker.progress.connect(
+            self.current_file_progress.setValue)
+        self.normalization_worker.file_progress.connect(
+            self._update_file_progress)
+        self.normalization_worker.status_update.connect(
+            self.status_label.setText)
+        self.normalization_worker.log_message.connect(self.log_area.append)
+        self.normalization_worker.files_completed.connect(
+            self._update_file_status)
+        self.normalization_worker.timings_ready.connect(
+            self._normalization_timings)
+        self.normalization_worker.plan_ready.connect(self._normalization_plan)
+        self.normalization_worker.finished.connect(
+            self._normalization_finished)
+
+        # Avvia il worker
+        self.normalization_worker.start()
+
+    def cancel_normalization(self):
+        if self.normalization_worker and self.normalization_worker.isRunning():
+            self.normalization_worker.cancel()
+            self.status_label.setText("Annullamento in corso...")
+            self.status_label.setStyleSheet(
+                "QLabel { color: orange; font-weight: bold; }")
+
+    def _set_processing_mode(self, processing):
+        """Abilita/disabilita controlli durante la normalizzazione"""
+        # Disabilita/abilita controlli principali
+        self.normalize_btn.setVisible(not processing)
+        self.analyze_btn.setEnabled(not processing)
+        self.cancel_btn.setVisible(processing)
+
+        # Disabilita slider e checkbox durante processing
+        self.db_slider.setEnabled(not processing)
+        self.mode_combo.setEnabled(not processing)
+        self.tolerance_spinbox.setEnabled(not processing)
+        self.album_combo.setEnabled(not processing)
+        self.metric_combo.setEnabled(not processing)
+        if processing:
+            self.quality_slider.setEnabled(False)
+            self.keep_bitrate_checkbox.setEnabled(False)
+        else:
+            self.toggle_mode_options()
+        self.use_pipes_checkbox.setEnabled(not processing)
+        self.workers_spinbox.setEnabled(not processing)
+        if processing:
+            self.streaming_checkbox.setEnabled(False)
+            self.block_frames_spinbox.setEnabled(False)
+        else:
+            self.toggle_streaming_options()
+
+        if processing:
+            self.status_label.setText("Preparazione normalizzazione...")
+            self.status_label.setStyleSheet(
+                "QLabel { color: green; font-weight: bold; }")
+            self.progress_bar.setValue(0)
+            self.current_file_progress.setValue(0)
+        else:
+            self.status_label.setText("Pronto")
+            self.status_label.setStyleSheet(
+                "QLabel { color: blue; font-weight: bold; }")
+            self.progress_bar.setValue(0)
+            self.current_file_progress.setValue(0)
+
+    def _update_file_progress(self, current, total):
+        """Aggiorna il progresso dei file totali"""
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(current)
+
+    def _update_file_status(self, updates):
+        """Aggiorna nella tabella lo stato (STATUS_*) di un lotto di file"""
+        count = self.file_model.file_count()
+        for row, status in updates:
+            if row < count:
+                self.file_model.set_status(row, status)
+
+    def _normalization_plan(self, plan):
+        """Tempo stimato del lotto, mostrato finché non parte il primo file"""
+        self.status_label.setText(
+            f"Tempo stimato: {format_duration(plan.wall_seconds())}")
+
+    def _normalization_timings(self, report):
+        """Mostra nel log il riassunto dei tempi per fase del lotto"""
+        self.last_timings = report
+        self.export_timings_action.setEnabled(bool(report.files))
+        for line in report.summary_lines():
+            self.log_area.append(line)
+
+    def export_timings(self):
+        """Salva i tempi per fase dell'ultima normalizzazione"""
+        if not self.last_timings:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, 'Esporta tempi', 'dbprecision_tempi.json',
+            'JSON (*.json);;CSV (*.csv)')
+        if not path:
+            return
+        try:
+            self.last_timings.save(path)
+            self.log_area.append(f'Tempi per fase salvati in: {path}')
+        except OSError as e:
+            self.log_area.append(
+                f'Errore: impossibile salvare i tempi in {path}: {str(e)}')
+
+    def _normalization_finished(self, success):
+        """Gestisce il completamento della normalizzazione"""
+        self._set_processing_mode(False)
+
+        if self.normalization_worker.dry_run:
+            self.status_label.setText(
+                "Piano pronto: nessun file modificato" if success
+                else "Piano interrotto")
+            self.status_label.setStyleSheet(
+                "QLabel { color: blue; font-weight: bold; }")
+        elif success:
+            self.status_label.setText("Normalizzazione completata!")
+            self.status_label.setStyleSheet(
+                "QLabel { color: green; font-weight: bold; }")
+        else:
+            self.status_label.setText("Normalizzazione interrotta")
+            self.status_label.setStyleSheet(
+                "QLabel { color: red; font-weight: bold; }")
+
+        # Il segnale arriva dalla fine di run(): attendi l'uscita del thread
+        self.normalization_worker.wait()
+        self.normalization_worker = None
+
+    def analyze_mp3_files(self):
+        if self.analysis_worker and self.analysis_worker.isRunning():
+            return
+        if self.normalization_worker and self.normalization_worker.isRunning():
+            self.log_area.append('Attendi il termine della normalizzazione')
+            return
+        if self.scan_worker and self.scan_worker.isRunning():
+            self.log_area.append('Attendi il termine della scansione')
+            return
+
+        jobs = self.file_model.jobs()
+
+        if not jobs:
+            self.log_area.append('Errore: Nessun file MP3 selezionato')
+            return
+
+        # Trova ffmpeg una sola volta per tutto il lotto
+        ffmpeg_path = self._ffmpeg_for_batch()
+        if ffmpeg_path is None:
+            return
+
+        self.log_area.append('Inizio analisi dei file MP3...')
+        metric = self.metric_combo.currentData()
+
+        backend = BACKEND_NUMPY
+        if self.filter_backend_checkbox.isChecked():
+            info = ffmpeg_info(ffmpeg_path)
+            required = BACKEND_FFMPEG_FILTERS[metric]
+            if info is not None and info.has_filters(required):
+                backend = BACKEND_FFMPEG
+            else:
+                self.log_area.append(
+                    f"Avviso: ffmpeg non ha i filtri {', '.join(required)}: "
+                    "analisi con il motore NumPy")
+
+        options = AnalysisOptions(self.use_pipes_checkbox.isChecked(),
+                                  self._block_frames(), ffmpeg_path, metric,
+                                  backend)
+
+        # L'indice di ogni file nel modello resta valido per tutto il lotto
+        self._analysis_paths = dict(jobs)
+        self._set_analysis_mode(True)
+
+        self.analysis_worker = AnalysisWorker(
+            jobs, options, self.workers_spinbox.value(),
+            self.use_cache_action.isChecked())
+        self.analysis_worker.files_started.connect(self._analysis_files_started)
+        self.analysis_worker.files_analyzed.connect(self._analysis_files_done)
+        self.analysis_worker.file_progress.connect(self._update_file_progress)
+        self.analysis_worker.log_message.connect(self.log_area.append)
+        self.analysis_worker.finished.connect(self._analysis_finished)
+        self.analysis_worker.start()
+
+    def cancel_analysis(self):
+        if self.analysis_worker and self.analysis_worker.isRunning():
+            self.analysis_worker.cancel()
+            self.status_label.setText("Annullamento in corso...")
+            self.status_label.setStyleSheet(
+                "QLabel { color: orange; font-weight: bold; }")
+
+    def _set_analysis_mode(self, analyzing):
+        """Mostra il pulsante di annullamento durante l'analisi"""
+        self.analyze_btn.setVisible(not analyzing)
+        self.cancel_analysis_btn.setVisible(analyzing)
+        self.normalize_btn.setEnabled(not analyzing)
+        self.workers_spinbox.setEnabled(not analyzing)
+        self.metric_combo.setEnabled(not analyzing)
+        self.filter_backend_checkbox.setEnabled(not analyzing)
+
+        if analyzing:
+            self.status_label.setText("Analisi in corso...")
+            self.status_label.setStyleSheet(
+                "QLabel { color: green; font-weight: bold; }")
+        else:
+            self.status_label.setStyleSheet(
+                "QLabel { color: blue; font-weight: bold; }")
+
+    def _analysis_files_started(self, rows):
+        count = self.file_model.file_count()
+        for row in rows:
+            if row < count:
+                self.file_model.set_status(row, STATUS_ANALYZING)
+
+    def _analysis_files_done(self, results):
+        """Riceve dal worker un lotto di risultati dell'analisi"""
+        for result in results:
+            self._analysis_file_done(*result)
+
+    def _analysis_file_done(self, row, loudness, bitrate_kbps, error, stamp):
+        """Mostra nella tabella il risultato dell'analisi di un file"""
+        if row >= self.file_model.file_count():
+            return
+        file_path = os.path.normpath(self._analysis_paths[row])
+        filename = os.path.basename(file_path)
+
+        if loudness is not None and stamp is not None:
+            self.analysis_results[file_path] = (loudness, stamp)
+        else:
+            self.analysis_results.pop(file_path, None)
+
+        if loudness is None:
+            if error == ANALYSIS_CANCELLED:
+                self.file_model.set_analysis(row, None, False, None,
+                                             STATUS_CANCELLED)
+            else:
+                self.file_model.set_analysis(row, None, False, None,
+                                             STATUS_ANALYSIS_ERROR, error)
+                self.log_area.append(
+                    f'Errore durante l\'analisi di {filename}: {error}')
+            return
+
+        # Mostra il valore originale effettivo (dB RMS o LUFS) e il bitrate
+        if loudness.lufs is not None:
+            self.file_model.set_analysis(row, loudness.lufs, True,
+                                         bitrate_kbps, STATUS_READY)
+        else:
+            self.file_model.set_analysis(row, loudness.rms_db, False,
+                                         bitrate_kbps, STATUS_READY)
+        if loudness.lufs is not None:
+            self.log_area.append(
+                f'File {filename} analizzato: {loudness.lufs:.2f} LUFS, '
+                f'LRA {loudness.loudness_range:.1f} LU, '
+                f'true peak {loudness.true_peak_db:.2f} dBTP')
+        else:
+            self.log_area.append(f'File {filename} analizzato con successo')
+
+    def _analysis_finished(self, success):
+        self._set_analysis_mode(False)
+        if success:
+            self.log_area.append('Analisi completata')
+            self.status_label.setText('Analisi completata')
+        else:
+            self.log_area.append('Analisi annullata')
+            self.status_label.setText('Analisi interrotta')
+        # Il segnale arriva dalla fine di run(): attendi l'uscita del thread
+        self.analysis_worker.wait()
+        self.analysis_worker = None
+
+    def clear_analysis_cache(self):
+        """Svuota la cache persistente delle analisi"""
+        if self.analysis_worker and self.analysis_worker.isRunning():
+            self.log_area.append('Attendi il termine dell\'analisi')
+            return
+        try:
+            from dbprecision.cache import AnalysisCache
+            cache = AnalysisCache()
+            cache.clear()
+            cache.close()
+            self.log_area.append('Cache delle analisi svuotata')
+        except Exception as e:
+            self.log_area.append(
+                f'Errore durante lo svuotamento della cache: {str(e)}')
+
+    def toggle_log_file(self, enabled):
+        """Avvia o interrompe la copia del log su file"""
+        if not enabled:
+            path = self.log_area.log_file_path()
+            self.log_area.stop_log_file()
+            if path:
+                self.log_area.append(f'Log su file interrotto: {path}')
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, 'Salva log su file', 'dbprecision.log',
+            'File di log (*.log *.txt)')
+        if not path:
+            self.log_file_action.setChecked(False)
+            return
+        try:
+            self.log_area.start_log_file(path)
+            self.log_area.append(f'Log salvato anche nel file: {path}')
+        except OSError as e:
+            self.log_area.append(
+                f'Errore: impossibile scrivere il log in {path}: {str(e)}')
+            self.log_file_action.setChecked(False)
+
+    def set_log_lines(self):
+        """Chiede quante righe conservare nell'area di log"""
+        lines, ok = QInputDialog.getInt(
+            self, 'Righe del log', 'Righe conservate nell\'area di log:',
+            self.log_area.max_lines(), 100, 1000000, 1000)
+        if ok:
+            self.log_area.set_max_lines(lines)
+
+    def closeEvent(self, event):
+        self.log_area.stop_log_file()
+        super().closeEvent(event)
+
+    def find_ffmpeg_executable(self):
+        """Trova il percorso dell'eseguibile ffmpeg."""
+        return find_ffmpeg_executable()
+
+    def _ffmpeg_for_batch(self, needs_mp3_encoder=False):
+        """Comando ffmpeg per un lotto, o None se manca, non funziona o non
+        può ricodificare in MP3"""
+        ffmpeg_path = self.find_ffmpeg_executable()
+        if not ffmpeg_path:
+            self.log_area.append(
+                'Errore: ffmpeg non trovato. Installalo o scaricalo da '
+                'Sistema > Windows > Download ffmpeg')
+            return None
+        # Versione ed encoder vengono letti una volta e salvati su disco
+        info = ffmpeg_info(ffmpeg_path)
+        if info is None:
+            self.log_area.append(
+                f'Errore: ffmpeg non funzionante: {ffmpeg_path}')
+            return None
+        self.log_area.append(
+            f'Utilizzo ffmpeg {info.version} da: {ffmpeg_path}')
+        if needs_mp3_encoder and not info.can_encode_mp3():
+            self.log_area.append(
+                'Errore: questo ffmpeg non include un encoder MP3 '
+                '(libmp3lame). Scegli la modalità senza ricodifica o '
+                'installa un ffmpeg completo')
+            return None
+        return ffmpeg_path
+
+    def show_about(self):
+        """Mostra la finestra di dialogo con le informazioni sull'applicazione"""
+        about_dialog = AboutDialog(self)
+        about_dialog.exec()
+
+    # Aggiunta nuova funzione per cancellare la lista di file
+    def clear_file_list(self):
+        # Una scansione in corso viene annullata e la lista resta vuota
+        if self.scan_worker and self.scan_worker.isRunning():
+            self._scan_previous = (None, [], False, [])
+            self.scan_worker.cancel()
+            self.analysis_results.clear()
+            self.log_area.append('Lista file cancellata')
+            return
+
+        # Verifica se ci sono file selezionati o se è stata selezionata una cartella/unità
+        if self.selected_files or self.selected_folder:
+            self.selected_files = []
+            self.selected_folder = None
+            self.is_single_file_mode = False
+            self.folder_files = []
+            self.folder_label.setText('Seleziona una cartella o un file MP3')
+            self.file_model.clear()
+            self.analysis_results.clear()
+            self.log_area.append('Lista file cancellata')
+
+            # Reset completo della barra di progresso
+            self.progress_bar.reset()
+            self.progress_bar.setValue(0)
+            # Imposta a 1 invece di 0 per evitare il loop infinito
+            self.progress_bar.setMaximum(1)
+            QApplication.processEvents()  # Forza l'aggiornamento dell'interfaccia
+        else:
+            self.log_area.append('Nessun file da cancellare')
+
+    def check_ffmpeg(self):
+        """Scarica FFmpeg direttamente senza verificare se è già installato."""
+        reply = QMessageBox.question(self,
+                                     "Download FFmpeg",
+                                     "Vuoi scaricare FFmpeg?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+
+        if reply == QMessageBox.StandardButton.Yes:
+            self.download_ffmpeg()
+
+    def download_ffmpeg(self):
+        """Scarica FFmpeg da Internet."""
+        from dbprecision.gui.ffmpeg_download import download_ffmpeg
+        download_ffmpeg(self)
+        # Il nuovo eseguibile sostituisce quello trovato in questa sessione
+        find_ffmpeg_executable(refresh=True)
+
+    def install_linux_patch(self):
+        if sys.platform.startswith('win'):
+            QMessageBox.warning(
+                self, 'Errore', 'Questa funzione è disponibile solo su sistemi Linux.')
+            return
+
+        try:
+            # Salva il percorso assoluto del file di patch
+            app_path = os.path.dirname(os.path.abspath(sys.argv[0]))
+            script_path = os.path.join(app_path, 'linux', 'patch')
+
+            self.log_area.append(
+                f'Installazione patch in corso da: {script_path}')
+
+            # Esegui lo script con privilegi di amministratore
+            # Passa esplicitamente il percorso completo come parametro extra
+            process = subprocess.Popen(['pkexec', 'bash', script_path, app_path],
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            stdout, stderr = process.communicate()
+
+            if process.returncode == 0:
+                QMessageBox.information(
+                    self, 'Successo', 'Patch installata con successo!')
+                self.log_area.append('Patch installata con successo!')
+            else:
+                error_msg = stderr.decode()
+                self.log_area.append(
+                    f'Errore durante l\'installazione della patch: {error_msg}')
+                QMessageBox.critical(
+                    self, 'Errore', f'Errore durante l\'installazione della patch:\n{error_msg}')
+        except Exception as e:
+            self.log_area.append(f'Errore: {str(e)}')
+            QMessageBox.critical(
+                self, 'Errore', f'Errore durante l\'installazione della patch:\n{str(e)}')
@@ -0,0 +1,522 @@
+"""Thread di analisi e normalizzazione della GUI.
+
+I moduli di elaborazione vengono importati in run(), nel thread di lavoro:
+l'avvio della finestra non attende il caricamento di NumPy e mutagen.
+"""
+import os
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from dbprecision.gui.file_model import (STATUS_ANALYZING, STATUS_CANCELLED,
+                                        STATUS_DONE, STATUS_AT_TARGET,
+                                        STATUS_ERROR, STATUS_NORMALIZING,
+                                        STATUS_READY, STATUS_SKIPPED)
+from dbprecision.options import ALBUM_OFF
+from dbprecision.parallel import ParallelRunner, WorkerCrashed
+from dbprecision.scan import FileScanner
+
+# I file trovati dalla scansione arrivano alla tabella a lotti: al più
+# SCAN_BATCH_SIZE percorsi o SCAN_BATCH_INTERVAL secondi per segnale
+SCAN_BATCH_SIZE = 500
+SCAN_BATCH_INTERVAL = 0.1
+
+
+# Gli aggiornamenti per la GUI vengono raggruppati: al più un segnale per
+# tipo ogni UPDATE_INTERVAL secondi (~30 Hz), qualunque sia il numero di file
+UPDATE_INTERVAL = 1 / 30
+
+
+class _Coalesced:
+    """Raccoglie gli aggiornamenti di un segnale ed emette a intervalli.
+
+    Con batch=False viene emesso solo l'ultimo valore ricevuto (barre di
+    progresso, messaggi di stato); con batch=True gli elementi vengono
+    passati in una lista a emit. flush() emette subito quanto in attesa;
+    tick() va chiamata anche quando non arrivano nuovi valori (vedi
+    _ticker), altrimenti l'ultimo resta in attesa fino al successivo.
+    """
+
+    def __init__(self, emit, batch=False):
+        self._emit = emit
+        self._batch = batch
+        self._pending = []
+        self._last = 0.0
+
+    def __call__(self, *args):
+        if self._batch:
+            self._pending.append(args[0])
+        else:
+            self._pending = [args]
+        self.tick()
+
+    def tick(self):
+        """Emette quanto in attesa se è trascorso UPDATE_INTERVAL."""
+        if self._pending and time.monotonic() - self._last >= UPDATE_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+        self._last = time.monotonic()
+        if self._batch:
+            self._emit(pending)
+        else:
+            self._emit(*pending[0])
+
+
+def _ticker(updates):
+    """Callback on_poll di ParallelRunner.run: tick() su tutti i canali."""
+    def tick():
+        for update in updates:
+            update.tick()
+    return tick
+
+
+def _log_emitter(signal):
+    """Messaggi di log raggruppati in un unico testo su più righe."""
+    return _Coalesced(lambda lines: signal.emit('\n'.join(lines)), batch=True)
+
+
+class NormalizationWorker(QThread):
+    progress = pyqtSignal(int)  # Progresso del file corrente (0-100)
+    file_progress = pyqtSignal(int, int)  # File completati, totale file
+    status_update = pyqtSignal(str)  # Messaggio di stato
+    log_message = pyqtSignal(str)  # Messaggi per il log, uno per riga
+    files_completed = pyqtSignal(list)  # Lista di (row, STATUS_*)
+    timings_ready = pyqtSignal(object)  # RunReport dei file normalizzati
+    plan_ready = pyqtSignal(object)  # NormalizationPlan, prima di iniziare
+    finished = pyqtSignal(bool)  # True se completato con successo
+
+    def __init__(self, jobs, options, max_workers=None, measurements=None,
+                 skip_done=True, dry_run=False, use_cache=True):
+        super().__init__()
+        # Tupla immutabile di (row, percorso completo), preparata dalla
+        # finestra: run() non legge mai tabella, widget o finestra
+        self.jobs = tuple(jobs)
+        self.options = options  # NormalizeOptions, con ffmpeg già cercato
+        # Processi paralleli (None = uno per CPU)
+        self.max_workers = max_workers
+        # Volumi misurati dall'analisi: percorso -> (LoudnessResult, file_stamp)
+        self.measurements = measurements or {}
+        # Salta i file già normalizzati con le stesse opzioni
+        self.skip_done = skip_done
+        # Solo il piano del lotto, senza modificare i file
+        self.dry_run = dry_run
+        # Cache delle analisi: misure mancanti della modalità album e voci
+        # da invalidare dopo aver riscritto l'audio
+        self.use_cache = use_cache
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def _measure_albums(self, items, runner, journal, cache, set_status,
+                        file_progress, log, updates):
+        """Completa le misure per il volume degli album; False se annullata."""
+        from dbprecision.album import measure_files, missing_measurements
+
+        # I file già normalizzati non contano: vale il guadagno del marcatore
+        items = [(row, file_path) for row, file_path in items
+                 if journal is None or not journal.is_done(file_path,
+                                                           self.options)]
+        missing = missing_measurements(items, self.options.metric,
+                                       self.measurements, cache)
+        if not missing:
+            return True
+        log(f"Misura di {len(missing)} file per il volume degli album")
+        self.status_update.emit("Misura del volume degli album...")
+        for row, _ in missing:
+            set_status((row, STATUS_ANALYZING))
+        paths = dict(missing)
+        measured = [0]
+        file_progress(0, len(missing))
+
+        def on_measured(row, error):
+            measured[0] += 1
+            file_progress(measured[0], len(missing))
+            if error:
+                log(f"Errore durante la misura di {os.path.basename(paths[row])}: {error}")
+                set_status((row, STATUS_ERROR))
+            else:
+                set_status((row, STATUS_READY))
+
+        tick = _ticker(updates)
+
+        def on_event(kind, *data):
+            if kind == 'log':
+                log(data[0])
+            tick()
+
+        return measure_files(missing, self.options, self.measurements,
+                             runner, on_measured, on_event,
+                             lambda: self._is_cancelled, cache, tick)
+
+    def run(self):
+        progress = _Coalesced(self.progress.emit)
+        file_progress = _Coalesced(self.file_progress.emit)
+        status_update = _Coalesced(self.status_update.emit)
+        log = _log_emitter(self.log_message)
+        set_status = _Coalesced(self.files_completed.emit, batch=True)
+        updates = (set_status, file_progress, progress, status_update, log)
+        tick = _ticker(updates)
+        timings = None
+        journal = None
+        cache = None
+
+        def finish(success):
+            for update in updates:
+                update.flush()
+            if timings is not None:
+                timings.finish()
+                self.timings_ready.emit(timings)
+            self.finished.emit(success)
+
+        try:
+            # Il motore (NumPy, mutagen) viene caricato al primo lotto
+            from dbprecision.cache import AnalysisCache
+            from dbprecision.journal import NormalizeJournal
+            from dbprecision.normalize import normalize_planned
+            from dbprecision.plan import (ACTION_DONE, ACTION_SKIP,
+                                          AUDIO_ACTIONS, EtaTracker, ThroughputHistory,
+                                          format_duration, plan_normalization)
+            from dbprecision.timing import RunReport
+            timings = RunReport()
+            try:
+                journal = NormalizeJournal()
+            except Exception as e:
+                log(f"Avviso: registro delle normalizzazioni non disponibile: {str(e)}")
+            if self.use_cache:
+                try:
+                    cache = AnalysisCache()
+                except Exception as e:
+                    log(f"Avviso: cache delle analisi non disponibile: {str(e)}")
+
+            total_files = len(self.jobs)
+            file_progress(0, total_files)
+            paths = dict(self.jobs)
+
+            items = []
+            for row, file_path in self.jobs:
+                if self._is_cancelled:
+                    break
+                if not os.path.exists(file_path):
+                    log(f'Errore: Impossibile trovare il file {file_path}')
+                    set_status((row, STATUS_ERROR))
+                    continue
+                items.append((row, file_path))
+
+            runner = ParallelRunner(self.max_workers)
+            done_journal = journal if self.skip_done else None
+            # Il guadagno di un album richiede le misure di tutti i suoi file
+            if self.options.album != ALBUM_OFF:
+                self.measurements = dict(self.measurements)
+                if not self._measure_albums(items, runner, done_journal,
+                                            cache, set_status, file_progress,
+                                            log, updates):
+                    log("Normalizzazione annullata dall'utente")
+                    timings = None
+                    finish(False)
+                    return
+                file_progress(0, total_files)
+
+            # Piano del lotto: azione e tempo stimato di ogni file, prima
+            # di modificarne qualcuno
+            history = ThroughputHistory()
+            plan = plan_normalization(
+                items, self.options, self.measurements, done_journal,
+                runner.max_workers, history)
+            for item in plan.files:
+                if item.action == ACTION_DONE:
+                    set_status((item.key, STATUS_SKIPPED))
+                elif item.action == ACTION_SKIP:
+                    set_status((item.key, STATUS_AT_TARGET))
+            for line in plan.summary_lines():
+                log(line)
+            self.plan_ready.emit(plan)
+            if self.dry_run:
+                timings = None
+                finish(True)
+                return
+
+            # Dal file più lungo: con più processi il lotto finisce prima.
+            # La misura dell'analisi evita di decodificare due volte
+            jobs = [(item.key, (paths[item.key], item.key, self.options,
+                                self.measurements.get(item.path),
+                                item.action, item.album))
+                    for item in plan.pending()]
+
+            actions = {item.key: item.action for item in plan.files}
+            started_rows = set()
+            completed = [total_files - len(jobs)]
+            file_progress(completed[0], total_files)
+            eta = EtaTracker(plan)
+            # Tempo reale dei file completati, dagli eventi 'timing'
+            seconds = {}
+
+            def show_status(row):
+                status_update(f"Normalizzando {os.path.basename(paths[row])}... "
+                              f"(circa {format_duration(eta.remaining_seconds())} "
+                              "rimanenti)")
+
+            def on_start(row):
+                started_rows.add(row)
+                show_status(row)
+                set_status((row, STATUS_NORMALIZING))
+
+            def on_result(row, success):
+                started_rows.discard(row)
+                completed[0] += 1
+                eta.file_done(row, seconds.pop(row, None))
+                file_progress(completed[0], total_files)
+                if success:
+                    set_status((row, STATUS_DONE))
+                    if journal:
+                        journal.record(paths[row], self.options)
+                    # Con i soli tag ReplayGain la misura in cache resta valida
+                    if cache and actions[row] in AUDIO_ACTIONS:
+                        cache.invalidate(paths[row])
+                elif self._is_cancelled:
+                    set_status((row, STATUS_CANCELLED))
+                else:
+                    set_status((row, STATUS_ERROR))
+                if started_rows:
+                    show_status(next(iter(started_rows)))
+
+            def on_event(kind, *data):
+                if kind == 'progress':
+                    progress(data[1])
+                elif kind == 'log':
+                    log(data[0])
+                elif kind == 'timing':
+                    timings.add(*data[1:])
+                    seconds[data[0]] = sum(data[3].values())
+                # Anche gli aggiornamenti in attesa di altri canali partono
+                tick()
+
+            # Processo di normalizzazione in parallelo sui file del lotto;
+            # tick anche senza eventi, mentre un file lento viene codificato
+            try:
+                complete = runner.run(normalize_planned, jobs, on_result,
+                                      on_event, lambda: self._is_cancelled,
+                                      on_start, tick)
+            except WorkerCrashed as e:
+                # I file rimasti falliscono come se ciascuno avesse un errore
+                log(f"Errore: {str(e)}")
+                for row in e.keys:
+                    started_rows.discard(row)
+                    set_status((row, STATUS_ERROR))
+                completed[0] += len(e.keys)
+                file_progress(completed[0], total_files)
+                complete = True
+
+            # Le velocità misurate migliorano la stima dei lotti successivi
+            history.update(plan, timings)
+            try:
+                history.save()
+            except OSError:
+                pass
+
+            if not complete:
+                for row in started_rows:
+                    set_status((row, STATUS_CANCELLED))
+                log("Normalizzazione annullata dall'utente")
+                finish(False)
+                return
+
+            status_update("Normalizzazione completata!")
+            log("Normalizzazione di tutti i file completata!")
+            finish(True)
+
+        except Exception as e:
+            log(f"Errore durante la normalizzazione: {str(e)}")
+            finish(False)
+
+        finally:
+            if journal:
+                journal.close()
+            if cache:
+                cache.close()
+
+
+class AnalysisWorker(QThread):
+    files_started = pyqtSignal(list)  # Lista di row
+    # Lista di (row, LoudnessResult o None, bitrate kbps o None, errore,
+    # (dimensione, mtime) del file analizzato o None)
+    files_analyzed = pyqtSignal(list)
+    file_progress = pyqtSignal(int, int)  # File analizzati, totale file
+    log_message = pyqtSignal(str)  # Messaggi per il log, uno per riga
+    finished = pyqtSignal(bool)  # True se completata senza annullamento
+
+    def __init__(self, jobs, options, max_workers=None, use_cache=True):
+        super().__init__()
+        self.jobs = tuple(jobs)  # (row, percorso completo), vedi sopra
+        self.options = options  # AnalysisOptions, con ffmpeg già cercato
+        self.max_workers = max_workers
+        self.use_cache = use_cache  # Riusa i risultati salvati su disco
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        started = _Coalesced(self.files_started.emit, batch=True)
+        analyzed = _Coalesced(self.files_analyzed.emit, batch=True)
+        file_progress = _Coalesced(self.file_progress.emit)
+        log = _log_emitter(self.log_message)
+        updates = (started, analyzed, file_progress, log)
+
+        def finish(success):
+            for update in updates:
+                update.flush()
+            self.finished.emit(success)
+
+        cache = None
+        try:
+            from dbprecision.analysis import (analyze_mp3_group,
+                                              group_analysis_jobs)
+            from dbprecision.cache import AnalysisCache
+
+            total_files = len(self.jobs)
+            completed = [0]
+            file_progress(0, total_files)
+
+            # I file invariati dall'ultima analisi vengono letti dalla cache
+            jobs = []
+            paths = dict(self.jobs)
+            if self.use_cache:
+                try:
+                    cache = AnalysisCache()
+                except Exception as e:
+                    log(f"Avviso: cache delle analisi non disponibile: {str(e)}")
+            for row, file_path in self.jobs:
+                if self._is_cancelled:
+                    break
+                cached = cache.get(file_path) if cache else None
+                # Una voce senza la metrica richiesta va ricalcolata
+                if cached and cached[0].level(self.options.metric) is not None:
+                    completed[0] += 1
+                    analyzed((row, cached[0], cached[1], '',
+                              self._stamp(file_path)))
+                    file_progress(completed[0], total_files)
+                else:
+                    jobs.append((row, file_path))
+
+            if cache and completed[0]:
+                log(f"{completed[0]} file letti dalla cache delle analisi")
+
+            # Stato dei file all'avvio dell'analisi: una modifica successiva
+            # rende la misura non più valida per la normalizzazione
+            stamps = {}
+
+            def on_start(rows):
+                for row in rows:
+                    stamps[row] = self._stamp(paths[row])
+                    started(row)
+
+            def on_result(rows, results):
+                for row, result in zip(rows, results):
+                    completed[0] += 1
+                    loudness, bitrate_kbps, _ = result
+                    if cache and loudness is not None:
+                        cache.put(paths[row], loudness, bitrate_kbps)
+                    analyzed((row, *result, stamps.pop(row, None)))
+                file_progress(completed[0], total_files)
+
+            tick = _ticker(updates)
+
+            def on_event(kind, *data):
+                if kind == 'log':
+                    log(data[0])
+                tick()
+
+            runner = ParallelRunner(self.max_workers)
+            # Con i filtri di ffmpeg ogni lavoro misura un gruppo di file
+            try:
+                success = runner.run(analyze_mp3_group,
+                                     group_analysis_jobs(jobs, self.options),
+                                     on_result, on_event,
+                                     lambda: self._is_cancelled, on_start,
+                                     tick)
+            except WorkerCrashed as e:
+                log(f"Errore: {str(e)}")
+                lost = [row for rows in e.keys for row in rows]
+                on_result(lost, [(None, None, str(e))] * len(lost))
+                success = True
+            if cache:
+                cache.evict()
+            finish(success and not self._is_cancelled)
+
+        except Exception as e:
+            log(f"Errore durante l'analisi: {str(e)}")
+            finish(False)
+
+        finally:
+            if cache:
+                cache.close()
+
+    @staticmethod
+    def _stamp(path):
+        from dbprecision.cache import file_stamp
+        try:
+            return file_stamp(path)
+        except OSError:
+            return None
+
+
+class ScanWorker(QThread):
+    files_found = pyqtSignal(list)  # Lotto di percorsi trovati
+    progress = pyqtSignal(int, int)  # Cartelle visitate, file trovati
+    log_message = pyqtSignal(str)  # Messaggio per il log
+    finished = pyqtSignal(bool)  # True se la scansione è arrivata in fondo
+
+    def __init__(self, root, include, exclude, max_depth):
+        super().__init__()
+        self.root = root
+        self.include = include
+        self.exclude = exclude
+        self.max_depth = max_depth  # None = tutte le sottocartelle
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        try:
+            scanner = FileScanner(self.include, self.exclude, self.max_depth,
+                                  lambda: self._is_cancelled)
+            batch = []
+            found = 0
+            last_emit = time.monotonic()
+            for path in scanner.scan(self.root):
+                if self._is_cancelled:
+                    break
+                batch.append(path)
+                found += 1
+                now = time.monotonic()
+                if len(batch) >= SCAN_BATCH_SIZE or now - last_emit >= SCAN_BATCH_INTERVAL:
+                    self.files_found.emit(batch)
+                    self.progress.emit(scanner.dirs_scanned, found)
+                    batch = []
+                    last_emit = now
+
+            if self._is_cancelled:
+                self.finished.emit(False)
+                return
+            if batch:
+                self.files_found.emit(batch)
+            self.progress.emit(scanner.dirs_scanned, found)
+
+            for path, message in scanner.errors[:10]:
+                self.log_message.emit(
+                    f'Errore di accesso alla directory {path}: {message}')
+            if len(scanner.errors) > 10:
+                self.log_message.emit(
+                    f'Saltate {len(scanner.errors)} directory per problemi di permesso')
+            self.finished.emit(True)
+
+        except Exception as e:
+            self.log_message.emit(f'Errore durante la scansione: {str(e)}')
+            self.finished.emit(False)
@@ -0,0 +1,154 @@
+"""File già normalizzati: marcatore nel tag ID3 e registro dei lotti.
+
+Ogni file normalizzato riceve un frame TXXX:DBPRECISION con livello,
+misura, modalità, raggruppamento per album e guadagno applicato. Il frame
+viene scritto sul file temporaneo prima che sostituisca l'originale (o
+insieme ai tag ReplayGain), quindi un file con il marcatore è sempre un
+file già elaborato, anche se il lotto si è interrotto subito dopo. In
+modalità album il guadagno del marcatore è quello comune all'album: un
+lotto ripreso lo applica anche ai brani rimasti.
+
+Il registro è un file JSONL nella cartella dati dell'utente: una riga per
+file completato, con percorso, dimensione e data di modifica dopo la
+normalizzazione. Ogni riga viene sincronizzata su disco appena il file è
+stato sostituito; una riga troncata da un crash viene ignorata. Alla
+ripresa di un lotto basta una stat per riconoscere un file già fatto, e
+il marcatore (una lettura del solo tag) copre i file assenti dal registro.
+"""
+import json
+import os
+
+from mutagen.id3 import ID3, TXXX, ID3NoHeaderError
+
+from dbprecision.cache import file_stamp
+from dbprecision.options import ALBUM_OFF
+from dbprecision.paths import user_data_dir
+
+MARKER = 'DBPRECISION'
+
+JOURNAL_FILENAME = 'normalize_journal.jsonl'
+
+# Il registro viene riscritto senza le righe superate quando queste sono
+# più di COMPACT_MIN_LINES e più delle voci valide
+COMPACT_MIN_LINES = 10000
+
+# Differenza di livello sotto cui due destinazioni coincidono
+TARGET_TOLERANCE = 0.005
+
+
+def _matches(values, options):
+    try:
+        return (abs(float(values['target_db']) - options.target_db)
+                < TARGET_TOLERANCE
+                and values['metric'] == options.metric
+                and values['mode'] == options.mode
+                # Marcatori e voci precedenti alla modalità album
+                and values.get('album', ALBUM_OFF) == options.album)
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def write_marker(file_path, options, gain_db):
+    """Scrive il marcatore di normalizzazione nel tag ID3 del file."""
+    try:
+        tags = ID3(file_path)
+        version = 3 if tags.version[1] == 3 else 4
+    except ID3NoHeaderError:
+        tags = ID3()
+        version = 4
+    text = (f'target_db={options.target_db:g};metric={options.metric};'
+            f'mode={options.mode};album={options.album};'
+            f'gain_db={gain_db:+.2f}')
+    tags.setall(f'TXXX:{MARKER}', [TXXX(encoding=3, desc=MARKER,
+                                        text=[text])])
+    tags.save(file_path, v2_version=version)
+
+
+def read_marker(file_path):
+    """Campi del marcatore ({nome: valore}) oppure None se assente."""
+    try:
+        frame = ID3(file_path).get(f'TXXX:{MARKER}')
+    except Exception:
+        return None
+    if frame is None or not frame.text:
+        return None
+    return dict(field.partition('=')[::2]
+                for field in str(frame.text[0]).split(';'))
+
+
+class NormalizeJournal:
+    """Registro persistente dei file normalizzati.
+
+    Un'istanza va usata dal solo thread che l'ha creata.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_data_dir(), JOURNAL_FILENAME)
+        self._entries = {}  # Percorso assoluto -> ultima voce
+        lines = self._load()
+        if lines > COMPACT_MIN_LINES and lines > 2 * len(self._entries):
+            self._compact()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        lines = 0
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry['path']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Riga troncata da un'interruzione
+        except FileNotFoundError:
+            pass
+        return lines
+
+    def _compact(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def is_done(self, file_path, options):
+        """True se il file è già normalizzato con le stesse opzioni.
+
+        Il registro basta se il file non è cambiato dalla normalizzazione;
+        altrimenti decide il marcatore nel tag, e il file entra nel registro.
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stamp = file_stamp(path)
+        except OSError:
+            return False
+        entry = self._entries.get(path)
+        if entry and (entry.get('size'), entry.get('mtime_ns')) == stamp \
+                and _matches(entry, options):
+            return True
+        marker = read_marker(path)
+        if marker is None or not _matches(marker, options):
+            return False
+        self.record(path, options)
+        return True
+
+    def record(self, file_path, options):
+        """Aggiunge al registro un file appena normalizzato."""
+        path = os.path.abspath(file_path)
+        try:
+            size, mtime_ns = file_stamp(path)
+        except OSError:
+            return
+        entry = {'path': path, 'size': size, 'mtime_ns': mtime_ns,
+                 'target_db': options.target_db, 'metric': options.metric,
+                 'mode': options.mode, 'album': options.album}
+        self._entries[path] = entry
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,381 @@
+"""Loudness secondo ITU-R BS.1770-4 / EBU R128, solo con NumPy.
+
+LoudnessMeter riceve blocchi successivi di PCM interlacciato e in un solo
+passaggio calcola:
+
+- loudness integrata con gating assoluto (-70 LUFS) e relativo (-10 LU);
+- loudness range (EBU Tech 3342) sulle finestre short-term da 3 s;
+- true peak con sovracampionamento polifase (4x sotto 96 kHz);
+- istogramma delle finestre momentary sopra il gate assoluto, che unito a
+  quello di altri file dà la loudness integrata di un album senza
+  conservarne le finestre (vedi dbprecision.album).
+
+Il filtro di pesatura K (i due biquad della norma) è applicato come FIR
+della sua risposta all'impulso troncata, con convoluzione overlap-save via
+FFT: ogni blocco costa due FFT invece di un ciclo Python per campione.
+Dal filtro si conservano solo le energie dei segmenti da 100 ms, da cui si
+ricavano sia le finestre da 400 ms sia quelle da 3 s.
+
+Obiettivo di prestazioni: almeno 100 volte il tempo reale per core su
+stereo 44.1/48 kHz, misurato con benchmarks/loudness_throughput.py.
+"""
+import functools
+import math
+
+import numpy as np
+
+# Soglie di gating (BS.1770-4 e EBU Tech 3342)
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+LRA_RELATIVE_GATE_LU = -20.0
+LRA_LOW_PERCENTILE = 10
+LRA_HIGH_PERCENTILE = 95
+
+# Valore restituito quando nessun blocco supera il gate assoluto
+SILENCE_LUFS = ABSOLUTE_GATE_LUFS
+
+# Ampiezza delle classi dell'istogramma di gating: l'errore sulla loudness
+# integrata ricavata dall'istogramma resta sotto HISTOGRAM_STEP_LU / 2
+HISTOGRAM_STEP_LU = 0.1
+
+# Segmenti da 100 ms: 4 per una finestra momentary, 30 per una short-term
+SEGMENTS_PER_SECOND = 10
+MOMENTARY_SEGMENTS = 4
+SHORT_TERM_SEGMENTS = 30
+
+# Frame filtrati per ogni FFT dell'overlap-save
+FILTER_CHUNK_FRAMES = 1 << 16
+
+# Ampiezza relativa sotto cui la risposta all'impulso viene troncata
+IMPULSE_TAIL = 1e-7
+
+# Prese per fase del filtro di interpolazione del true peak
+TRUE_PEAK_TAPS_PER_PHASE = 12
+
+# Pesi dei canali per la disposizione 5.1 (L, R, C, LFE, Ls, Rs)
+SURROUND_WEIGHTS = (1.0, 1.0, 1.0, 0.0, 1.41, 1.41)
+
+
+def channel_weights(channels):
+    """Pesi G_i dei canali: 1 per mono/stereo, tabella BS.1770 per il 5.1."""
+    if channels == len(SURROUND_WEIGHTS):
+        return np.array(SURROUND_WEIGHTS)
+    return np.ones(channels)
+
+
+def k_weighting_biquads(sample_rate):
+    """Coefficienti (b, a) dei due biquad della pesatura K a sample_rate.
+
+    Parametri analogici dei filtri della norma, riportati a sample_rate con
+    la trasformazione bilineare (come in libebur128).
+    """
+    # Filtro di pre-enfasi: shelving di +4 dB sulle alte frequenze
+    f0 = 1681.974450955533
+    gain_db = 3.999843853973347
+    q = 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf_b = ((vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0,
+               (vh - vb * k / q + k * k) / a0)
+    shelf_a = (1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0)
+
+    # Filtro RLB: passa-alto a 38 Hz
+    f0 = 38.13547087602444
+    q = 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1.0 + k / q + k * k
+    highpass_b = (1.0, -2.0, 1.0)
+    highpass_a = (1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0)
+    return (shelf_b, shelf_a), (highpass_b, highpass_a)
+
+
+@functools.lru_cache(maxsize=None)
+def k_weighting_impulse(sample_rate):
+    """Risposta all'impulso della pesatura K, troncata quando si estingue.
+
+    Calcolata una sola volta per frequenza di campionamento su un secondo
+    di segnale; la coda viene tagliata dopo l'ultimo campione che supera
+    IMPULSE_TAIL volte il massimo.
+    """
+    impulse = np.zeros(sample_rate)
+    impulse[0] = 1.0
+    signal = impulse
+    for b, a in k_weighting_biquads(sample_rate):
+        out = np.empty_like(signal)
+        x1 = x2 = y1 = y2 = 0.0
+        for i, x0 in enumerate(signal.tolist()):
+            y0 = b[0] * x0 + b[1] * x1 + b[2] * x2 - a[1] * y1 - a[2] * y2
+            out[i] = y0
+            x2, x1 = x1, x0
+            y2, y1 = y1, y0
+        signal = out
+    above = np.nonzero(np.abs(signal) > IMPULSE_TAIL * np.max(np.abs(signal)))[0]
+    return signal[:above[-1] + 1].copy()
+
+
+@functools.lru_cache(maxsize=None)
+def _filter_spectrum(sample_rate, fft_size):
+    return np.fft.rfft(k_weighting_impulse(sample_rate), fft_size).astype(
+        np.complex64)
+
+
+def true_peak_factor(sample_rate):
+    """Fattore di sovracampionamento per il true peak (almeno 192 kHz)."""
+    if sample_rate < 96000:
+        return 4
+    if sample_rate < 192000:
+        return 2
+    return 1
+
+
+@functools.lru_cache(maxsize=None)
+def _interpolation_matrix(factor):
+    """Matrice (prese, fasi) del filtro polifase di interpolazione.
+
+    Sinc finestrata con Kaiser; ogni colonna produce una delle fasi
+    sovracampionate a partire da TRUE_PEAK_TAPS_PER_PHASE campioni, dal più
+    vecchio al più recente.
+    """
+    taps = TRUE_PEAK_TAPS_PER_PHASE * factor
+    n = np.arange(taps) - (taps - 1) / 2.0
+    h = np.sinc(n / factor) * np.kaiser(taps, 8.0)
+    phases = h.reshape(TRUE_PEAK_TAPS_PER_PHASE, factor)
+    # Ogni fase ha guadagno unitario in continua
+    phases = phases / phases.sum(axis=0)
+    return phases[::-1].astype(np.float32)
+
+
+def _power_to_lufs(power):
+    with np.errstate(divide='ignore'):
+        return -0.691 + 10.0 * np.log10(power)
+
+
+def _lufs_to_power(loudness):
+    return 10.0 ** ((loudness + 0.691) / 10.0)
+
+
+def _gated_mean(powers, relative_gate):
+    """Media delle potenze dei blocchi che superano i due gate."""
+    loudness = _power_to_lufs(powers)
+    powers = powers[loudness > ABSOLUTE_GATE_LUFS]
+    if len(powers) == 0:
+        return None, powers
+    threshold = _power_to_lufs(np.mean(powers)) + relative_gate
+    gated = powers[_power_to_lufs(powers) > threshold]
+    return np.mean(gated), gated
+
+
+def gating_histogram(powers):
+    """Istogramma [[classe, finestre], ...] delle potenze sopra il gate assoluto.
+
+    La classe i raccoglie le finestre con loudness tra ABSOLUTE_GATE_LUFS +
+    i * HISTOGRAM_STEP_LU e la classe successiva; le classi vuote mancano.
+    """
+    loudness = _power_to_lufs(np.asarray(powers, dtype=np.float64))
+    loudness = loudness[loudness > ABSOLUTE_GATE_LUFS]
+    bins = np.floor((loudness - ABSOLUTE_GATE_LUFS) / HISTOGRAM_STEP_LU)
+    values, counts = np.unique(bins.astype(np.int64), return_counts=True)
+    return [[int(value), int(count)] for value, count in zip(values, counts)]
+
+
+def histogram_loudness(histogram):
+    """Loudness integrata (LUFS) da un istogramma di gating, anche unito.
+
+    Ogni finestra vale quanto il centro della sua classe; si applica il solo
+    gate relativo, perché l'istogramma contiene già le finestre sopra quello
+    assoluto. Con un istogramma vuoto restituisce SILENCE_LUFS.
+    """
+    if not histogram:
+        return SILENCE_LUFS
+    bins, counts = np.array(histogram, dtype=np.float64).T
+    loudness = ABSOLUTE_GATE_LUFS + (bins + 0.5) * HISTOGRAM_STEP_LU
+    powers = _lufs_to_power(loudness)
+    threshold = (_power_to_lufs(np.dot(powers, counts) / counts.sum())
+                 + RELATIVE_GATE_LU)
+    gated = loudness > threshold
+    return float(_power_to_lufs(np.dot(powers[gated], counts[gated])
+                                / counts[gated].sum()))
+
+
+class LoudnessMeter:
+    """Misura a blocchi di loudness integrata, loudness range e true peak.
+
+    I blocchi passati ad add sono PCM float interlacciato (tra -1 e 1) di
+    lunghezza qualsiasi; tra un blocco e l'altro si conservano solo lo
+    stato dei filtri e le energie dei segmenti da 100 ms.
+    """
+
+    def __init__(self, sample_rate, channels, true_peak=True):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._weights = channel_weights(channels)
+        self._segment_frames = max(1, round(sample_rate / SEGMENTS_PER_SECOND))
+
+        # Stato dell'overlap-save: ultimi campioni del blocco precedente
+        impulse = k_weighting_impulse(sample_rate)
+        self._history_frames = len(impulse) - 1
+        self._fft_size = 1 << (FILTER_CHUNK_FRAMES +
+                               self._history_frames - 1).bit_length()
+        self._chunk_frames = self._fft_size - self._history_frames
+        self._spectrum = _filter_spectrum(sample_rate, self._fft_size)
+        self._filter_input = np.zeros(
+            (self._fft_size, channels), dtype=np.float32)
+        self._pending = 0  # Frame nuovi in _filter_input ancora da filtrare
+
+        # Segmento da 100 ms in corso e energie dei segmenti completati
+        self._segment_energy = np.zeros(channels)
+        self._segment_filled = 0
+        self._segments = []
+
+        self._true_peak = true_peak
+        self._tp_factor = true_peak_factor(sample_rate)
+        self._tp_history = np.zeros(
+            (TRUE_PEAK_TAPS_PER_PHASE - 1, channels), dtype=np.float32)
+        self.sample_peak = 0.0
+        self.true_peak = 0.0
+        self.frames = 0
+
+    def add(self, samples):
+        """Aggiunge un blocco di campioni interlacciati."""
+        frames = np.asarray(samples, dtype=np.float32).reshape(
+            -1, self.channels)
+        if len(frames) == 0:
+            return
+        self.frames += len(frames)
+        self.sample_peak = max(self.sample_peak,
+                               float(np.max(np.abs(frames))))
+        if self._true_peak:
+            self._update_true_peak(frames)
+
+        start = 0
+        while start < len(frames):
+            # Riempie il buffer dell'FFT dopo la storia del blocco precedente
+            offset = self._history_frames + self._pending
+            count = min(len(frames) - start, self._fft_size - offset)
+            self._filter_input[offset:offset + count] = frames[start:start + count]
+            self._pending += count
+            start += count
+            if self._pending == self._chunk_frames:
+                self._filter_pending()
+
+    def _filter_pending(self):
+        """Filtra con la pesatura K i frame in attesa e ne accumula l'energia."""
+        if self._pending == 0:
+            return
+        end = self._history_frames + self._pending
+        spectrum = np.fft.rfft(self._filter_input, axis=0)
+        spectrum *= self._spectrum[:, np.newaxis]
+        filtered = np.fft.irfft(spectrum, self._fft_size, axis=0)
+        self._add_energy(filtered[self._history_frames:end])
+
+        # La coda del blocco diventa la storia del successivo
+        self._filter_input[:self._history_frames] = (
+            self._filter_input[end - self._history_frames:end])
+        self._filter_input[self._history_frames:] = 0.0
+        self._pending = 0
+
+    def _add_energy(self, filtered):
+        """Accumula l'energia per canale nei segmenti da 100 ms."""
+        squares = np.square(filtered, dtype=np.float64)
+        position = 0
+        total = len(squares)
+        while position < total:
+            if self._segment_filled == 0 and total - position >= self._segment_frames:
+                # Segmenti completi in un'unica operazione vettoriale
+                count = (total - position) // self._segment_frames
+                end = position + count * self._segment_frames
+                energies = squares[position:end].reshape(
+                    count, self._segment_frames, self.channels).sum(axis=1)
+                self._segments.append(energies @ self._weights)
+                position = end
+                continue
+            take = min(self._segment_frames - self._segment_filled,
+                       total - position)
+            self._segment_energy += squares[position:position + take].sum(axis=0)
+            self._segment_filled += take
+            position += take
+            if self._segment_filled == self._segment_frames:
+                self._segments.append(
+                    np.array([self._segment_energy @ self._weights]))
+                self._segment_energy[:] = 0.0
+                self._segment_filled = 0
+
+    def _update_true_peak(self, frames):
+        """Picco dei campioni sovracampionati con il filtro polifase."""
+        if self._tp_factor == 1:
+            self.true_peak = max(self.true_peak, self.sample_peak)
+            return
+        padded = np.concatenate((self._tp_history, frames))
+        self._tp_history = padded[len(padded) - len(self._tp_history):].copy()
+        matrix = _interpolation_matrix(self._tp_factor)
+        n = len(frames)
+        peak = self.sample_peak
+        # Una fase alla volta: somme di copie traslate del blocco, più veloci
+        # di un prodotto matriciale sulle finestre scorrevoli
+        for phase in range(self._tp_factor):
+            interpolated = padded[:n] * matrix[0, phase]
+            for tap in range(1, TRUE_PEAK_TAPS_PER_PHASE):
+                interpolated += padded[tap:tap + n] * matrix[tap, phase]
+            peak = max(peak, float(np.max(np.abs(interpolated))))
+        self.true_peak = max(self.true_peak, peak)
+
+    def _segment_powers(self):
+        self._filter_pending()
+        if self._segments:
+            energies = np.concatenate(self._segments)
+        else:
+            energies = np.zeros(0)
+        if self._segment_filled:
+            # Segmento finale incompleto: conta per la parte presente
+            energies = np.append(energies, self._segment_energy @ self._weights)
+        return energies
+
+    def _window_powers(self, energies, segments):
+        """Potenza media delle finestre di segments segmenti, passo 100 ms."""
+        if len(energies) < segments:
+            return np.zeros(0)
+        cumulative = np.concatenate(([0.0], np.cumsum(energies)))
+        sums = cumulative[segments:] - cumulative[:-segments]
+        return sums / (segments * self._segment_frames)
+
+    def _momentary_powers(self, energies):
+        momentary = self._window_powers(energies, MOMENTARY_SEGMENTS)
+        if len(momentary) == 0:
+            # File più corto di una finestra: media dell'intero segnale
+            momentary = np.array([energies.sum() / self.frames])
+        return momentary
+
+    def histogram(self):
+        """Istogramma di gating delle finestre momentary (gating_histogram)."""
+        energies = self._segment_powers()
+        if self.frames == 0:
+            raise Exception("Impossibile leggere i dati audio")
+        return gating_histogram(self._momentary_powers(energies))
+
+    def result(self):
+        """Restituisce (LUFS integrati, LRA in LU, true peak lineare)."""
+        energies = self._segment_powers()
+        if self.frames == 0:
+            raise Exception("Impossibile leggere i dati audio")
+
+        momentary = self._momentary_powers(energies)
+        integrated_power, _ = _gated_mean(momentary, RELATIVE_GATE_LU)
+        if integrated_power is None:
+            integrated = SILENCE_LUFS
+        else:
+            integrated = float(_power_to_lufs(integrated_power))
+
+        short_term = self._window_powers(energies, SHORT_TERM_SEGMENTS)
+        _, gated = _gated_mean(short_term, LRA_RELATIVE_GATE_LU)
+        if len(gated) < 2:
+            loudness_range = 0.0
+        else:
+            low, high = np.percentile(
+                _power_to_lufs(gated),
+                [LRA_LOW_PERCENTILE, LRA_HIGH_PERCENTILE])
+            loudness_range = float(high - low)
+
+        true_peak = self.true_peak if self._true_peak else self.sample_peak
+        return integrated, loudness_range, true_peak
@@ -0,0 +1,311 @@
+"""Modifica del volume di un MP3 senza ricodifica.
+
+Come mp3gain, il volume viene cambiato riscrivendo il campo global_gain di
+ogni granulo nelle side info dei frame Layer III: ogni unità di global_gain
+vale 2^(1/4) in ampiezza, circa 1.5 dB. I dati audio compressi restano
+identici, quindi non si aggiunge una generazione di artefatti e il lavoro si
+riduce a una lettura e una scrittura sequenziale del file.
+
+La ricerca dei frame scorre le intestazioni una alla volta in Python; sono
+vettoriali con NumPy solo la lettura e la riscrittura dei global_gain
+trovati.
+"""
+import math
+import mmap
+import os
+
+import numpy as np
+
+from dbprecision.analysis import OperationCancelled
+
+# Variazione di volume corrispondente a un'unità di global_gain: 2^(1/4) in
+# ampiezza, circa 1.5 dB
+GAIN_STEP_DB = 20 * math.log10(2) / 4
+
+# Bitrate in kbps per indice: [MPEG1, MPEG2/2.5] Layer III
+BITRATES = (
+    (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+)
+
+# Dimensione dei blocchi copiati da apply_gain_steps
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Frame esaminati da scan_frames tra due controlli di annullamento
+SCAN_CHECK_FRAMES = 4096
+
+# Frequenze di campionamento per indice, per versione MPEG
+SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG1
+    2: (22050, 24000, 16000),  # MPEG2
+    0: (11025, 12000, 8000),   # MPEG2.5
+}
+
+
+class MP3FormatError(Exception):
+    """Il file non contiene frame MPEG Layer III modificabili."""
+
+
+def audio_region(f, size):
+    """Limiti (inizio, fine) dei dati audio, esclusi i tag ID3v2 e ID3v1."""
+    start, end = 0, size
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        # Dimensione del tag in formato syncsafe (7 bit per byte)
+        tag_size = ((header[6] & 0x7F) << 21 | (header[7] & 0x7F) << 14 |
+                    (header[8] & 0x7F) << 7 | (header[9] & 0x7F))
+        footer = 10 if header[5] & 0x10 else 0
+        start = min(size, 10 + tag_size + footer)
+    if end - start >= 128:
+        f.seek(end - 128)
+        if f.read(3) == b'TAG':
+            end -= 128
+    return start, end
+
+
+def gain_steps(gain_db):
+    """Numero di unità di global_gain più vicino al guadagno richiesto."""
+    return int(round(gain_db / GAIN_STEP_DB))
+
+
+def parse_header(data, pos):
+    """Decodifica l'intestazione del frame in pos.
+
+    Restituisce (lunghezza del frame, versione, canali, protetto da CRC)
+    oppure None se in pos non c'è un'intestazione Layer III valida.
+    """
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version = (b1 >> 3) & 3
+    layer = (b1 >> 1) & 3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    # Versione riservata, layer diverso da III, bitrate libero o non valido
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = BITRATES[0 if mpeg1 else 1][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    length = (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+    channels = 1 if b3 >> 6 == 3 else 2
+    protected = not b1 & 1
+    return length, version, channels, protected
+
+
+def _side_info_size(mpeg1, channels):
+    if mpeg1:
+        return 17 if channels == 1 else 32
+    return 9 if channels == 1 else 17
+
+
+def _gain_bit_offsets(mpeg1, channels):
+    """Posizioni in bit dei campi global_gain dall'inizio delle side info."""
+    if mpeg1:
+        # main_data_begin (9), private_bits (5 o 3), scfsi (4 per canale),
+        # poi 2 granuli x canali da 59 bit; global_gain dopo 12 + 9 bit
+        base = 9 + (5 if channels == 1 else 3) + 4 * channels
+        return [base + granule * 59 + 21
+                for granule in range(2 * channels)]
+    # main_data_begin (8), private_bits (1 o 2), un granulo da 63 bit per canale
+    base = 8 + (1 if channels == 1 else 2)
+    return [base + channel * 63 + 21 for channel in range(channels)]
+
+
+def _is_info_frame(data, frame_start, side_info_end):
+    """True per il frame Xing/Info/VBRI iniziale, che non contiene audio."""
+    if bytes(data[side_info_end:side_info_end + 4]) in (b'Xing', b'Info'):
+        return True
+    # L'intestazione VBRI si trova sempre 32 byte dopo l'intestazione del frame
+    return bytes(data[frame_start + 36:frame_start + 40]) == b'VBRI'
+
+
+def scan_frames(data, start, end, is_cancelled=None):
+    """Trova i campi global_gain dei frame audio tra start e end.
+
+    data è un bytearray o una mmap del file, esaminato un frame alla volta.
+    Restituisce (posizioni in bit dei campi, frame protetti da CRC come
+    lista di (inizio frame, dimensione side info)). Un frame viene accettato
+    solo se è seguito da un'altra intestazione valida o dalla fine dei dati,
+    così byte spuri e tag APE o Lyrics3 in coda vengono lasciati invariati.
+    """
+    offsets = []
+    protected_frames = []
+    layouts = {}
+    pos = start
+    synced = False
+    first_frame = True
+    frames = 0
+    while pos + 4 <= end:
+        frames += 1
+        if (is_cancelled and frames % SCAN_CHECK_FRAMES == 0
+                and is_cancelled()):
+            raise OperationCancelled()
+        header = parse_header(data, pos)
+        if header is None or pos + header[0] > end:
+            # Sincronizzazione persa: cerca l'intestazione successiva
+            synced = False
+            pos = data.find(b'\xff', pos + 1, end)
+            if pos < 0:
+                break
+            continue
+        length, version, channels, protected = header
+        if not synced:
+            following = pos + length
+            if following + 4 <= end and parse_header(data, following) is None:
+                pos = data.find(b'\xff', pos + 1, end)
+                if pos < 0:
+                    break
+                continue
+            synced = True
+
+        mpeg1 = version == 3
+        side_info_start = pos + 4 + (2 if protected else 0)
+        side_info_size = _side_info_size(mpeg1, channels)
+        if first_frame:
+            first_frame = False
+            if _is_info_frame(data, pos, side_info_start + side_info_size):
+                pos += length
+                continue
+
+        layout = layouts.get((mpeg1, channels))
+        if layout is None:
+            layout = layouts[(mpeg1, channels)] = _gain_bit_offsets(
+                mpeg1, channels)
+        base = side_info_start * 8
+        offsets.extend(base + offset for offset in layout)
+        if protected:
+            protected_frames.append((pos, side_info_size))
+        pos += length
+
+    if first_frame:
+        raise MP3FormatError('Nessun frame MPEG Layer III trovato')
+    return np.array(offsets, dtype=np.int64), protected_frames
+
+
+def _crc16_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x8005) if crc & 0x8000 else crc << 1
+        table[i] = crc & 0xFFFF
+    return table.tolist()
+
+
+_CRC_TABLE = None
+
+
+def frame_crc(data, frame_start, side_info_size):
+    """CRC-16 (polinomio 0x8005) su byte 2-3 dell'intestazione e side info."""
+    global _CRC_TABLE
+    if _CRC_TABLE is None:
+        _CRC_TABLE = _crc16_table()
+    crc = 0xFFFF
+    side_info_start = frame_start + 6
+    for byte in (bytes(data[frame_start + 2:frame_start + 4]) +
+                 bytes(data[side_info_start:side_info_start + side_info_size])):
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def read_gains(buffer, offsets):
+    """Valori global_gain (8 bit) alle posizioni in bit indicate."""
+    byte_index = offsets >> 3
+    shift = 8 - (offsets & 7)
+    words = (buffer[byte_index].astype(np.uint16) << 8) | buffer[byte_index + 1]
+    return ((words >> shift) & 0xFF).astype(np.int16)
+
+
+def write_gains(buffer, offsets, gains):
+    """Scrive i valori global_gain alle posizioni in bit indicate.
+
+    I campi distano almeno 59 bit l'uno dall'altro, quindi non condividono
+    byte e la scrittura vettoriale non ha conflitti.
+    """
+    byte_index = offsets >> 3
+    shift = (8 - (offsets & 7)).astype(np.uint16)
+    words = (buffer[byte_index].astype(np.uint16) << 8) | buffer[byte_index + 1]
+    mask = (np.uint16(0xFF) << shift).astype(np.uint16)
+    words = (words & ~mask) | ((gains.astype(np.uint16) << shift) & mask)
+    buffer[byte_index] = (words >> 8).astype(np.uint8)
+    buffer[byte_index + 1] = (words & 0xFF).astype(np.uint8)
+
+
+def _patch_bytes(data, offsets, gains, protected_frames):
+    """Byte modificati dai nuovi global_gain: (posizioni, valori) ordinati.
+
+    Oltre ai byte dei campi comprende i CRC ricalcolati dei frame protetti.
+    """
+    byte_index = offsets >> 3
+    positions = np.unique(np.concatenate((byte_index, byte_index + 1)))
+    values = np.frombuffer(data, dtype=np.uint8)[positions].copy()
+    # Posizioni in bit relative al vettore dei soli byte modificati: il byte
+    # successivo a ogni campo è anche l'elemento successivo di positions
+    local = np.searchsorted(positions, byte_index) * 8 + (offsets & 7)
+    write_gains(values, local, gains)
+
+    if protected_frames:
+        crc_positions = []
+        crc_values = []
+        for frame_start, side_info_size in protected_frames:
+            frame_end = frame_start + 6 + side_info_size
+            frame = bytearray(data[frame_start:frame_end])
+            first, last = np.searchsorted(positions, (frame_start, frame_end))
+            for position, value in zip(positions[first:last].tolist(),
+                                       values[first:last].tolist()):
+                frame[position - frame_start] = value
+            crc = frame_crc(frame, 0, side_info_size)
+            crc_positions += (frame_start + 4, frame_start + 5)
+            crc_values += (crc >> 8, crc & 0xFF)
+        positions = np.concatenate((positions, crc_positions))
+        values = np.concatenate((values, np.array(crc_values, np.uint8)))
+        order = np.argsort(positions, kind='stable')
+        positions, values = positions[order], values[order]
+    return positions, values
+
+
+def apply_gain_steps(file_path, steps, output_path, is_cancelled=None):
+    """Scrive in output_path il file con global_gain spostato di steps unità.
+
+    Il file viene letto tramite mmap e copiato a blocchi, modificando solo
+    i byte dei campi e dei CRC; tra un blocco e l'altro si controlla
+    is_cancelled. I tag e i frame non audio vengono copiati invariati.
+    Restituisce (granuli modificati, granuli limitati all'intervallo 0-255).
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise MP3FormatError('Nessun frame MPEG Layer III trovato')
+        start, end = audio_region(f, size)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offsets, protected_frames = scan_frames(data, start, end,
+                                                    is_cancelled)
+            clipped = 0
+            positions = values = np.zeros(0, dtype=np.int64)
+            if steps and len(offsets):
+                gains = read_gains(np.frombuffer(data, dtype=np.uint8),
+                                   offsets)
+                # I granuli muti (global_gain 0) restano tali
+                new_gains = np.where(gains > 0, gains + steps, 0)
+                clipped = int(np.count_nonzero((new_gains < 0)
+                                               | (new_gains > 255)))
+                np.clip(new_gains, 0, 255, out=new_gains)
+                positions, values = _patch_bytes(data, offsets, new_gains,
+                                                 protected_frames)
+
+            with open(output_path, 'wb') as out:
+                for chunk_start in range(0, size, COPY_CHUNK_SIZE):
+                    if is_cancelled and is_cancelled():
+                        raise OperationCancelled()
+                    chunk_end = min(size, chunk_start + COPY_CHUNK_SIZE)
+                    chunk = bytearray(data[chunk_start:chunk_end])
+                    first, last = np.searchsorted(positions,
+                                                  (chunk_start, chunk_end))
+                    if last > first:
+                        view = np.frombuffer(chunk, dtype=np.uint8)
+                        view[positions[first:last] - chunk_start] = \
+                            values[first:last]
+                    out.write(chunk)
+    return len(offsets), clipped
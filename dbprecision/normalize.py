@@ -0,0 +1,511 @@
+"""Normalizzazione di un singolo file MP3, senza dipendenze da PyQt6.
+
+normalize_file è una funzione di modulo (quindi serializzabile) così da poter
+essere eseguita sia nel thread della GUI sia in un processo del pool.
+L'avanzamento viene comunicato tramite la callback report(tipo, *dati):
+
+    report('progress', row, percentuale)
+    report('log', messaggio)
+    report('timing', row, percorso, secondi di audio, {fase: secondi})
+
+L'evento 'timing' arriva una volta per file normalizzato, con i tempi delle
+fasi misurati da uno StageTimer (vedi dbprecision.timing). Durante la
+decodifica e la codifica la percentuale segue i frame elaborati o
+l'uscita -progress di ffmpeg invece di saltare tra valori fissi.
+
+Con MODE_GAIN il file non viene ricodificato: il volume cambia a passi di
+circa 1.5 dB riscrivendo il campo global_gain dei frame (vedi mp3gain).
+Con MODE_TAGS l'audio non viene toccato: guadagno e picco vengono scritti
+come tag ReplayGain e applicati dal player.
+
+In ogni modalità il file riceve il marcatore TXXX:DBPRECISION (vedi
+dbprecision.journal) prima di sostituire l'originale: un lotto ripreso
+dopo un'interruzione salta i file già completati.
+
+Se il volume del file è già stato misurato dall'analisi, la misura può
+essere passata come measurement = (LoudnessResult, file_stamp): finché il
+file non è cambiato la normalizzazione si riduce a un solo passaggio ffmpeg.
+
+In modalità album ogni file riceve album (AlbumGain, vedi dbprecision.album)
+e il guadagno applicato è quello comune all'album invece di quello che
+porterebbe il singolo file a options.target_db.
+"""
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from mutagen.id3 import ID3
+from mutagen.mp3 import MP3
+
+from dbprecision.analysis import (
+    METRIC_RMS, OperationCancelled, amplify, analyze_file, analyze_stream,
+    apply_gain, decode_to_array, decode_to_wav, encode_from_array, encode_wav,
+    float_to_pcm, gain_to_target, load_wav_samples, measure_loudness,
+    normalize_stream, write_wav)
+from dbprecision.cache import file_stamp
+from dbprecision.journal import write_marker
+from dbprecision.mp3gain import GAIN_STEP_DB, apply_gain_steps, gain_steps
+from dbprecision.options import (  # noqa: F401 (reesportati)
+    MODE_GAIN, MODE_REENCODE, MODE_TAGS, NormalizeOptions)
+from dbprecision.plan import ACTION_GAIN
+from dbprecision.replaygain import write_replaygain_tags
+from dbprecision.timing import StageTimer
+
+
+def _ignore_report(*event):
+    pass
+
+
+def _never_cancelled():
+    return False
+
+
+def _check_cancelled(is_cancelled):
+    if is_cancelled():
+        raise OperationCancelled()
+
+
+def _progress_range(report, row, start, end):
+    """on_progress(frazione) che riporta l'avanzamento tra start ed end."""
+    def on_progress(fraction):
+        report('progress', row, start + int((end - start) * fraction))
+    return on_progress
+
+
+def bitrate_options(options, original_bitrate):
+    """Opzioni ffmpeg per il bitrate di uscita."""
+    bitrate_kbps = options.output_bitrate_kbps()
+    if bitrate_kbps is None:
+        # Bitrate del file, limitato al massimo di MPEG1 Layer III
+        bitrate_kbps = (min(round(original_bitrate / 1000), 320)
+                        if original_bitrate else 320)
+    return ['-b:a', f"{bitrate_kbps}k"]
+
+
+def measurement_is_current(file_path, measurement, metric=METRIC_RMS):
+    """True se la misura (LoudnessResult, file_stamp) vale ancora per il file.
+
+    La misura deve anche contenere il valore della metrica richiesta.
+    """
+    if measurement is None or measurement[0].level(metric) is None:
+        return False
+    try:
+        return file_stamp(file_path) == tuple(measurement[1])
+    except OSError:
+        return False
+
+
+def _temp_output_path(file_path, row):
+    """File temporaneo accanto all'originale per l'output normalizzato."""
+    # Usa un nome temporaneo semplice per evitare problemi con caratteri speciali
+    directory = os.path.dirname(file_path)
+    temp_name = f"dbprecision_{int(time.time() * 1000)}_{row}.tmp"
+    return os.path.normpath(os.path.join(directory, temp_name))
+
+
+def _report_timing(report, row, file_path, loudness, timer):
+    report('timing', row, file_path, loudness.duration if loudness else 0.0,
+           timer.spans)
+
+
+def _write_marker(file_path, options, gain_db, report):
+    """Scrive il marcatore di normalizzazione; un errore è solo un avviso."""
+    try:
+        write_marker(file_path, options, gain_db)
+    except Exception as e:
+        report('log', f"Avviso: impossibile scrivere il marcatore in {os.path.basename(file_path)}: {str(e)}")
+
+
+def _replace_file(temp_final_path, file_path, report):
+    """Sostituisce l'originale con il file normalizzato; False se non riesce."""
+    try:
+        # Su Windows, potrebbe essere necessario rimuovere il file originale prima
+        if os.path.exists(file_path) and os.name == 'nt':
+            os.remove(file_path)
+
+        # Sposta il file temporaneo al posto dell'originale
+        shutil.move(temp_final_path, file_path)
+        return True
+    except Exception as move_error:
+        report('log', f"Errore durante sostituzione file {os.path.basename(file_path)}: {str(move_error)}")
+        return False
+
+
+def normalize_file(file_path, row, options, measurement=None, report=None,
+                   is_cancelled=None, album=None):
+    """Normalizza un file MP3 sovrascrivendo l'originale.
+
+    Restituisce True se il file è stato normalizzato, False in caso di errore
+    o annullamento (gli errori vengono riportati con report('log', ...)).
+    """
+    report = report or _ignore_report
+    is_cancelled = is_cancelled or _never_cancelled
+    if options.mode == MODE_GAIN:
+        return normalize_gain_only(file_path, row, options, measurement,
+                                   report, is_cancelled, album)
+    if options.mode == MODE_TAGS:
+        return write_gain_tags(file_path, row, options, measurement, report,
+                               is_cancelled, album)
+    filename = os.path.basename(file_path)
+    ffmpeg_cmd = options.ffmpeg_cmd
+    timer = StageTimer()
+    temp_path = None
+    temp_wav_path = None
+    input_wav_path = None
+    temp_final_path = None
+    try:
+        # Normalizza il path del file di input
+        file_path = os.path.normpath(file_path)
+
+        # Riusa il volume misurato dall'analisi se il file non è cambiato
+        reuse = measurement_is_current(file_path, measurement, options.metric)
+        if not options.use_pipes and not reuse:
+            # Crea un file temporaneo con path normalizzati
+            fd, temp_path = tempfile.mkstemp(suffix='.mp3')
+            os.close(fd)
+            temp_path = os.path.normpath(temp_path)
+            temp_wav_path = os.path.normpath(
+                temp_path.replace('.mp3', '.wav'))
+            input_wav_path = os.path.normpath(
+                temp_path.replace('.mp3', '_input.wav'))
+
+        with timer.stage('probe'):
+            # Salva i metadati originali
+            try:
+                original_tags = ID3(file_path)
+            except Exception:
+                original_tags = None
+
+            # Ottieni informazioni sul bitrate originale se necessario
+            original_bitrate = None
+            if options.keep_bitrate:
+                try:
+                    original_bitrate = MP3(file_path).info.bitrate
+                except Exception:
+                    report('log', f"Avviso: impossibile determinare il bitrate di {filename}, verrà usato 320k")
+                    original_bitrate = 320000
+
+        _check_cancelled(is_cancelled)
+
+        report('progress', row, 20)  # 20% - Inizio conversione MP3 to WAV
+
+        streaming = options.use_pipes and options.block_frames > 0
+        if reuse:
+            loudness = measurement[0]
+        elif streaming:
+            # Primo passaggio a blocchi: somma dei quadrati e picco
+            loudness = analyze_stream(
+                ffmpeg_cmd, file_path, options.block_frames, is_cancelled,
+                options.metric, timer, _progress_range(report, row, 20, 60))
+        elif options.use_pipes:
+            # Decodifica l'MP3 direttamente in memoria tramite pipe
+            with timer.stage('decode'):
+                samples, n_channels, framerate = decode_to_array(
+                    ffmpeg_cmd, file_path, is_cancelled=is_cancelled)
+        else:
+            # Converti MP3 in WAV per l'analisi
+            with timer.stage('decode'):
+                decode_to_wav(ffmpeg_cmd, file_path, input_wav_path,
+                              is_cancelled)
+
+            _check_cancelled(is_cancelled)
+
+            report('progress', row, 40)  # 40% - Analisi audio
+
+            # Leggi i dati audio come array NumPy
+            with timer.stage('decode'):
+                samples, n_channels, sampwidth, framerate, is_float = load_wav_samples(
+                    input_wav_path)
+
+        _check_cancelled(is_cancelled)
+
+        report('progress', row, 60)  # 60% - Normalizzazione
+
+        # Calcola il guadagno necessario
+        if not streaming and not reuse:
+            with timer.stage('analyze'):
+                loudness = measure_loudness(samples, framerate, n_channels,
+                                            options.metric, is_cancelled)
+        if album is None:
+            gain_linear = gain_to_target(options.target_db,
+                                         loudness.level(options.metric))
+        else:
+            gain_linear = 10 ** (album.gain_db / 20.0)
+
+        # Con l'elaborazione a blocchi o con la misura già nota il guadagno
+        # si applica in codifica
+        decoded = not reuse and not streaming
+        if decoded and options.use_pipes:
+            with timer.stage('gain'):
+                amplify(samples, gain_linear, is_cancelled)
+        elif decoded:
+            with timer.stage('gain'):
+                samples *= gain_linear
+
+                # Limita e riconverti i valori normalizzati in bytes
+                normalized_frames = float_to_pcm(samples, sampwidth, is_float)
+                del samples
+
+            _check_cancelled(is_cancelled)
+
+            report('progress', row, 80)  # 80% - Scrittura file normalizzato
+
+            # Scrivi il file WAV normalizzato
+            with timer.stage('encode'):
+                write_wav(temp_wav_path, normalized_frames, n_channels,
+                          sampwidth, framerate, is_float)
+            del normalized_frames
+
+        # Prepara le opzioni per ffmpeg
+        ffmpeg_options = bitrate_options(options, original_bitrate)
+
+        temp_final_path = _temp_output_path(file_path, row)
+
+        _check_cancelled(is_cancelled)
+
+        report('progress', row, 90)  # 90% - Conversione finale
+
+        encode_progress = _progress_range(report, row, 90, 100)
+        if reuse:
+            # Unico passaggio: decodifica, guadagno e codifica in ffmpeg
+            with timer.stage('encode'):
+                ffmpeg_warnings = apply_gain(
+                    ffmpeg_cmd, file_path, gain_linear, ffmpeg_options,
+                    temp_final_path, loudness.duration, encode_progress,
+                    is_cancelled)
+        elif streaming:
+            # Secondo passaggio a blocchi: guadagno e codifica in streaming
+            ffmpeg_warnings = normalize_stream(
+                ffmpeg_cmd, file_path, gain_linear, ffmpeg_options,
+                temp_final_path, options.block_frames, is_cancelled, timer,
+                encode_progress)
+        elif options.use_pipes:
+            # Passa il PCM normalizzato direttamente allo stdin dell'encoder
+            with timer.stage('encode'):
+                ffmpeg_warnings = encode_from_array(
+                    ffmpeg_cmd, samples, framerate, n_channels,
+                    ffmpeg_options, temp_final_path, is_cancelled)
+            del samples
+        else:
+            # Verifica che il file WAV normalizzato esista e sia valido
+            if not os.path.exists(temp_wav_path):
+                raise Exception(
+                    f"File WAV normalizzato non trovato: {temp_wav_path}")
+
+            if os.path.getsize(temp_wav_path) == 0:
+                raise Exception("File WAV normalizzato vuoto")
+
+            # Converti WAV normalizzato in MP3 temporaneo (specifica formato MP3 esplicitamente)
+            with timer.stage('encode'):
+                ffmpeg_warnings = encode_wav(
+                    ffmpeg_cmd, temp_wav_path, ffmpeg_options,
+                    temp_final_path, loudness.duration, encode_progress,
+                    is_cancelled)
+
+        if ffmpeg_warnings:
+            report('log', f"Avviso ffmpeg: {ffmpeg_warnings}")
+
+        # Ripristina i metadati originali nel file temporaneo
+        if original_tags:
+            with timer.stage('tags'):
+                try:
+                    new_tags = ID3(temp_final_path)
+                    new_tags.update(original_tags)
+                    new_tags.save()
+                except Exception:
+                    pass
+
+        # Il marcatore viaggia con il file normalizzato
+        with timer.stage('tags'):
+            _write_marker(temp_final_path, options,
+                          20 * math.log10(gain_linear), report)
+
+        _check_cancelled(is_cancelled)
+
+        # Sovrascrivi il file originale con quello normalizzato
+        with timer.stage('replace'):
+            if not _replace_file(temp_final_path, file_path, report):
+                return False
+        temp_final_path = None
+
+        report('progress', row, 100)  # 100% - Completato
+        report('log', f"File normalizzato: {filename}")
+        _report_timing(report, row, file_path, loudness, timer)
+        return True
+
+    except Exception as e:
+        if not isinstance(e, OperationCancelled):
+            report('log', f"Errore durante la normalizzazione di {filename}: {str(e)}")
+        return False
+
+    finally:
+        # Cleanup di tutti i file temporanei rimasti
+        for temp_file in (temp_path, temp_wav_path, input_wav_path,
+                          temp_final_path):
+            if temp_file and os.path.exists(temp_file):
+                try:
+                    os.unlink(temp_file)
+                except OSError:
+                    pass  # Ignora errori di cleanup
+
+
+def normalize_planned(file_path, row, options, measurement, action,
+                      album=None, report=None, is_cancelled=None):
+    """normalize_file con l'azione e l'album decisi dal piano del lotto.
+
+    In modalità ricodifica il piano può scegliere il guadagno senza
+    ricodifica (ACTION_GAIN) quando porta il file al livello richiesto
+    entro la tolleranza.
+    """
+    if action == ACTION_GAIN and options.mode == MODE_REENCODE:
+        return normalize_gain_only(file_path, row, options, measurement,
+                                   report, is_cancelled, album)
+    return normalize_file(file_path, row, options, measurement, report,
+                          is_cancelled, album)
+
+
+def _current_loudness(file_path, options, measurement, is_cancelled, timer,
+                      on_progress=None):
+    """Volume del file: dalla misura dell'analisi se ancora valida."""
+    if measurement_is_current(file_path, measurement, options.metric):
+        return measurement[0]
+    if options.use_pipes and options.block_frames > 0:
+        # A blocchi decodifica e analisi vengono misurate separatamente
+        return analyze_stream(options.ffmpeg_cmd, file_path,
+                              options.block_frames, is_cancelled,
+                              options.metric, timer, on_progress)
+    with timer.stage('analyze'):
+        return analyze_file(file_path, options.ffmpeg_cmd, options.use_pipes,
+                            options.block_frames, is_cancelled,
+                            options.metric)
+
+
+def normalize_gain_only(file_path, row, options, measurement=None,
+                        report=None, is_cancelled=None, album=None):
+    """Normalizza un file MP3 senza ricodificarlo.
+
+    Il guadagno viene arrotondato al multiplo di GAIN_STEP_DB più vicino e
+    applicato ai campi global_gain; i dati audio compressi non cambiano.
+    """
+    report = report or _ignore_report
+    is_cancelled = is_cancelled or _never_cancelled
+    filename = os.path.basename(file_path)
+    timer = StageTimer()
+    temp_final_path = None
+    try:
+        file_path = os.path.normpath(file_path)
+
+        report('progress', row, 20)  # 20% - Misura del volume
+
+        loudness = _current_loudness(file_path, options, measurement,
+                                     is_cancelled, timer,
+                                     _progress_range(report, row, 20, 60))
+
+        _check_cancelled(is_cancelled)
+
+        report('progress', row, 60)  # 60% - Calcolo del guadagno
+
+        if album is None:
+            steps = gain_steps(options.target_db
+                               - loudness.level(options.metric))
+        else:
+            steps = gain_steps(album.gain_db)
+        if steps == 0:
+            with timer.stage('tags'):
+                _write_marker(file_path, options, 0.0, report)
+            report('progress', row, 100)
+            report('log', f"File già al livello richiesto: {filename}")
+            _report_timing(report, row, file_path, loudness, timer)
+            return True
+
+        gain_db = steps * GAIN_STEP_DB
+        if loudness.highest_peak * 10 ** (gain_db / 20.0) > 1.0:
+            report('log', f"Avviso: con {gain_db:+.1f} dB {filename} supera il fondo scala e può distorcere")
+
+        report('progress', row, 80)  # 80% - Riscrittura dei frame
+
+        temp_final_path = _temp_output_path(file_path, row)
+        with timer.stage('gain'):
+            _, clipped = apply_gain_steps(file_path, steps, temp_final_path,
+                                          is_cancelled)
+        if clipped:
+            report('log', f"Avviso: {clipped} granuli di {filename} hanno raggiunto il limite di global_gain")
+        with timer.stage('tags'):
+            _write_marker(temp_final_path, options, gain_db, report)
+
+        _check_cancelled(is_cancelled)
+
+        with timer.stage('replace'):
+            if not _replace_file(temp_final_path, file_path, report):
+                return False
+        temp_final_path = None
+
+        report('progress', row, 100)  # 100% - Completato
+        report('log', f"File normalizzato senza ricodifica ({gain_db:+.1f} dB): {filename}")
+        _report_timing(report, row, file_path, loudness, timer)
+        return True
+
+    except Exception as e:
+        if not isinstance(e, OperationCancelled):
+            report('log', f"Errore durante la normalizzazione di {filename}: {str(e)}")
+        return False
+
+    finally:
+        if temp_final_path and os.path.exists(temp_final_path):
+            try:
+                os.unlink(temp_final_path)
+            except OSError:
+                pass  # Ignora errori di cleanup
+
+
+def write_gain_tags(file_path, row, options, measurement=None, report=None,
+                    is_cancelled=None, album=None):
+    """Scrive guadagno e picco come tag ReplayGain senza toccare l'audio.
+
+    Il guadagno è quello che porterebbe il file a options.target_db; basta
+    riscrivere i tag per cambiare il livello, senza rielaborare l'audio.
+    Con album vengono scritti anche guadagno e picco dell'album.
+    """
+    report = report or _ignore_report
+    is_cancelled = is_cancelled or _never_cancelled
+    filename = os.path.basename(file_path)
+    timer = StageTimer()
+    try:
+        file_path = os.path.normpath(file_path)
+
+        report('progress', row, 20)  # 20% - Misura del volume
+
+        loudness = _current_loudness(file_path, options, measurement,
+                                     is_cancelled, timer,
+                                     _progress_range(report, row, 20, 60))
+
+        _check_cancelled(is_cancelled)
+
+        report('progress', row, 60)  # 60% - Scrittura dei tag
+
+        gain_db = options.target_db - loudness.level(options.metric)
+        with timer.stage('tags'):
+            if album is None:
+                write_replaygain_tags(file_path, gain_db,
+                                      loudness.highest_peak)
+                _write_marker(file_path, options, gain_db, report)
+            else:
+                write_replaygain_tags(file_path, gain_db,
+                                      loudness.highest_peak, album.gain_db,
+                                      album.peak)
+                _write_marker(file_path, options, album.gain_db, report)
+
+        report('progress', row, 100)  # 100% - Completato
+        if album is None:
+            report('log', f"Tag ReplayGain scritti ({gain_db:+.2f} dB): {filename}")
+        else:
+            report('log', f"Tag ReplayGain scritti ({gain_db:+.2f} dB, album {album.gain_db:+.2f} dB): {filename}")
+        _report_timing(report, row, file_path, loudness, timer)
+        return True
+
+    except Exception as e:
+        if not isinstance(e, OperationCancelled):
+            report('log', f"Errore durante la scrittura dei tag di {filename}: {str(e)}")
+        return False
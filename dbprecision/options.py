@@ -0,0 +1,83 @@
+"""Costanti e parametri dei lotti, importabili senza NumPy né mutagen.
+
+GUI e riga di comando li usano prima di avviare un lavoro; analysis e
+normalize li reimportano, quindi restano disponibili anche da lì.
+"""
+
+# Messaggio di errore restituito da analyze_mp3 quando l'analisi è annullata
+ANALYSIS_CANCELLED = 'Annullato'
+
+# Frame per blocco predefiniti nell'elaborazione a blocchi (~1.5 s a 44.1 kHz)
+DEFAULT_BLOCK_FRAMES = 1 << 16
+
+# Misure di volume usabili come riferimento per la normalizzazione
+METRIC_RMS = 'rms'  # RMS di tutti i campioni, in dB
+METRIC_LUFS = 'lufs'  # Loudness integrata ITU-R BS.1770 / EBU R128
+
+# Motori di analisi del volume
+BACKEND_NUMPY = 'numpy'  # Decodifica in PCM e misura con NumPy
+BACKEND_FFMPEG = 'ffmpeg'  # Filtri astats/ebur128, più file per processo
+
+# Filtri di ffmpeg richiesti da BACKEND_FFMPEG per ciascuna metrica
+BACKEND_FFMPEG_FILTERS = {METRIC_RMS: ('astats',),
+                          METRIC_LUFS: ('astats', 'ebur128')}
+
+# Modalità di normalizzazione
+MODE_REENCODE = 'reencode'  # Decodifica, guadagno esatto e ricodifica
+MODE_GAIN = 'gain'  # Modifica di global_gain senza ricodifica
+MODE_TAGS = 'tags'  # Solo tag ReplayGain, audio invariato
+
+# Bitrate di uscita della ricodifica (kbps) per quality_value 0, 1 e 2
+QUALITY_BITRATES = (192, 256, 320)
+
+# Raggruppamento dei file per la modalità album (vedi dbprecision.album)
+ALBUM_OFF = 'off'  # Ogni file ha il proprio guadagno
+ALBUM_FOLDER = 'folder'  # Un guadagno comune per cartella
+ALBUM_TAG = 'tag'  # Un guadagno comune per album e artista dell'album nei tag
+
+# Distanza dal livello richiesto entro cui un file non viene modificato (dB)
+DEFAULT_TOLERANCE_DB = 0.1
+
+
+class AnalysisOptions:
+    """Parametri dell'analisi comuni a tutti i file di un lotto."""
+
+    def __init__(self, use_pipes=True, block_frames=0, ffmpeg_cmd='ffmpeg',
+                 metric=METRIC_RMS, backend=BACKEND_NUMPY):
+        self.use_pipes = use_pipes
+        self.block_frames = block_frames
+        self.ffmpeg_cmd = ffmpeg_cmd
+        self.metric = metric
+        self.backend = backend  # BACKEND_*
+
+
+class NormalizeOptions:
+    """Parametri di normalizzazione comuni a tutti i file di un lotto."""
+
+    def __init__(self, target_db, keep_bitrate=True, quality_value=2,
+                 use_pipes=True, block_frames=0, ffmpeg_cmd='ffmpeg',
+                 mode=MODE_REENCODE, metric=METRIC_RMS,
+                 tolerance_db=DEFAULT_TOLERANCE_DB, album=ALBUM_OFF):
+        self.target_db = target_db
+        self.keep_bitrate = keep_bitrate
+        self.quality_value = quality_value
+        self.use_pipes = use_pipes  # Decodifica/codifica tramite pipe, senza WAV
+        # Frame per blocco nell'elaborazione a memoria costante (0 = file intero)
+        self.block_frames = block_frames
+        self.ffmpeg_cmd = ffmpeg_cmd
+        self.mode = mode
+        # Misura portata a target_db: dB RMS o LUFS (METRIC_*)
+        self.metric = metric
+        # File entro questa distanza da target_db restano invariati (vedi
+        # dbprecision.plan)
+        self.tolerance_db = tolerance_db
+        # Con ALBUM_FOLDER o ALBUM_TAG tutti i file di un album ricevono lo
+        # stesso guadagno, calcolato dal volume dell'album intero
+        self.album = album
+
+    def output_bitrate_kbps(self):
+        """Bitrate di uscita scelto (kbps), o None se resta quello del file."""
+        if self.keep_bitrate:
+            return None
+        return QUALITY_BITRATES[
+            self.quality_value if self.quality_value in (0, 1) else 2]
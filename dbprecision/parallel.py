@@ -0,0 +1,244 @@
+"""Esecuzione parallela di lavori indipendenti su un pool di processi.
+
+Le funzioni eseguite ricevono le callback report(tipo, *dati) e
+is_cancelled(); nei processi del pool gli eventi viaggiano su una coda
+multiprocessing e l'annullamento su un Event condiviso, così il thread che
+coordina il lotto può inoltrarli alla GUI senza che i processi tocchino Qt.
+
+I processi del pool non nascono con fork dal processo che coordina, che con
+la GUI ha già i thread di Qt: si usa forkserver dove esiste, altrimenti
+spawn. Se un processo del pool muore (memoria esaurita, crash di una
+libreria) il lotto termina con WorkerCrashed, dopo aver consegnato i
+risultati dei lavori già completati.
+"""
+import multiprocessing
+import os
+import queue
+import signal
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Intervallo massimo di attesa tra due controlli di eventi e annullamento
+POLL_INTERVAL = 0.1
+
+# Lavori inviati al pool per ogni processo: limita la memoria e rende
+# l'annullamento immediato anche con lotti di migliaia di file
+JOBS_PER_WORKER = 2
+
+# Evento interno con cui un processo del pool segnala l'avvio di un lavoro
+_STARTED = '_started'
+
+_events = None
+_cancel_event = None
+
+
+class WorkerCrashed(Exception):
+    """Un processo del pool è terminato in modo anomalo.
+
+    keys sono le chiavi dei lavori rimasti senza risultato, compresi quelli
+    non ancora avviati.
+    """
+
+    def __init__(self, keys):
+        super().__init__(
+            f"un processo di elaborazione è terminato in modo anomalo: "
+            f"{len(keys)} lavori non completati")
+        self.keys = keys
+
+
+def default_workers():
+    """Numero di processi predefinito: uno per CPU."""
+    return os.cpu_count() or 1
+
+
+def _ignore_start(key):
+    pass
+
+
+def _ignore_poll():
+    pass
+
+
+def _pool_context():
+    """Contesto multiprocessing senza fork del processo chiamante."""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _init_worker(events, cancel_event):
+    global _events, _cancel_event
+    _events = events
+    _cancel_event = cancel_event
+    # Ctrl+C arriva a tutto il gruppo di processi: l'annullamento passa
+    # invece dall'Event condiviso, impostato dal processo che coordina
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_in_worker(func, job, args):
+    """Esegue un lavoro nel pool; restituisce (risultato, eventi inviati).
+
+    Gli eventi viaggiano sulla coda con il numero del lavoro: il risultato
+    può arrivare prima degli ultimi eventi, e il conteggio permette di
+    attenderli prima di on_result.
+    """
+    sent = [1]
+    _events.put((job, (_STARTED,)))
+
+    def report(*event):
+        sent[0] += 1
+        _events.put((job, event))
+
+    result = func(*args, report=report, is_cancelled=_cancel_event.is_set)
+    return result, sent[0]
+
+
+class ParallelRunner:
+    """Esegue func(*args, report=..., is_cancelled=...) per ogni lavoro.
+
+    Con max_workers uguale a 1 i lavori vengono eseguiti in sequenza nel
+    thread chiamante, senza avviare processi.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max(1, max_workers or default_workers())
+
+    def run(self, func, jobs, on_result, on_event, is_cancelled,
+            on_start=None, on_poll=None):
+        """Esegue i lavori e restituisce False se il lotto è stato annullato.
+
+        Solleva WorkerCrashed se un processo del pool muore.
+
+        jobs è una sequenza di (chiave, args); on_start(chiave) viene chiamata
+        quando un lavoro inizia l'esecuzione (non quando entra in coda),
+        on_result(chiave, risultato) per ogni lavoro terminato e
+        on_event(*evento) per ogni evento riportato dai lavori. on_poll()
+        viene chiamata anche quando non arrivano eventi: a ogni giro di
+        attesa del pool (circa ogni POLL_INTERVAL) e, in sequenza, a ogni
+        controllo di is_cancelled da parte del lavoro. Le callback vengono
+        sempre chiamate nel thread che esegue run.
+        """
+        on_start = on_start or _ignore_start
+        on_poll = on_poll or _ignore_poll
+        if self.max_workers == 1:
+            return self._run_sequential(func, jobs, on_result, on_event,
+                                        is_cancelled, on_start, on_poll)
+        return self._run_pool(func, jobs, on_result, on_event, is_cancelled,
+                              on_start, on_poll)
+
+    def _run_sequential(self, func, jobs, on_result, on_event, is_cancelled,
+                        on_start, on_poll):
+        def check_cancelled():
+            on_poll()
+            return is_cancelled()
+
+        for key, args in jobs:
+            if is_cancelled():
+                return False
+            on_start(key)
+            on_result(key, func(*args, report=on_event,
+                                is_cancelled=check_cancelled))
+        return not is_cancelled()
+
+    def _run_pool(self, func, jobs, on_result, on_event, is_cancelled,
+                  on_start, on_poll):
+        context = _pool_context()
+        events = context.Queue()
+        cancel_event = context.Event()
+        pending_jobs = enumerate(jobs)
+        running = {}  # Future -> numero del lavoro
+        keys = {}  # Numero del lavoro -> chiave
+        received = {}  # Numero del lavoro -> eventi ricevuti
+        # Lavori terminati: (risultato, eventi inviati), finché non arrivano
+        # tutti i loro eventi
+        finished = {}
+        max_running = self.max_workers * JOBS_PER_WORKER
+        # Lavori persi con la morte di un processo del pool
+        crashed = []
+
+        def drain_events(timeout=0):
+            while True:
+                try:
+                    if timeout:
+                        job, event = events.get(timeout=timeout)
+                        timeout = 0
+                    else:
+                        job, event = events.get_nowait()
+                except queue.Empty:
+                    return
+                if job not in keys:
+                    continue  # Lavoro perso con la morte di un processo
+                received[job] = received.get(job, 0) + 1
+                if event[0] == _STARTED:
+                    on_start(keys[job])
+                else:
+                    on_event(*event)
+
+        def deliver_results(lost_events=False):
+            for job, (result, sent) in list(finished.items()):
+                if lost_events or received.get(job, 0) >= sent:
+                    del finished[job]
+                    received.pop(job, None)
+                    on_result(keys.pop(job), result)
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=context,
+            initializer=_init_worker,
+            initargs=(events, cancel_event))
+        try:
+            while True:
+                if is_cancelled():
+                    cancel_event.set()
+                    for future in running:
+                        future.cancel()
+
+                if not cancel_event.is_set() and not crashed:
+                    while len(running) < max_running:
+                        job = next(pending_jobs, None)
+                        if job is None:
+                            break
+                        number, (key, args) = job
+                        try:
+                            future = executor.submit(
+                                _run_in_worker, func, number, args)
+                        except BrokenProcessPool:
+                            crashed.append(key)
+                            break
+                        keys[number] = key
+                        running[future] = number
+
+                if not running and not finished:
+                    break
+
+                if running:
+                    done, _ = wait(running, timeout=POLL_INTERVAL,
+                                   return_when=FIRST_COMPLETED)
+                    drain_events()
+                else:
+                    # Restano solo gli ultimi eventi di lavori terminati
+                    done = ()
+                    drain_events(POLL_INTERVAL)
+                for future in done:
+                    number = running.pop(future)
+                    if future.cancelled():
+                        del keys[number]
+                        continue
+                    try:
+                        finished[number] = future.result()
+                    except BrokenProcessPool:
+                        # Gli altri lavori in corso falliscono allo stesso modo
+                        crashed.append(keys.pop(number))
+                        received.pop(number, None)
+                # Un processo morto può non aver inviato gli ultimi eventi
+                # dei lavori che aveva già completato
+                deliver_results(bool(crashed) and not running)
+                on_poll()
+        finally:
+            executor.shutdown(wait=True)
+            drain_events()
+
+        if crashed:
+            # Anche i lavori mai inviati al pool restano senza risultato
+            crashed.extend(key for _, (key, _) in pending_jobs)
+            raise WorkerCrashed(crashed)
+        return not cancel_event.is_set()
@@ -0,0 +1,22 @@
+"""Percorsi delle cartelle dati dell'utente."""
+import os
+import sys
+
+APP_NAME = 'dBPrecision'
+
+
+def user_data_dir():
+    """Cartella dei dati persistenti dell'applicazione (creata se manca)."""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(
+            os.path.expanduser('~'), 'AppData', 'Local')
+        path = os.path.join(base, APP_NAME)
+    elif sys.platform == 'darwin':
+        path = os.path.join(os.path.expanduser('~'), 'Library',
+                            'Application Support', APP_NAME)
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(
+            os.path.expanduser('~'), '.local', 'share')
+        path = os.path.join(base, APP_NAME.lower())
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,336 @@
+"""Piano di un lotto di normalizzazione, prima di scrivere qualsiasi file.
+
+Ogni file riceve un'azione: già normalizzato (registro o marcatore, vedi
+dbprecision.journal), già entro la tolleranza dal livello richiesto,
+guadagno senza ricodifica, ricodifica o tag ReplayGain. In modalità
+ricodifica un file il cui guadagno è un multiplo di GAIN_STEP_DB entro la
+tolleranza, e che non supera il fondo scala, viene normalizzato senza
+ricodifica: il risultato è lo stesso senza una generazione di perdita.
+Con un bitrate di uscita scelto (non quello del file) ogni file con un
+bitrate diverso viene invece ricodificato, anche se già al livello.
+In modalità album (vedi dbprecision.album) guadagno e picco sono quelli
+dell'album, quindi tutti i suoi file ricevono la stessa azione.
+
+Il tempo di ogni file è stimato dalla sua durata e dalla velocità misurata
+nei lotti precedenti (secondi di audio per secondo di elaborazione, salvata
+da ThroughputHistory). I file da elaborare vengono ordinati dal più lungo:
+con più processi i file lunghi non restano per ultimi su un solo processo.
+"""
+import heapq
+import json
+import os
+import time
+
+from dbprecision.mp3gain import GAIN_STEP_DB, gain_steps
+from dbprecision.options import ALBUM_OFF, MODE_GAIN, MODE_REENCODE, MODE_TAGS
+from dbprecision.paths import user_data_dir
+from dbprecision.timing import format_duration
+
+ACTION_DONE = 'done'  # Già normalizzato con le stesse opzioni
+ACTION_SKIP = 'skip'  # Livello già entro la tolleranza
+ACTION_GAIN = 'gain'  # global_gain senza ricodifica
+ACTION_REENCODE = 'reencode'  # Decodifica, guadagno e ricodifica
+ACTION_TAGS = 'tags'  # Solo tag ReplayGain
+
+ACTION_LABELS = {
+    ACTION_DONE: 'già normalizzato',
+    ACTION_SKIP: 'entro la tolleranza',
+    ACTION_GAIN: 'guadagno senza ricodifica',
+    ACTION_REENCODE: 'ricodifica',
+    ACTION_TAGS: 'tag ReplayGain',
+}
+
+# Azioni che non richiedono lavoro
+SKIPPED_ACTIONS = (ACTION_DONE, ACTION_SKIP)
+
+# Azioni che riscrivono l'audio: la misura in cache del file non vale più
+AUDIO_ACTIONS = (ACTION_GAIN, ACTION_REENCODE)
+
+THROUGHPUT_FILENAME = 'throughput.json'
+
+# Secondi di audio elaborati per secondo di lavoro di un processo, usati
+# finché non ci sono misure; la chiave con '+analyze' vale per i file senza
+# una misura dell'analisi, che vanno prima decodificati e misurati
+DEFAULT_THROUGHPUT = {
+    ACTION_REENCODE: 40.0,
+    ACTION_REENCODE + '+analyze': 30.0,
+    ACTION_GAIN: 1000.0,
+    ACTION_GAIN + '+analyze': 150.0,
+    ACTION_TAGS: 5000.0,
+    ACTION_TAGS + '+analyze': 150.0,
+}
+
+# Peso delle misure dell'ultimo lotto rispetto a quelle salvate
+THROUGHPUT_WEIGHT = 0.5
+
+
+def _cost_key(action, measured):
+    return action if measured else action + '+analyze'
+
+
+class ThroughputHistory:
+    """Velocità misurate per azione, salvate nella cartella dati."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_data_dir(), THROUGHPUT_FILENAME)
+        self.rates = dict(DEFAULT_THROUGHPUT)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+            self.rates.update({key: float(rate) for key, rate in saved.items()
+                               if key in self.rates and float(rate) > 0})
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+
+    def estimate(self, action, measured, duration):
+        """Secondi di elaborazione previsti per un file."""
+        if action in SKIPPED_ACTIONS:
+            return 0.0
+        return duration / self.rates[_cost_key(action, measured)]
+
+    def update(self, plan, timings):
+        """Aggiorna le velocità con i tempi (RunReport) di un lotto eseguito."""
+        totals = {}
+        for path, audio_seconds, spans in timings.files:
+            item = plan.by_path.get(os.path.normpath(path))
+            seconds = sum(spans.values())
+            if item is None or item.action in SKIPPED_ACTIONS \
+                    or not audio_seconds or not seconds:
+                continue
+            key = _cost_key(item.action, item.measured)
+            audio, elapsed = totals.get(key, (0.0, 0.0))
+            totals[key] = (audio + audio_seconds, elapsed + seconds)
+        for key, (audio, elapsed) in totals.items():
+            self.rates[key] = (THROUGHPUT_WEIGHT * audio / elapsed
+                               + (1 - THROUGHPUT_WEIGHT) * self.rates[key])
+
+    def save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.rates, f, indent=1)
+
+
+class PlannedFile:
+    """Azione decisa per un file del lotto."""
+
+    __slots__ = ('key', 'path', 'action', 'gain_db', 'duration', 'measured',
+                 'estimate', 'album', 'bitrate_kbps')
+
+    def __init__(self, key, path, action, gain_db, duration, measured,
+                 estimate, album=None, bitrate_kbps=None):
+        self.key = key  # Chiave del lavoro (riga della GUI, indice della CLI)
+        self.path = path
+        self.action = action  # ACTION_*
+        self.gain_db = gain_db  # None se il livello non è ancora misurato
+        self.duration = duration  # Secondi di audio (0 se sconosciuta)
+        self.measured = measured  # True se il volume è già noto
+        self.estimate = estimate  # Secondi di elaborazione previsti
+        self.album = album  # AlbumGain in modalità album, altrimenti None
+        # Bitrate di uscita della ricodifica, None se resta quello del file
+        self.bitrate_kbps = bitrate_kbps
+
+
+def classify(options, level, peak, bitrate_kbps=None):
+    """(azione, guadagno in dB) per un file di volume e picco già noti.
+
+    bitrate_kbps è il bitrate del file: in modalità ricodifica con un
+    bitrate di uscita scelto, se è diverso serve comunque la ricodifica.
+    Per ACTION_GAIN il guadagno è quello applicato, arrotondato al multiplo
+    di GAIN_STEP_DB.
+    """
+    gain_db = options.target_db - level
+    if options.mode == MODE_TAGS:
+        return ACTION_TAGS, gain_db
+    output_kbps = options.output_bitrate_kbps()
+    if options.mode == MODE_REENCODE and output_kbps is not None \
+            and bitrate_kbps != output_kbps:
+        return ACTION_REENCODE, gain_db
+    if abs(gain_db) <= options.tolerance_db:
+        return ACTION_SKIP, gain_db
+    steps = gain_steps(gain_db)
+    if options.mode == MODE_GAIN:
+        # Un guadagno sotto mezza unità di global_gain non cambia il file
+        if not steps:
+            return ACTION_SKIP, gain_db
+        return ACTION_GAIN, steps * GAIN_STEP_DB
+    steps_db = steps * GAIN_STEP_DB
+    if abs(gain_db - steps_db) <= options.tolerance_db \
+            and peak * 10 ** (steps_db / 20.0) <= 1.0:
+        return ACTION_GAIN, steps_db
+    return ACTION_REENCODE, gain_db
+
+
+def _mode_action(options):
+    if options.mode == MODE_TAGS:
+        return ACTION_TAGS
+    if options.mode == MODE_GAIN:
+        return ACTION_GAIN
+    return ACTION_REENCODE
+
+
+class NormalizationPlan:
+    """Azioni, stime e ordine di esecuzione di un lotto."""
+
+    def __init__(self, files, workers=1):
+        self.files = files  # PlannedFile nell'ordine dei file del lotto
+        self.workers = max(1, workers)
+        self.by_path = {item.path: item for item in files}
+
+    def pending(self):
+        """File da elaborare, dal più lungo al più breve."""
+        return sorted((item for item in self.files
+                       if item.action not in SKIPPED_ACTIONS),
+                      key=lambda item: item.estimate, reverse=True)
+
+    def counts(self):
+        counts = {}
+        for item in self.files:
+            counts[item.action] = counts.get(item.action, 0) + 1
+        return counts
+
+    def cpu_seconds(self):
+        """Tempo di elaborazione previsto sommato su tutti i file."""
+        return sum(item.estimate for item in self.files)
+
+    def wall_seconds(self):
+        """Durata prevista con self.workers processi e l'ordine di pending()."""
+        finish_times = [0.0] * self.workers
+        for item in self.pending():
+            heapq.heapreplace(finish_times, finish_times[0] + item.estimate)
+        return max(finish_times)
+
+    def albums(self):
+        """AlbumGain distinti del lotto, nell'ordine dei file."""
+        albums = {}
+        for item in self.files:
+            if item.album is not None:
+                albums.setdefault(item.album.name, item.album)
+        return list(albums.values())
+
+    def summary_lines(self):
+        counts = self.counts()
+        lines = [f"Piano: {len(self.files)} file, "
+                 f"{format_duration(sum(i.duration for i in self.files))} "
+                 "di audio"]
+        for action, label in ACTION_LABELS.items():
+            if counts.get(action):
+                lines.append(f"  {label}: {counts[action]}")
+        output = {}
+        for item in self.files:
+            if item.action == ACTION_REENCODE and item.bitrate_kbps:
+                kbps = item.bitrate_kbps
+                output[kbps] = output.get(kbps, 0) + 1
+        for kbps, count in sorted(output.items()):
+            lines.append(f"  ricodifica a {kbps} kbps: {count}")
+        for album in self.albums():
+            # Senza ricodifica vale il guadagno arrotondato dei suoi file
+            gain_db = next((item.gain_db for item in self.files
+                            if item.album is album
+                            and item.action == ACTION_GAIN), album.gain_db)
+            lines.append(f"  Album {album.name}: {album.files} file, "
+                         f"guadagno {gain_db:+.2f} dB")
+        lines.append(f"  Tempo stimato: {format_duration(self.wall_seconds())}"
+                     f" con {self.workers} process"
+                     f"{'o' if self.workers == 1 else 'i'} "
+                     f"({format_duration(self.cpu_seconds())} di "
+                     "elaborazione)")
+        return lines
+
+
+def plan_normalization(items, options, measurements=None, journal=None,
+                       workers=1, history=None):
+    """Decide l'azione per ogni file senza modificare nulla.
+
+    items è una sequenza di (chiave, percorso); measurements associa al
+    percorso normalizzato la misura (LoudnessResult, file_stamp) usata anche
+    da normalize_file. Con journal i file già normalizzati con le stesse
+    opzioni diventano ACTION_DONE. In modalità album il guadagno di ogni
+    album viene dalle misure dei suoi file (vedi album_gains), che vanno
+    completate prima con dbprecision.album.measure_files.
+    """
+    from dbprecision.analysis import audio_info, mp3_bitrate_kbps
+    from dbprecision.normalize import measurement_is_current
+
+    measurements = measurements or {}
+    history = history or ThroughputHistory()
+    output_kbps = (options.output_bitrate_kbps()
+                   if options.mode == MODE_REENCODE else None)
+    entries = [(key, os.path.normpath(path)) for key, path in items]
+    done = {path for _, path in entries
+            if journal is not None and journal.is_done(path, options)}
+    albums = {}
+    if options.album != ALBUM_OFF:
+        from dbprecision.album import album_gains
+        albums = album_gains([(path, path in done) for _, path in entries],
+                             options, measurements)
+
+    files = []
+    for key, path in entries:
+        album = albums.get(path)
+        if path in done:
+            files.append(PlannedFile(key, path, ACTION_DONE, None, 0.0,
+                                     True, 0.0, album))
+            continue
+        measurement = measurements.get(path)
+        measured = measurement_is_current(path, measurement, options.metric)
+        bitrate_kbps = None
+        if output_kbps is not None:
+            try:
+                bitrate_kbps = mp3_bitrate_kbps(path)
+            except Exception:
+                pass  # Bitrate sconosciuto: il file viene ricodificato
+        if album is not None:
+            action, gain_db = classify(options,
+                                       options.target_db - album.gain_db,
+                                       album.peak, bitrate_kbps)
+        elif measured:
+            loudness = measurement[0]
+            action, gain_db = classify(options, loudness.level(options.metric),
+                                       loudness.highest_peak, bitrate_kbps)
+        else:
+            action, gain_db = _mode_action(options), None
+        if measured:
+            duration = measurement[0].duration
+        else:
+            try:
+                duration = audio_info(path)[2]
+            except Exception:
+                duration = 0.0  # L'errore verrà riportato dalla normalizzazione
+        files.append(PlannedFile(key, path, action, gain_db, duration,
+                                 measured,
+                                 history.estimate(action, measured, duration),
+                                 album,
+                                 output_kbps if action == ACTION_REENCODE
+                                 else None))
+    return NormalizationPlan(files, workers)
+
+
+class EtaTracker:
+    """Tempo rimanente di un lotto in corso, corretto dalla velocità reale.
+
+    Prima che un file sia completato vale la stima del piano; poi le stime
+    dei file ancora da fare vengono scalate dal rapporto tra tempi reali e
+    stimati dei file completati e divise per il numero di processi.
+    """
+
+    def __init__(self, plan):
+        self._estimates = {item.key: item.estimate for item in plan.pending()}
+        self._workers = plan.workers
+        self._planned = plan.wall_seconds()
+        self._remaining = sum(self._estimates.values())
+        self._estimated_done = 0.0
+        self._actual_done = 0.0
+        self._start = time.monotonic()
+
+    def file_done(self, key, seconds=None):
+        """Segna il file come completato; seconds è il suo tempo reale."""
+        estimate = self._estimates.pop(key, 0.0)
+        self._remaining -= estimate
+        if seconds is not None and estimate > 0:
+            self._estimated_done += estimate
+            self._actual_done += seconds
+
+    def remaining_seconds(self):
+        if self._estimated_done <= 0:
+            return max(0.0, self._planned - (time.monotonic() - self._start))
+        ratio = self._actual_done / self._estimated_done
+        return max(0.0, self._remaining) * ratio / self._workers
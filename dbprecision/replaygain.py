@@ -0,0 +1,56 @@
+"""Scrittura dei tag ReplayGain nei file MP3.
+
+Il guadagno e il picco vengono salvati come frame TXXX
+REPLAYGAIN_TRACK_GAIN/REPLAYGAIN_TRACK_PEAK (letti dalla maggior parte dei
+player) e come frame RVA2 dello standard ID3v2.4; in modalità album anche
+REPLAYGAIN_ALBUM_GAIN/REPLAYGAIN_ALBUM_PEAK e il frame RVA2 'album'. mutagen riscrive solo la
+regione del tag: i dati audio restano invariati.
+"""
+from mutagen.id3 import ID3, RVA2, TXXX, ID3NoHeaderError
+
+TRACK_GAIN = 'REPLAYGAIN_TRACK_GAIN'
+TRACK_PEAK = 'REPLAYGAIN_TRACK_PEAK'
+ALBUM_GAIN = 'REPLAYGAIN_ALBUM_GAIN'
+ALBUM_PEAK = 'REPLAYGAIN_ALBUM_PEAK'
+
+# Descrizione dei frame RVA2 per il guadagno della traccia e dell'album
+RVA2_TRACK = 'track'
+RVA2_ALBUM = 'album'
+
+# Canale "master volume" del frame RVA2
+RVA2_MASTER_CHANNEL = 1
+
+# Picco massimo rappresentabile da mutagen nel frame RVA2 (16 bit, 1.0 = 2^15)
+RVA2_MAX_PEAK = 65535 / 32768
+
+
+def _set_gain(tags, gain_key, peak_key, rva2_desc, gain_db, peak):
+    tags.setall(f'TXXX:{gain_key}', [
+        TXXX(encoding=3, desc=gain_key, text=[f'{gain_db:+.2f} dB'])])
+    tags.setall(f'TXXX:{peak_key}', [
+        TXXX(encoding=3, desc=peak_key, text=[f'{peak:.6f}'])])
+    tags.setall(f'RVA2:{rva2_desc}', [
+        RVA2(desc=rva2_desc, channel=RVA2_MASTER_CHANNEL, gain=gain_db,
+             peak=min(peak, RVA2_MAX_PEAK))])
+
+
+def write_replaygain_tags(file_path, gain_db, peak, album_gain_db=None,
+                          album_peak=None):
+    """Salva guadagno (dB) e picco (lineare, 1.0 = fondo scala) nel tag ID3.
+
+    Con album_gain_db vengono scritti anche guadagno e picco dell'album.
+    Se il file non ha un tag ID3 ne viene creato uno; la versione di un tag
+    esistente (v2.3 o v2.4) viene mantenuta.
+    """
+    try:
+        tags = ID3(file_path)
+        version = 3 if tags.version[1] == 3 else 4
+    except ID3NoHeaderError:
+        tags = ID3()
+        version = 4
+
+    _set_gain(tags, TRACK_GAIN, TRACK_PEAK, RVA2_TRACK, gain_db, peak)
+    if album_gain_db is not None:
+        _set_gain(tags, ALBUM_GAIN, ALBUM_PEAK, RVA2_ALBUM, album_gain_db,
+                  album_peak)
+    tags.save(file_path, v2_version=version)
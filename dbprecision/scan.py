@@ -0,0 +1,97 @@
+"""Ricerca dei file da elaborare nelle cartelle, senza dipendenze da PyQt6.
+
+FileScanner visita l'albero con os.scandir e una pila esplicita e restituisce
+i file man mano che li trova: chi lo usa può mostrare i primi risultati prima
+della fine della scansione e interromperla in qualunque momento, anche su
+cartelle di rete con centinaia di migliaia di file.
+"""
+import fnmatch
+import os
+
+DEFAULT_INCLUDE = ('*.mp3',)
+
+# Cartelle di sistema o nascoste, saltate per velocizzare la scansione
+SKIPPED_DIR_PREFIXES = ('$', '.')
+
+
+def parse_patterns(text):
+    """Converte 'a*.mp3; live/*' in una tupla di glob (separatori ; o ,)."""
+    return tuple(part.strip() for part in text.replace(',', ';').split(';')
+                 if part.strip())
+
+
+def _matches(name, rel_path, patterns):
+    """Un glob con '/' confronta il percorso relativo, altrimenti il nome."""
+    for pattern in patterns:
+        target = rel_path if '/' in pattern else name
+        if fnmatch.fnmatchcase(target.lower(), pattern.lower()):
+            return True
+    return False
+
+
+class FileScanner:
+    """Elenca i file che corrispondono ai glob include e non a quelli exclude.
+
+    max_depth è il numero di livelli di sottocartelle visitati (0 = solo la
+    cartella indicata, None = nessun limite). I glob di esclusione valgono
+    anche per le cartelle, che vengono saltate per intero. Le cartelle
+    illeggibili non interrompono la scansione: finiscono in errors come
+    (percorso, messaggio).
+    """
+
+    def __init__(self, include=DEFAULT_INCLUDE, exclude=(), max_depth=None,
+                 is_cancelled=None):
+        self.include = tuple(include) or DEFAULT_INCLUDE
+        self.exclude = tuple(exclude)
+        self.max_depth = max_depth
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.dirs_scanned = 0
+        self.errors = []
+
+    def scan(self, root):
+        """Genera i percorsi dei file trovati sotto root.
+
+        Ogni cartella viene elencata in ordine alfabetico, prima i file e poi
+        le sottocartelle; se is_cancelled diventa vera il generatore termina,
+        anche a metà dell'elenco di una cartella con molti file.
+        """
+        # Pila di (percorso, percorso relativo con '/', profondità)
+        stack = [(root, '', 0)]
+        while stack:
+            if self.is_cancelled():
+                return
+            path, rel_dir, depth = stack.pop()
+            entries = []
+            try:
+                with os.scandir(path) as it:
+                    # Su una cartella di rete ogni voce può richiedere tempo
+                    for entry in it:
+                        if self.is_cancelled():
+                            return
+                        entries.append(entry)
+            except OSError as e:
+                self.errors.append((path, e.strerror or str(e)))
+                continue
+            entries.sort(key=lambda entry: entry.name.lower())
+            self.dirs_scanned += 1
+
+            subdirs = []
+            for entry in entries:
+                if self.is_cancelled():
+                    return
+                rel_path = rel_dir + entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if (self.max_depth is None or depth < self.max_depth) \
+                            and not entry.name.startswith(SKIPPED_DIR_PREFIXES) \
+                            and not _matches(entry.name, rel_path, self.exclude):
+                        subdirs.append((entry.path, rel_path + '/', depth + 1))
+                elif _matches(entry.name, rel_path, self.include) \
+                        and not _matches(entry.name, rel_path, self.exclude):
+                    yield entry.path
+
+            # In ordine inverso, così la prima sottocartella viene visitata per prima
+            stack.extend(reversed(subdirs))
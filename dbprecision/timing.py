@@ -0,0 +1,140 @@
+"""Tempi per fase della normalizzazione e rapporto di un lotto.
+
+normalize_file misura ogni fase con uno StageTimer e, a file completato,
+invia i tempi con report('timing', row, percorso, durata audio, {fase:
+secondi}). RunReport li raccoglie nel processo che coordina il lotto e li
+riassume o li salva in JSON o CSV.
+
+Nell'elaborazione a blocchi decodifica, guadagno e codifica si alternano
+sugli stessi blocchi: 'decode' è il tempo passato ad attendere il PCM da
+ffmpeg, 'encode' quello passato a consegnarlo all'encoder, quindi la fase
+più lunga indica se il lotto è limitato dalla decodifica, dall'elaborazione
+in NumPy o dalla codifica. Quando un unico processo ffmpeg decodifica e
+ricodifica (misura già nota dall'analisi), tutto il suo tempo è 'encode'.
+"""
+import csv
+import json
+import time
+from contextlib import contextmanager
+
+# Fasi nell'ordine in cui un file le attraversa
+STAGES = ('probe', 'decode', 'analyze', 'gain', 'encode', 'tags', 'replace')
+
+STAGE_LABELS = {
+    'probe': 'lettura intestazioni',
+    'decode': 'decodifica',
+    'analyze': 'analisi',
+    'gain': 'guadagno',
+    'encode': 'codifica',
+    'tags': 'ripristino tag',
+    'replace': 'sostituzione file',
+}
+
+
+class StageTimer:
+    """Somma i secondi trascorsi in ciascuna fase di un file."""
+
+    def __init__(self):
+        self.spans = {}
+
+    def add(self, stage, seconds):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+
+def format_duration(seconds):
+    """Durata leggibile: m:ss oppure h:mm:ss."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class RunReport:
+    """Tempi per fase di tutti i file di un lotto."""
+
+    def __init__(self):
+        self.files = []  # (percorso, secondi di audio, {fase: secondi})
+        self.wall_seconds = None  # Durata del lotto, impostata da finish()
+        self._start = time.perf_counter()
+
+    def add(self, file_path, audio_seconds, spans):
+        self.files.append((file_path, audio_seconds or 0.0, dict(spans)))
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._start
+
+    def totals(self):
+        """Secondi per fase sommati su tutti i file, nell'ordine di STAGES."""
+        totals = dict.fromkeys(STAGES, 0.0)
+        for _, _, spans in self.files:
+            for stage, seconds in spans.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return {stage: seconds for stage, seconds in totals.items() if seconds}
+
+    def bottleneck(self):
+        """Fase con il tempo totale più alto, o None se non ci sono tempi."""
+        totals = self.totals()
+        return max(totals, key=totals.get) if totals else None
+
+    def summary_lines(self):
+        """Riassunto leggibile del lotto, una riga per fase."""
+        if not self.files:
+            return []
+        audio_seconds = sum(audio for _, audio, _ in self.files)
+        header = (f"Tempi del lotto: {len(self.files)} file, "
+                  f"{format_duration(audio_seconds)} di audio")
+        if self.wall_seconds:
+            header += (f" in {self.wall_seconds:.1f} s "
+                       f"({audio_seconds / self.wall_seconds:.1f}x il tempo "
+                       "reale)")
+        lines = [header]
+        totals = self.totals()
+        total = sum(totals.values())
+        for stage, seconds in totals.items():
+            lines.append(f"  {STAGE_LABELS.get(stage, stage)}: {seconds:.2f} s "
+                         f"({100 * seconds / total:.0f}%)")
+        bottleneck = self.bottleneck()
+        if bottleneck:
+            lines.append("  Fase più lenta: "
+                         f"{STAGE_LABELS.get(bottleneck, bottleneck)}")
+        return lines
+
+    def to_dict(self):
+        return {
+            'wall_seconds': self.wall_seconds,
+            'audio_seconds': sum(audio for _, audio, _ in self.files),
+            'totals': self.totals(),
+            'bottleneck': self.bottleneck(),
+            'files': [{'path': path, 'audio_seconds': audio, 'stages': spans}
+                      for path, audio, spans in self.files],
+        }
+
+    def write_json(self, stream):
+        json.dump(self.to_dict(), stream, indent=2, ensure_ascii=False)
+        stream.write('\n')
+
+    def write_csv(self, stream):
+        """Una riga per file, una colonna di secondi per fase."""
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(('path', 'audio_seconds') + STAGES)
+        for path, audio, spans in self.files:
+            writer.writerow([path, f'{audio:.3f}'] + [
+                f'{spans[stage]:.4f}' if stage in spans else ''
+                for stage in STAGES])
+
+    def save(self, path):
+        """Salva in CSV se path termina con .csv, altrimenti in JSON."""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            if path.lower().endswith('.csv'):
+                self.write_csv(f)
+            else:
+                self.write_json(f)
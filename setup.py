@@ -29,12 +29,12 @@ build_options = {
         'shutil',
         'zipfile',
         'json',
-        'requests',
         'PyQt6',
         'mutagen',
         'array',
         'wave',
         'numpy',
+        'dbprecision',
     ],
     'excludes': [],
     'include_files': include_files,
@@ -52,7 +52,13 @@ executables = [
         shortcut_name='dBPrecision',
         shortcut_dir='DesktopFolder',
         copyright='Copyright 2025 dBPrecision. Tutti i diritti riservati.',
-    )
+    ),
+    # Riga di comando senza interfaccia grafica
+    Executable(
+        script='dbprecision/__main__.py',
+        base=None,
+        target_name='dbprecision-cli.exe' if is_windows else 'dbprecision-cli',
+    ),
 ]
 
 # Configurazione setup